@@ -0,0 +1,377 @@
+"""Benchmark runner for the subpubpy buses and channels.
+
+Every scenario publishes timestamped payloads and reports the throughput
+in messages per second together with the p50/p99 publish-to-delivery
+latency. Every case runs --warmup times unmeasured, then --repeat times;
+the median of the repeats is reported with the spread of the throughput.
+Results are printed as a table and can be written as JSON and compared
+with the JSON of another commit:
+
+    python benchmarks/run.py --quick --output bench.json
+    python benchmarks/run.py --compare bench.json --threshold 0.15
+"""
+import argparse
+import itertools
+import json
+import logging
+import pathlib
+import platform
+import subprocess
+import sys
+import statistics
+import time
+from functools import partial
+from queue import Queue
+from threading import Barrier, Event, Lock, Thread
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from subpubpy import (SimpleSubpub, ThreadSafeSubpub, RegexSubpub,  # noqa: E402
+                      ThreadSafeRegexSubpub, Publisher, Subscriber,
+                      RingBufferChannel)
+from subpubpy.manager import _ChannelManager  # noqa: E402
+
+BUSES = {
+    "SimpleSubpub": SimpleSubpub,
+    "ThreadSafeSubpub": ThreadSafeSubpub,
+    "RegexSubpub": RegexSubpub,
+    "ThreadSafeRegexSubpub": ThreadSafeRegexSubpub,
+}
+
+SWEEPS = {
+    "full": {
+        "subscribers": [1, 8, 32],
+        "patterns": [1, 64, 512],
+        "payload_size": [16, 4096],
+        "publisher_threads": [1, 4],
+        "queue_size": [150, 4096],
+        "messages": 20000,
+    },
+    "quick": {
+        "subscribers": [1, 8],
+        "patterns": [1, 64],
+        "payload_size": [16],
+        "publisher_threads": [1, 2],
+        "queue_size": [150],
+        "messages": 2000,
+    },
+}
+
+_counter = itertools.count()
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))
+    return samples[index]
+
+
+class Recorder:
+    """Collects publish-to-delivery latencies in nanoseconds."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.latencies = []
+        self.lock = Lock()
+        self.done = Event()
+
+    def record(self, sent_ns):
+        latency = time.perf_counter_ns() - sent_ns
+        with self.lock:
+            self.latencies.append(latency)
+            if len(self.latencies) == self.expected:
+                self.done.set()
+
+    def wait(self, timeout=60):
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"{len(self.latencies)} of {self.expected} "
+                               f"messages delivered")
+
+
+def publish_in_threads(threads, messages, publish):
+    per_thread = messages // threads
+    start = Barrier(threads + 1)
+
+    def run():
+        start.wait()
+        for _ in range(per_thread):
+            publish()
+
+    workers = [Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    begin = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return begin, per_thread * threads
+
+
+def result(scenario, params, delivered, elapsed, latencies):
+    return {
+        "scenario": scenario,
+        "params": params,
+        "msgs_per_sec": round(delivered / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(percentile(latencies, 0.50) / 1000, 2),
+        "p99_us": round(percentile(latencies, 0.99) / 1000, 2),
+    }
+
+
+def bench_bus(bus_name, subscribers, payload_size, publisher_threads,
+              messages):
+    bus = BUSES[bus_name]()
+    event = f"bench.{next(_counter)}"
+    body = b"x" * payload_size
+    published = (messages // publisher_threads) * publisher_threads
+    recorder = Recorder(published * subscribers)
+
+    def callback(event, payload):
+        recorder.record(payload[0])
+
+    callbacks = []
+    for _ in range(subscribers):
+        def func(event, payload):
+            callback(event, payload)
+        callbacks.append(func)
+        bus.sub(event, func, verbose=False)
+
+    def publish():
+        bus.pub(event, (time.perf_counter_ns(), body), verbose=False)
+
+    begin, _ = publish_in_threads(publisher_threads, messages, publish)
+    recorder.wait()
+    elapsed = time.perf_counter() - begin
+    for func in callbacks:
+        bus.unsub(event, func, verbose=False)
+    return result(bus_name, {"subscribers": subscribers,
+                             "payload_size": payload_size,
+                             "publisher_threads": publisher_threads},
+                  published, elapsed, recorder.latencies)
+
+
+def bench_patterns(bus_name, patterns, messages):
+    bus = BUSES[bus_name]()
+    prefix = f"bench{next(_counter)}"
+    recorder = Recorder(messages)
+
+    def func(event, payload):
+        recorder.record(payload)
+
+    def miss(event, payload): ...
+
+    registered = [(rf"{prefix}\.miss{i}\..*", miss) for i in range(patterns)]
+    registered.append((rf"{prefix}\.hit\..*", func))
+    for pattern, callback in registered:
+        bus.sub(pattern, callback, verbose=False)
+
+    events = [f"{prefix}.hit.{i}" for i in range(16)]
+    begin = time.perf_counter()
+    for i in range(messages):
+        bus.pub(events[i & 15], time.perf_counter_ns(), verbose=False)
+    recorder.wait()
+    elapsed = time.perf_counter() - begin
+    for pattern, callback in registered:
+        bus.unsub(pattern, callback, verbose=False)
+    return result(f"{bus_name}.patterns", {"patterns": patterns},
+                  messages, elapsed, recorder.latencies)
+
+
+def consume(subscriber, count, recorder, batch):
+    received = 0
+    while received < count:
+        if batch:
+            messages = subscriber.get_messages(256, block=True)
+        else:
+            messages = (subscriber.get_message(block=True),)
+        for message in messages:
+            recorder.record(message[0])
+        received += len(messages)
+
+
+def bench_channel(kind, subscribers, payload_size, publisher_threads,
+                  queue_size, messages):
+    channel_name = f"bench.channel.{next(_counter)}"
+    publisher = Publisher()
+    body = b"x" * payload_size
+    published = (messages // publisher_threads) * publisher_threads
+    recorder = Recorder(published * subscribers)
+
+    manager = _ChannelManager()
+    channel = None
+    if kind == "RingBufferChannel":
+        channel = RingBufferChannel(channel_name, capacity=queue_size)
+        consumers = [Subscriber(q=channel.reader())
+                     for _ in range(subscribers)]
+        manager.register(channel)
+    else:
+        consumers = [Subscriber(q=Queue(maxsize=queue_size))
+                     for _ in range(subscribers)]
+    try:
+        for subscriber in consumers:
+            subscriber.add_channel(channel_name)
+
+        threads = [Thread(target=consume,
+                          args=(subscriber, published, recorder,
+                                kind == "RingBufferChannel"), daemon=True)
+                   for subscriber in consumers]
+        for thread in threads:
+            thread.start()
+
+        def publish():
+            publisher.publish(channel_name, (time.perf_counter_ns(), body))
+
+        begin, _ = publish_in_threads(publisher_threads, messages, publish)
+        recorder.wait()
+        elapsed = time.perf_counter() - begin
+    finally:
+        # later cases must not see the channel of this one.
+        for subscriber in consumers:
+            subscriber.remove_channel(channel_name)
+        if channel is not None:
+            manager.unregister(channel)
+    return result(kind, {"subscribers": subscribers,
+                         "payload_size": payload_size,
+                         "publisher_threads": publisher_threads,
+                         "queue_size": queue_size},
+                  published, elapsed, recorder.latencies)
+
+
+def measure(case, repeat, warmup):
+    """Runs case warmup times unmeasured and then repeat times, returns\n
+    the medians of the runs and the spread of their throughput."""
+    for _ in range(warmup):
+        case()
+    runs = [case() for _ in range(repeat)]
+    rates = [entry["msgs_per_sec"] for entry in runs]
+    median = statistics.median(rates)
+    entry = {"scenario": runs[0]["scenario"], "params": runs[0]["params"]}
+    entry.update({
+        "msgs_per_sec": round(median, 1),
+        "msgs_per_sec_min": min(rates),
+        "msgs_per_sec_max": max(rates),
+        "spread": round((max(rates) - min(rates)) / median, 3)
+        if median else 0.0,
+        "p50_us": round(statistics.median(e["p50_us"] for e in runs), 2),
+        "p99_us": round(statistics.median(e["p99_us"] for e in runs), 2),
+        "runs": repeat,
+    })
+    return entry
+
+
+def run(sweep, selected):
+    messages = sweep["messages"]
+    for bus_name in BUSES:
+        if selected and bus_name not in selected:
+            continue
+        for subscribers, payload_size, threads in itertools.product(
+                sweep["subscribers"], sweep["payload_size"],
+                sweep["publisher_threads"]):
+            yield partial(bench_bus, bus_name, subscribers, payload_size,
+                          threads, messages)
+        if "Regex" in bus_name:
+            for patterns in sweep["patterns"]:
+                yield partial(bench_patterns, bus_name, patterns, messages)
+
+    for kind in ("Channel", "RingBufferChannel"):
+        if selected and kind not in selected:
+            continue
+        for subscribers, payload_size, threads, queue_size in \
+                itertools.product(sweep["subscribers"], sweep["payload_size"],
+                                  sweep["publisher_threads"],
+                                  sweep["queue_size"]):
+            yield partial(bench_channel, kind, subscribers, payload_size,
+                          threads, queue_size, messages)
+
+
+def key(entry):
+    return entry["scenario"], json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(results, baseline, threshold):
+    """Prints the change of the median throughput per case, returns the\n
+    regressions."""
+    previous = {key(entry): entry for entry in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for entry in results:
+        old = previous.get(key(entry))
+        if not old or not old["msgs_per_sec"]:
+            continue
+        change = entry["msgs_per_sec"] / old["msgs_per_sec"] - 1
+        marker = "  REGRESSION" if change < -threshold else ""
+        print(f"  {entry['scenario']:<28} {json.dumps(entry['params'])}: "
+              f"{change:+.1%} (spread {old.get('spread', 0):.1%} -> "
+              f"{entry.get('spread', 0):.1%}){marker}")
+        if marker:
+            regressions.append(entry)
+    return regressions
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--quick", action="store_true",
+                        help="run the small sweep")
+    parser.add_argument("--messages", type=int,
+                        help="messages published per case")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="measured runs per case, the median is reported")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="unmeasured runs per case before measuring")
+    parser.add_argument("--only", action="append", default=[],
+                        help="bus or channel name to run, repeatable")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="throughput drop reported as a regression")
+    args = parser.parse_args(argv)
+    if args.repeat <= 0:
+        parser.error("--repeat must be greater than 0")
+    if args.warmup < 0:
+        parser.error("--warmup must not be negative")
+
+    logging.disable(logging.INFO)
+    sweep = dict(SWEEPS["quick" if args.quick else "full"])
+    if args.messages:
+        sweep["messages"] = args.messages
+
+    results = []
+    print(f"{'scenario':<28} {'params':<90} {'msgs/s':>12} {'spread':>8} "
+          f"{'p50 us':>10} {'p99 us':>10}")
+    for case in run(sweep, set(args.only)):
+        entry = measure(case, args.repeat, args.warmup)
+        results.append(entry)
+        print(f"{entry['scenario']:<28} {json.dumps(entry['params']):<90} "
+              f"{entry['msgs_per_sec']:>12,.0f} {entry['spread']:>8.1%} "
+              f"{entry['p50_us']:>10.2f} {entry['p99_us']:>10.2f}",
+              flush=True)
+
+    report = {"commit": commit(), "python": platform.python_version(),
+              "platform": platform.platform(), "sweep": sweep,
+              "repeat": args.repeat, "warmup": args.warmup,
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,36 @@
-from .core import SimpleSubpub, ThreadSafeSubpub, ThreadSafeRegexSubpub, RegexSubpub
+from .core import SimpleSubpub, ThreadSafeSubpub, ThreadSafeRegexSubpub, RegexSubpub, AsyncSubpub
 from .channels import SimpleChannel as Channel
+from .channels import SharedMemoryChannel, RingBufferChannel, DurableChannel
+from .metrics import MetricsRegistry, PrometheusFileExporter
+from .payload import SharedPayload, SharedMemoryPayload
+from .retained import LastNStore, LastValueStore
+from .serialization import Frame, register_codec
+from .windows import Conflate, Throttle, Debounce
+from .budgets import Budget
+from .replies import Inbox, Request
+from .poller import Poller, wait_any
+from .policies import (BlockPolicy, BlockTimeoutPolicy, DropNewestPolicy,
+                       DropOldestPolicy, ConflatePolicy)
 from .publishers import SimplePublisher as Publisher
 from .subscribers import SimpleSubscriber as Subscriber
+from .subscribers import AsyncSubscriber
 from .core import ThreadSafeSimplePubsub as PubSubChannels
+from .broker import Broker
+from .client import RemotePublisher, RemoteSubscriber, ConnectionPool
+from .dispatchers import (InlineDispatcher, ThreadPoolDispatcher,
+                          PartitionedDispatcher, ExecutorDispatcher,
+                          AsyncioDispatcher)
 
 
 __all__ = [SimpleSubpub, ThreadSafeSubpub, ThreadSafeRegexSubpub,
-           RegexSubpub, Channel, Publisher, Subscriber, PubSubChannels]
+           RegexSubpub, Channel, Publisher, Subscriber, PubSubChannels,
+           InlineDispatcher, ThreadPoolDispatcher, ExecutorDispatcher,
+           AsyncSubpub, AsyncSubscriber, AsyncioDispatcher,
+           SharedMemoryChannel, BlockPolicy, BlockTimeoutPolicy,
+           DropNewestPolicy, DropOldestPolicy, ConflatePolicy,
+           RingBufferChannel, MetricsRegistry, PrometheusFileExporter,
+           SharedPayload, SharedMemoryPayload, DurableChannel,
+           LastNStore, LastValueStore, Broker, RemotePublisher,
+           RemoteSubscriber, ConnectionPool, Frame, register_codec,
+           Conflate, Throttle, Debounce, PartitionedDispatcher,
+           Budget, Inbox, Request, Poller, wait_any]
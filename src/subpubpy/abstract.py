@@ -1,45 +1,336 @@
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Union, Set, AnyStr
-from threading import Thread
+from typing import (Any, Callable, Dict, Union, Set, AnyStr, Iterable,
+                    Hashable)
 import inspect
-from .utils import custom_hook
+from .utils import (custom_hook, HandlerDict, FilterIndex, WeakCallback,
+                    compile_where, get_many, split_topic_pattern, _reaper)
+from .budgets import Budget
+from .replies import Inbox, Request
+from .poller import _Signal
+from concurrent.futures import Future
+import asyncio
+from . import metrics
 import logging
 import threading
-from queue import Queue
+import weakref
+from queue import Queue, Empty, Full
 
 threading.excepthook = custom_hook
 
 
+class AbstractDispatcher(ABC):
+    """Abstract dispatch engine.
+
+    A dispatcher decides where and when a subscriber callback runs once
+    an event is published. Every callback handed to `dispatch` must be
+    executed exactly once.
+
+    Methods:
+    --------
+    @abstractmethod\n
+    dispatch(callback, event, payload)
+        run callback with event and payload.
+
+    dispatch_many(callback, event, payloads)
+        run callback once for every payload, in order.
+
+    dispatch_keyed(callback, event, payload, key)
+        run callback for a payload of the partition key.
+
+    shutdown(wait)
+        release the resources held by the dispatcher.
+    """
+
+    @abstractmethod
+    def dispatch(self, callback: Callable[[str, Any], None], event: str,
+                 payload: Any) -> None:
+        """Runs callback for the published event.
+
+        Parameters:
+        -----------
+        callback: Callable
+            subscriber callback which receives event and payload.
+
+        event: str
+            event which is published.
+
+        payload: Any
+            Any kind of data structure to handle with event.
+        """
+
+    def dispatch_many(self, callback: Callable[[str, Any], None], event: str,
+                      payloads: Iterable[Any]) -> None:
+        """Runs callback for every payload of the published event, in order.
+
+        Parameters:
+        -----------
+        callback: Callable
+            subscriber callback which receives event and payload.
+
+        event: str
+            event which is published.
+
+        payloads: Iterable
+            payloads published with event.
+        """
+        dispatch = self.dispatch
+        for payload in payloads:
+            dispatch(callback, event, payload)
+
+    def dispatch_keyed(self, callback: Callable[[str, Any], None],
+                       event: str, payload: Any, key: Hashable) -> None:
+        """Runs callback for a payload published with a partition key.\n
+        Partitioned dispatchers run the callbacks of one key in order,\n
+        the others ignore key.
+
+        Parameters:
+        -----------
+        callback: Callable
+            subscriber callback which receives event and payload.
+
+        event: str
+            event which is published.
+
+        payload: Any
+            Any kind of data structure to handle with event.
+
+        key: Hashable
+            partition key, e.g. an account id.
+        """
+        self.dispatch(callback, event, payload)
+
+    def dispatch_many_keyed(self, callback: Callable[[str, Any], None],
+                            event: str, payloads: Iterable[Any],
+                            key: Hashable) -> None:
+        """`dispatch_many` flavour of `dispatch_keyed`."""
+        self.dispatch_many(callback, event, payloads)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Releases the resources held by the dispatcher.
+
+        Parameters:
+        -----------
+        wait: Optional[bool]
+            if True block until every pending callback has run.
+        """
+
+
+class AbstractWindow(ABC):
+    """Abstract delivery window of a subscription.
+
+    A window sits between `pub` and the dispatcher. It collapses the\n
+    payloads offered while it is open and dispatches only the ones worth\n
+    delivering, redundant updates never reach the dispatcher. Windows are\n
+    closed by one shared timer thread. Payloads due when a window closes\n
+    are dispatched from there, through the dispatcher of the bus.
+
+    `sub` binds a copy of the window to each subscription, so one window\n
+    can be passed to many subscriptions. A bound window compares equal to\n
+    its callback and `unsub(event, callback)` removes and cancels it, its\n
+    pending payloads are discarded.
+
+    Attributes:
+    -----------
+    interval: float
+        length of the window in seconds.
+
+    key: Optional[Callable[[Any], Hashable]]
+        payloads of different keys get windows of their own, every\n
+        event has its own windows as well.
+
+    Methods:
+    --------
+    @abstractmethod\n
+    offer(event, payload)
+        hand a published payload to the window.
+
+    offer_many(event, payloads)
+        offer every payload, in order.
+
+    bind(callback, dispatcher)
+        return a copy of the window delivering to callback.
+
+    cancel()
+        stop delivering, timers still scheduled dispatch nothing.
+    """
+
+    def __init__(self, interval: float,
+                 key: Callable[[Any], Any] = None):
+        if interval <= 0:
+            raise ValueError("interval must be greater than 0")
+        if key is not None and not callable(key):
+            raise TypeError(f"{type(key)} is not Callable")
+        self.__interval = interval
+        self.__key = key
+        self._callback = None
+        self._dispatcher = None
+        self._cancelled = False
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def key(self) -> Callable[[Any], Any]:
+        return self.__key
+
+    @property
+    def callback(self) -> Callable[[str, Any], None]:
+        return self._callback
+
+    def bind(self, callback: Callable[[str, Any], None],
+             dispatcher: AbstractDispatcher) -> "AbstractWindow":
+        window = type(self).__new__(type(self))
+        window.__dict__.update(self.__dict__)
+        window._callback = callback
+        window._dispatcher = dispatcher
+        window._cancelled = False
+        window._reset()
+        return window
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def _reset(self):
+        """Clears the state copied from an unbound window."""
+
+    def _window_key(self, event: str, payload: Any):
+        key = self.__key
+        return event if key is None else (event, key(payload))
+
+    @abstractmethod
+    def offer(self, event: str, payload: Any) -> None:
+        pass
+
+    def offer_many(self, event: str, payloads: Iterable[Any]) -> None:
+        offer = self.offer
+        for payload in payloads:
+            offer(event, payload)
+
+    def _deliver(self, event: str, payload: Any) -> None:
+        if not self._cancelled:
+            self._dispatcher.dispatch(self._callback, event, payload)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, AbstractWindow):
+            other = other.callback
+        return self._callback == other
+
+    def __hash__(self) -> int:
+        return hash(self._callback)
+
+    def __repr__(self) -> str:
+        return "{}({}, {!r})".format(type(self).__name__, self.__interval,
+                                     self._callback)
+
+
 class AbstractSubpub(ABC):
     """Absact SubPub class.
 
+    Every instance is an isolated bus with its own registry, lock and\n
+    dispatcher, unrelated components publishing on buses of their own\n
+    never contend. `shared()` returns a default instance for the code\n
+    which wants a single bus per class.
+
     Attributes:
     -----------
-    _handler: dict
+    name: str
+        namespace of the bus, metrics are reported under it. Defaults to\n
+        the class name.
+
+    _handler: HandlerDict
         dictionary data structure to handle key as event and value\n
         as the callable function which runs on when event is called.
 
+    _dispatcher: AbstractDispatcher
+        dispatch engine which runs the subscribed callbacks.
+
     Methods:
     --------
+    shared()
+        return the shared default bus of the class.
+
     @abstractmethod\n
     pub(event, msg)
         event is published then notify everyone who have subscribed.
 
+    pub_many(event, payloads)
+        publish a batch of payloads with a single subscriber lookup.
+
     @abstractmethod\n
     sub(event, callback)
         register callback with the event.
 
     unsub(event, callback)
         unregister callback with the event.
+
+    request(event, payload, timeout)
+        publish a request, return the Future of its reply.
+
+    scatter(event, payload, timeout, replies)
+        publish a request, return the Future of the list of replies.
     """
-    _handler = dict()
+    _handler: HandlerDict
+    _dispatcher: AbstractDispatcher = None
+    _shared_lock = threading.Lock()
 
-    def __init__(self):
+    def __init__(self, dispatcher: AbstractDispatcher = None,
+                 name: str = None):
         """SubPub Base constructor
+
+        Parameters:
+        -----------
+        dispatcher: Optional[AbstractDispatcher]
+            dispatch engine which runs the subscribed callbacks.
+
+        name: Optional[str]
+            namespace of the bus, defaults to the class name. "channels"\n
+            is reserved for the metrics of the channels.
         """
+        if dispatcher is not None and \
+                not isinstance(dispatcher, AbstractDispatcher):
+            raise TypeError(f"{dispatcher} is not an AbstractDispatcher")
+        if name is not None and not isinstance(name, str):
+            raise TypeError(f"{name} should be a valid string.")
+        if name == metrics.CHANNELS:
+            raise ValueError(f"{name!r} is reserved for the channel metrics")
+        self._dispatcher = dispatcher
+        self._handler = self._make_handler()
+        self.__name = name or type(self).__name__
+        metrics.track(self)
+
+    def _make_handler(self):
+        """Returns the empty registry of a new bus."""
+        return HandlerDict()
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @classmethod
+    def shared(cls, *args, **kwargs) -> "AbstractSubpub":
+        """Returns the shared default bus of the class, it is created with\n
+        args on the first call. Buses constructed directly are independent\n
+        of it."""
+        bus = cls.__dict__.get("_shared")
+        if bus is None:
+            with AbstractSubpub._shared_lock:
+                bus = cls.__dict__.get("_shared")
+                if bus is None:
+                    bus = cls(*args, **kwargs)
+                    cls._shared = bus
+        return bus
+
+    def __repr__(self) -> str:
+        return "{}({!r})".format(type(self).__name__, self.__name)
 
     @abstractmethod
-    def pub(self, event: str, payload: Any, verbose: bool = True) -> None:
+    def pub(self, event: str, payload: Any, verbose: bool = True,
+            key: Hashable = None) -> None:
         """Publishes the events.
 
         Parameters:
@@ -52,24 +343,122 @@ class AbstractSubpub(ABC):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        key: Optional[Hashable]
+            partition key, a PartitionedDispatcher runs the callbacks of\n
+            payloads with the same key in publishing order.
         """
         # def caller_function(handler: dict, event: str, payload: Any,
         #                     verbose: bool = True):
+        registry = metrics.active
+        if registry is not None:
+            registry.published(self.__name, event)
+
+        subscribers_set: Set = self._handler.get(event)
+
+        if subscribers_set:
+            dispatch = self.__dispatcher(key)
+            for subscr in tuple(subscribers_set):
+                if isinstance(subscr, (AbstractWindow, FilterIndex)):
+                    self.__route(subscr, event, payload, key)
+                else:
+                    dispatch(subscr, event, payload)
+
+            if verbose:
+                logging.info("[Publish] %s [Payload] %s", event, payload)
+
+    def pub_many(self, event: str, payloads: Iterable[Any],
+                 verbose: bool = True, key: Hashable = None) -> None:
+        """Publishes a batch of payloads for the event.\n
+        Subscribers are resolved once and each of them receives the whole\n
+        batch in order through a single dispatch.
+
+        Parameters:
+        -----------
+        event: str
+            event which need to be published.
+
+        payloads: Iterable
+            payloads which need to be published.
+
+        verbose: Optional[bool]
+            used for logging purpose if False no log message are passed.
+
+        key: Optional[Hashable]
+            partition key of the whole batch.
+        """
+        payloads = list(payloads)
+        registry = metrics.active
+        if registry is not None:
+            registry.published(self.__name, event, len(payloads))
+
         subscribers_set: Set = self._handler.get(event)
 
         if subscribers_set:
-            for subscr in subscribers_set:
-                # print(f"Calling thread for {event} {payload}")
-                subscr(event, payload)
-                th = Thread(name=f"{event}", target=subscr,
-                            args=(event, payload), daemon=True)
-                th.start()
+            dispatch_many = self.__dispatcher(key, many=True)
+            for subscr in tuple(subscribers_set):
+                if isinstance(subscr, (AbstractWindow, FilterIndex)):
+                    self.__route_many(subscr, event, payloads, key)
+                else:
+                    dispatch_many(subscr, event, payloads)
 
             if verbose:
-                logging.info(f"[Publish] {event} [Payload] {payload}")
+                logging.info("[Publish] %s [Payloads] %d", event,
+                             len(payloads))
+
+    def __dispatcher(self, key: Hashable, many: bool = False) -> Callable:
+        dispatcher = self._dispatcher
+        if key is None:
+            return dispatcher.dispatch_many if many else dispatcher.dispatch
+        keyed = dispatcher.dispatch_many_keyed if many else \
+            dispatcher.dispatch_keyed
+        return lambda callback, event, payload: keyed(callback, event,
+                                                      payload, key)
+
+    def __route(self, subscr, event: str, payload: Any,
+                key: Hashable = None):
+        targets = subscr.match(_content(payload)) \
+            if isinstance(subscr, FilterIndex) else (subscr,)
+        for target in targets:
+            if isinstance(target, AbstractWindow):
+                target.offer(event, payload)
+            else:
+                self.__dispatcher(key)(target, event, payload)
+
+    def __route_many(self, subscr, event: str, payloads: list,
+                     key: Hashable = None):
+        if isinstance(subscr, AbstractWindow):
+            return subscr.offer_many(event, payloads)
+        # every matched subscriber gets its payloads as one batch.
+        batches = dict()
+        for payload in payloads:
+            for target in subscr.match(_content(payload)):
+                batches.setdefault(target, []).append(payload)
+        dispatch_many = self.__dispatcher(key, many=True)
+        for target, batch in batches.items():
+            if isinstance(target, AbstractWindow):
+                target.offer_many(event, batch)
+            else:
+                dispatch_many(target, event, batch)
+
+    def __filter_index(self, event: str, create: bool) -> FilterIndex:
+        if create:
+            # found or added under the writer lock of the registry, two
+            # concurrent subscriptions share one index.
+            return self._handler.find_or_add(event, FilterIndex, FilterIndex)
+        try:
+            handlers = self._handler[event]
+        except KeyError:
+            handlers = ()
+        for handler in handlers:
+            if isinstance(handler, FilterIndex):
+                return handler
+        return None
 
     @abstractmethod
-    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True) -> Union[None, TypeError]:
+    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True,
+            window: AbstractWindow = None, where: Dict[str, Any] = None,
+            budget: Budget = None) -> Union[None, TypeError]:
         """Subscribes event with callback.\n
         Here it checks if callback is not callable then raises TypeError \n
         else returns None.
@@ -84,10 +473,29 @@ class AbstractSubpub(ABC):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        window: Optional[AbstractWindow]
+            Conflate, Throttle or Debounce window collapsing the payloads\n
+            of high-frequency events before they are dispatched.
+
+        where: Optional[dict]
+            content filter on payload fields, only matching payloads are\n
+            dispatched, e.g. {"symbol": "EURUSD", "qty": {">": 0}}. See\n
+            `compile_where` for the conditions.
+
+        budget: Optional[Budget]
+            execution budget isolating or tripping the subscription when\n
+            its callback keeps running late or raising.
         """
 
         if not callable(callback):
             raise TypeError(f"{type(callback)} is not Callable")
+        if window is not None and not isinstance(window, AbstractWindow):
+            raise TypeError(f"{window} is not an AbstractWindow")
+        if where is not None:
+            compile_where(where)
+        if budget is not None and not isinstance(budget, Budget):
+            raise TypeError(f"{budget} is not a Budget")
         args = inspect.getfullargspec(callback)
 
         required_args = 2
@@ -96,13 +504,22 @@ class AbstractSubpub(ABC):
             required_args += 1
 
         if len(args.args) == required_args:
-            if event not in self._handler:
-                self._handler[event] = set()
-            self._handler[event].add(callback)
+            if inspect.ismethod(callback):
+                # the subscription must not keep the object of a bound
+                # method alive, it is unsubscribed once that is collected.
+                callback = WeakCallback(
+                    callback, lambda weak: self.__forget(event, weak))
+            if budget is not None:
+                callback = budget.bind(callback, self.__name)
+            if window is not None:
+                callback = window.bind(callback, self._dispatcher)
+            if where is None:
+                self._handler.add(event, callback)
+            else:
+                self.__filter_index(event, create=True).add(callback, where)
 
             if verbose:
-                logging.info('[Subscribe] {0} assigned to {1}'.format(
-                    callback, event))
+                logging.info('[Subscribe] %s assigned to %s', callback, event)
         else:
             raise TypeError("Callback require two arguments")
 
@@ -122,23 +539,350 @@ class AbstractSubpub(ABC):
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
         """
-        if event in self._handler:
-            if handler in self._handler[event]:
-                self._handler[event].remove(handler)
-
-                if verbose:
-                    logging.info('[Unubscribe] {0} assigned to {1}'.format(
-                        handler, event))
-                return
+        windows = self.__bound_windows(event, handler)
+        removed = self._handler.remove(event, handler)
+        if not removed:
+            index = self.__filter_index(event, create=False)
+            # an emptied index stays registered, a concurrent sub may be
+            # adding to it.
+            removed = index is not None and index.remove(handler)
+        if removed:
+            # timers scheduled by the window fire without dispatching.
+            for window in windows:
+                window.cancel()
+            if verbose:
+                logging.info('[Unubscribe] %s assigned to %s', handler, event)
+            return
         raise ValueError(f"{handler} is not subscribed with {event}")
 
+    def __bound_windows(self, event: str, handler: Any) -> list:
+        try:
+            handlers = self._handler[event]
+        except KeyError:
+            return []
+        windows = []
+        for subscr in handlers:
+            for target in subscr if isinstance(subscr, FilterIndex) \
+                    else (subscr,):
+                if isinstance(target, AbstractWindow) and target == handler:
+                    windows.append(target)
+        return windows
+
+    def request(self, event: str, payload: Any, timeout: float = None,
+                inbox: Inbox = None, key: Hashable = None) -> Future:
+        """Publishes a request and returns the Future of its first reply.
+
+        Responders receive a `Request` as payload and answer it with\n
+        `request.reply(value)`, which completes the future directly. The\n
+        future raises TimeoutError when no reply arrived within timeout\n
+        and LookupError when nobody subscribes to the event, or when no\n
+        `where` filter of its responders accepts payload. Filters are\n
+        matched against payload, not the Request.
+
+        Parameters:
+        -----------
+        event: str
+            event which need to be published.
+
+        payload: Any
+            payload of the request, `request.payload` of the responders.
+
+        timeout: Optional[float]
+            seconds to wait for the reply, None waits forever.
+
+        inbox: Optional[Inbox]
+            reply inbox of the caller, defaults to the inbox of the bus.
+
+        key: Optional[Hashable]
+            partition key, see `pub`.
+        """
+        return self.__request(event, payload, timeout, inbox, key, False,
+                              None)
+
+    def scatter(self, event: str, payload: Any, timeout: float = None,
+                replies: int = None, inbox: Inbox = None,
+                key: Hashable = None) -> Future:
+        """Publishes a request to every responder and returns the Future\n
+        of the list of their replies, in arrival order. It completes once\n
+        `replies` replies arrived or timeout expired, whichever comes\n
+        first, with the replies received so far.
+
+        Parameters:
+        -----------
+        event: str
+            event which need to be published.
+
+        payload: Any
+            payload of the request.
+
+        timeout: Optional[float]
+            seconds to gather replies.
+
+        replies: Optional[int]
+            number of replies completing the gather.
+
+        inbox: Optional[Inbox]
+            reply inbox of the caller, defaults to the inbox of the bus.
+
+        key: Optional[Hashable]
+            partition key, see `pub`.
+        """
+        return self.__request(event, payload, timeout, inbox, key, True,
+                              replies)
+
+    async def arequest(self, event: str, payload: Any,
+                       timeout: float = None, inbox: Inbox = None,
+                       key: Hashable = None) -> Any:
+        """Awaitable flavour of `request`, returns the reply."""
+        return await asyncio.wrap_future(
+            self.request(event, payload, timeout, inbox, key))
+
+    @property
+    def inbox(self) -> Inbox:
+        """Default reply inbox of the bus."""
+        inbox = self.__dict__.get("_inbox")
+        if inbox is None:
+            with AbstractSubpub._shared_lock:
+                inbox = self.__dict__.setdefault("_inbox", Inbox())
+        return inbox
+
+    def __request(self, event: str, payload: Any, timeout: float,
+                  inbox: Inbox, key: Hashable, gather: bool,
+                  replies: int) -> Future:
+        if inbox is None:
+            inbox = self.inbox
+        elif not isinstance(inbox, Inbox):
+            raise TypeError(f"{inbox} is not an Inbox")
+        request, future = inbox.open(payload, timeout, gather, replies)
+        if not self.__responds(event, payload):
+            inbox.finish(request.correlation_id)
+            return future
+        self.pub(event, request, verbose=False, key=key)
+        return future
+
+    def __responds(self, event: str, payload: Any) -> bool:
+        # an emptied FilterIndex stays registered, it only counts when one
+        # of its filters accepts the payload.
+        for subscr in self._handler.get(event) or ():
+            if not isinstance(subscr, FilterIndex) or subscr.match(payload):
+                return True
+        return False
+
+    def __forget(self, event: str, callback: WeakCallback):
+        try:
+            self.unsub(event, callback, verbose=False)
+        except ValueError:
+            pass
+
+    def _owns(self, event: str, callback: Callable) -> bool:
+        """True when callback is subscribed to event on this bus."""
+        subscribers = self._handler.get(event) or ()
+        return callback in subscribers or any(
+            callback in subscr for subscr in subscribers
+            if isinstance(subscr, FilterIndex))
+
+    def _metrics(self, high_watermarks):
+        bus = self.__name
+        for event, stats in metrics.event_stats(self._handler).items():
+            yield bus, event, stats
+
+
+def _content(payload: Any) -> Any:
+    # filters of responders apply to the payload of a request.
+    return payload.payload if isinstance(payload, Request) else payload
+
+
+class AbstractOverflowPolicy(ABC):
+    """Abstract overflow policy of a subscriber queue.
+
+    The policy decides what `notify` does when the subscriber queue is\n
+    full and counts every message it drops.
+
+    Attributes:
+    -----------
+    dropped: int
+        number of messages dropped by the policy.
+
+    Methods:
+    --------
+    @abstractmethod\n
+    put(q, message)
+        put message into q, returns False when a message was dropped.
+
+    put_many(q, messages)
+        put every message into q.
+
+    offer_many(q, messages)
+        put every message into q without waiting.
+
+    make_queue(maxsize)
+        create the default queue of a subscriber using this policy.
+
+    validate(q)
+        raise ValueError when q cannot be used with this policy.
+    """
+
+    def __init__(self):
+        self.__dropped = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    def _count_drop(self, count: int = 1):
+        with self.__lock:
+            self.__dropped += count
+
+    def make_queue(self, maxsize: int) -> Queue:
+        return Queue(maxsize=maxsize)
+
+    def validate(self, q: Queue):
+        pass
+
+    @abstractmethod
+    def put(self, q: Queue, message: Any) -> bool:
+        """Puts message into q according to the policy.
+
+        Parameters:
+        -----------
+        q: Queue
+            subscriber queue.
+
+        message: Any
+            message which need to be delivered.
+        """
+
+    def put_many(self, q: Queue, messages: Iterable[Any]):
+        put = self.put
+        for message in messages:
+            put(q, message)
+
+    def offer_many(self, q: Queue, messages: Iterable[Any]):
+        """Puts messages into q without ever waiting, the ones that do\n
+        not fit are dropped and counted. Used to replay retained messages\n
+        in the thread attaching the subscriber, which cannot drain q."""
+        for message in messages:
+            try:
+                q.put_nowait(message)
+            except Full:
+                self._count_drop()
+
+
+class AbstractRetainedStore(ABC):
+    """Abstract store of the messages a channel retains for subscribers\n
+    attaching later. Stores are bounded and updated in O(1) per message.
+
+    Methods:
+    --------
+    @abstractmethod\n
+    update(message)
+        remember a published message.
+
+    update_many(messages)
+        remember every message.
+
+    @abstractmethod\n
+    messages()
+        return the retained messages, oldest first.
+
+    @abstractmethod\n
+    clear()
+        forget every retained message.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def update(self, message: Any):
+        pass
+
+    def update_many(self, messages: Iterable[Any]):
+        update = self.update
+        for message in messages:
+            update(message)
+
+    @abstractmethod
+    def messages(self) -> list:
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def __len__(self) -> int:
+        return len(self.messages())
+
+
+class AbstractCodec(ABC):
+    """Abstract serialization codec of the transports crossing the process.
+
+    An encoded record is a (kind, data) pair, kind tells which codec\n
+    decodes it. The kind is chosen by the sender, receivers of records\n
+    from untrusted peers decode them with the codec they expect, see\n
+    `accepts`, pickle and marshal execute or trust what they load.
+
+    Attributes:
+    -----------
+    name: str
+        name the codec is selected with, e.g. "json".
+
+    kinds: Tuple[int, ...]
+        record kinds the codec decodes, unique among registered codecs.
+
+    Methods:
+    --------
+    @abstractmethod\n
+    encode(message)
+        return the (kind, data) record of message, data is a bytes-like\n
+        object or a list of them.
+
+    @abstractmethod\n
+    decode(kind, view)
+        return the message of a record.
+
+    accepts(kind)
+        return True when records of kind are expected from this codec.
+    """
+    name: str
+    kinds: tuple
+
+    @abstractmethod
+    def encode(self, message: Any):
+        pass
+
+    @abstractmethod
+    def decode(self, kind: int, view: memoryview) -> Any:
+        pass
+
+    def accepts(self, kind: int) -> bool:
+        return kind in self.kinds
+
+    def __repr__(self) -> str:
+        return "{}({!r})".format(type(self).__name__, self.name)
+
 
 class AbstractSubscriber(ABC):
+    # True for subscribers forwarding messages out of the process, channels
+    # hand them messages as Frames encoded once per publish.
+    encoded = False
 
-    def __init__(self, manager, channels: Set = None, q: Queue = None, default_queue_size=150):
+    def __init__(self, manager, channels: Set = None, q: Queue = None, default_queue_size=150,
+                 overflow: AbstractOverflowPolicy = None):
         self.__manager = manager
+        self.__patterns = set()
         self.__init_channels(channels)
+        self.__init_overflow(overflow)
         self.__init_q(q, default_queue_size)
+        self.__watchers = ()
+        self.__signal = None
+        self.__watch_lock = threading.Lock()
+
+    def __init_overflow(self, overflow: AbstractOverflowPolicy = None):
+        if not isinstance(overflow, AbstractOverflowPolicy):
+            raise TypeError(f"{overflow} is not an AbstractOverflowPolicy")
+        self.__overflow = overflow
 
     def __init_q(self, q: Queue = None, default_queue_size=150):
         if not isinstance(q, Queue) and q is not None:
@@ -147,7 +891,8 @@ class AbstractSubscriber(ABC):
                 Please check https://docs.python.org/3/library/queue.html#queue-objects for reference.
                 """)
         if not q:
-            q = Queue(maxsize=default_queue_size)
+            q = self.__overflow.make_queue(default_queue_size)
+        self.__overflow.validate(q)
         self.__q = q
 
     def __init_channels(self, channels: Set = None):
@@ -164,19 +909,111 @@ class AbstractSubscriber(ABC):
     @abstractmethod
     def get_message(self, block: bool = False):
         if block:
-            return self.__q.get()
-
-        if self.__q.empty():
+            message = self.__q.get()
+        elif self.__q.empty():
             return None
-        return self.__q.get_nowait()
+        else:
+            message = self.__q.get_nowait()
+        if self.__signal is not None:
+            self.__drained()
+        return message
+
+    def get_messages(self, max_n: int, block: bool = False,
+                     timeout: float = None):
+        """Returns up to max_n pending messages as a list.
+
+        Parameters:
+        -----------
+        max_n: int
+            upper bound of messages returned.
+
+        block: Optional[bool]
+            if True wait for at least one message.
+
+        timeout: Optional[float]
+            seconds to wait when block is True, an empty list is\n
+            returned when nothing arrived.
+        """
+        q = self.__q
+        if hasattr(q, 'get_many'):
+            try:
+                messages = q.get_many(max_n, block, timeout)
+            except Empty:
+                return []
+        else:
+            messages = get_many(q, max_n, block, timeout)
+        if self.__signal is not None:
+            self.__drained()
+        return messages
 
     @abstractmethod
     def listen(self):
-        yield next(self)
+        while True:
+            yield next(self)
 
     @abstractmethod
     def notify(self, message: AnyStr):
-        self.__q.put(message)
+        self.__overflow.put(self.__q, message)
+        for watcher in self.__watchers:
+            watcher(self)
+        registry = metrics.active
+        if registry is not None:
+            registry.observe_queue(self, self.__q.qsize())
+
+    def notify_many(self, messages: Iterable[AnyStr]):
+        self.__overflow.put_many(self.__q, messages)
+        for watcher in self.__watchers:
+            watcher(self)
+        registry = metrics.active
+        if registry is not None:
+            registry.observe_queue(self, self.__q.qsize())
+
+    def replay(self, messages: Iterable[AnyStr]):
+        """Delivers retained messages when the subscriber attaches, it\n
+        never waits for room in the queue, see `offer_many`."""
+        self.__overflow.offer_many(self.__q, messages)
+        for watcher in self.__watchers:
+            watcher(self)
+        registry = metrics.active
+        if registry is not None:
+            registry.observe_queue(self, self.__q.qsize())
+
+    def fileno(self) -> int:
+        """File descriptor readable while messages are pending, for\n
+        `selectors` and event loops, e.g. `loop.add_reader`. It is created\n
+        on first use and closed with the subscriber."""
+        with self.__watch_lock:
+            if self.__signal is None:
+                signal = _Signal()
+                weakref.finalize(self, signal.close)
+                self.__signal = signal
+                self.__watchers += (self.__raise_signal,)
+        if not self.__q.empty():
+            self.__signal.set()
+        return self.__signal.fileno()
+
+    def __raise_signal(self, subscriber):
+        self.__signal.set()
+
+    def __drained(self):
+        # clear the signal once empty, a message put meanwhile found it
+        # still set so it is raised again here.
+        if self.__q.empty():
+            self.__signal.clear()
+            if not self.__q.empty():
+                self.__signal.set()
+
+    def _watch(self, watcher: Callable[["AbstractSubscriber"], None]):
+        """Calls watcher(subscriber) after every notify."""
+        with self.__watch_lock:
+            self.__watchers += (watcher,)
+
+    def _unwatch(self, watcher: Callable[["AbstractSubscriber"], None]):
+        with self.__watch_lock:
+            watchers = list(self.__watchers)
+            if watcher in watchers:
+                watchers.remove(watcher)
+            self.__watchers = tuple(watchers)
 
     @abstractmethod
     def add_channel(self, *args):
@@ -196,16 +1033,59 @@ class AbstractSubscriber(ABC):
                 if self.__manager:
                     self.__manager.remove(channel, self)
                 self.__channels.remove(channel)
-        if len(self) == 0:
-            del self
+
+    def add_pattern(self, *args):
+        """Subscribes to every channel matching a topic pattern, existing\n
+        ones and ones created later. Channel names are words separated by\n
+        dots, `*` matches one word and `#` matches zero or more words,\n
+        e.g. `orders.*.fx.#`. Channels with a buffer of their own,\n
+        RingBufferChannel, SharedMemoryChannel and DurableChannel, only\n
+        deliver to subscribers reading their reader(), a pattern skips\n
+        them with a warning."""
+        if len(args) == 0:
+            raise ValueError('Require pattern or patterns to add_pattern')
+        for pattern in args:
+            split_topic_pattern(pattern)
+            if self.__manager:
+                self.__manager.add_pattern(pattern, self)
+            self.__patterns.add(pattern)
+
+    def remove_pattern(self, *args):
+        if len(args) == 0:
+            raise ValueError('Require pattern or patterns to remove_pattern')
+        for pattern in args:
+            if pattern in self.__patterns:
+                if self.__manager:
+                    self.__manager.remove_pattern(pattern, self)
+                self.__patterns.remove(pattern)
 
     @property
     def channels(self):
         return self.__channels
 
+    @property
+    def patterns(self):
+        return self.__patterns
+
+    @property
+    def queue(self) -> Queue:
+        return self.__q
+
+    @property
+    def overflow(self) -> AbstractOverflowPolicy:
+        return self.__overflow
+
+    @property
+    def dropped(self) -> int:
+        return self.__overflow.dropped + getattr(self.__q, 'dropped', 0)
+
     def is_empty(self):
         return self.__q.empty()
 
+    def qsize(self) -> int:
+        """Approximate number of pending messages."""
+        return self.__q.qsize()
+
     def __len__(self):
         return len(self.__channels)
 
@@ -213,7 +1093,10 @@ class AbstractSubscriber(ABC):
         return self
 
     def __next__(self):
-        return self.__q.get()
+        message = self.__q.get()
+        if self.__signal is not None:
+            self.__drained()
+        return message
 
 
 class AbstractPublisher(ABC):
@@ -227,11 +1110,28 @@ class AbstractPublisher(ABC):
             return self.__manager.publish(channel, message)
         raise TypeError(f"Manager is not defined yet.")
 
+    def publish_many(self, channel: AnyStr, messages: Iterable[AnyStr]):
+        if self.__manager:
+            return self.__manager.publish_many(channel, messages)
+        raise TypeError(f"Manager is not defined yet.")
+
 
 class AbstractChannel(ABC):
+    """Abstract channel delivering published messages to its subscribers.
+
+    Subscribers are held through weak references, a subscriber nobody\n
+    references anymore is detached once it is collected instead of piling\n
+    up in the channel. `_emptied(channel)`, when set, is called after the\n
+    last subscriber was collected.
+    """
 
     def __init__(self, name: AnyStr):
-        self.__subscribers = set()
+        # copy-on-write: attach and detach swap the frozenset of weak
+        # references under the lock, publishers iterate the current one
+        # without locking.
+        self.__refs = frozenset()
+        self.__subscribers_lock = threading.Lock()
+        self._emptied = None
         self.__init_name(name)
 
     def __init_name(self, name: AnyStr):
@@ -246,23 +1146,59 @@ class AbstractChannel(ABC):
     def name(self):
         return self.__name
 
+    @property
+    def subscribers(self) -> frozenset:
+        subscribers = (ref() for ref in self.__refs)
+        return frozenset(subscriber for subscriber in subscribers
+                         if subscriber is not None)
+
+    @property
+    def _subscriber_refs(self) -> frozenset:
+        """Weak references to the subscribers, dereference them while\n
+        iterating, collected ones return None."""
+        return self.__refs
+
     @name.setter
     def name(self, value: AnyStr):
         self.__name = value
 
     @abstractmethod
     def attach(self, subscriber: AbstractSubscriber):
-        self.__subscribers.add(subscriber)
+        with self.__subscribers_lock:
+            if weakref.ref(subscriber) not in self.__refs:
+                self.__refs = self.__refs | {
+                    _reaper.ref(subscriber, self.__collected)}
 
     @abstractmethod
     def detach(self, subscriber: AbstractSubscriber):
-        if subscriber in self.__subscribers:
-            self.__subscribers.remove(subscriber)
+        with self.__subscribers_lock:
+            ref = weakref.ref(subscriber)
+            if ref in self.__refs:
+                self.__refs = self.__refs - {ref}
+
+    def __collected(self, ref: weakref.ref):
+        # runs on the reaper thread, a dead reference only equals itself.
+        with self.__subscribers_lock:
+            if ref not in self.__refs:
+                return
+            self.__refs = self.__refs - {ref}
+            emptied = not any(ref() is not None for ref in self.__refs)
+        if emptied and self._emptied is not None:
+            self._emptied(self)
 
     @abstractmethod
     def on_message(self, message):
-        for subscr in self.__subscribers:
-            subscr.notify(message)
+        for ref in self.__refs:
+            subscr = ref()
+            if subscr is not None:
+                subscr.notify(message)
+
+    def on_messages(self, messages: Iterable):
+        messages = list(messages)
+        for ref in self.__refs:
+            subscr = ref()
+            if subscr is not None:
+                subscr.notify_many(messages)
 
 
 class AbstractChannelManager(ABC):
@@ -279,3 +1215,16 @@ class AbstractChannelManager(ABC):
     @abstractmethod
     def publish(self, channel_name, msg):
         pass
+
+    @abstractmethod
+    def add_pattern(self, pattern: AnyStr, subscriber: AbstractSubscriber):
+        pass
+
+    @abstractmethod
+    def remove_pattern(self, pattern: AnyStr,
+                       subscriber: AbstractSubscriber) -> bool:
+        pass
+
+    def publish_many(self, channel_name, msgs: Iterable):
+        for msg in msgs:
+            self.publish(channel_name, msg)
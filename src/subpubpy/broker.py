@@ -0,0 +1,342 @@
+"""Standalone broker hosting the channels of this process for remote\n
+publishers and subscribers, run it with `python -m subpubpy.broker`."""
+import argparse
+import logging
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+from queue import Queue
+from threading import Lock, Thread
+from typing import Any, Callable, Iterable, Union
+from . import protocol
+from .abstract import AbstractOverflowPolicy, AbstractCodec
+from .manager import _ChannelManager
+from .policies import BlockPolicy
+from .serialization import Frame, get_codec
+from .subscribers import SimpleSubscriber
+from .utils import get_many, split_topic_pattern
+
+# records of one channel written as a single MESSAGE frame at most.
+_MAX_BATCH_BYTES = 1 << 20
+
+
+class _Forwarder(SimpleSubscriber):
+    """Subscription of a session, puts the Frames of its messages into the\n
+    outbound queue the session writes to its socket."""
+    encoded = True
+
+    def __init__(self, session: "_Session", subscription: str, q: Queue,
+                 overflow: AbstractOverflowPolicy):
+        super().__init__(q=q, overflow=overflow)
+        self.__session = session
+        self.__subscription = subscription
+
+    def __frame(self, message: Any) -> Frame:
+        # channels other than SimpleChannel pass messages, they have no
+        # channel name and are delivered under the subscription.
+        return Frame.of(message, channel=self.__subscription)
+
+    def notify(self, message: Any):
+        if not self.__session.closed:
+            super().notify(self.__frame(message))
+
+    def notify_many(self, messages):
+        if not self.__session.closed:
+            super().notify_many([self.__frame(message)
+                                 for message in messages])
+
+    def replay(self, messages):
+        if not self.__session.closed:
+            super().replay([self.__frame(message) for message in messages])
+
+
+class _Session(socketserver.BaseRequestHandler):
+    """One client connection, frames are read and executed in order on the\n
+    handler thread, deliveries are batched by a writer thread."""
+
+    def setup(self):
+        broker = self.server.broker
+        if self.request.family != socket.AF_UNIX:
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.closed = False
+        self.finished = False
+        self.outbound = Queue(maxsize=broker.queue_size)
+        self.forwarders = dict()
+        self.manager = _ChannelManager()
+        self.writer = Thread(target=self.__write, daemon=True,
+                             name="subpub-broker-writer")
+        self.writer.start()
+        broker._sessions.add(self)
+
+    def handle(self):
+        broker = self.server.broker
+        rfile = self.request.makefile("rb", buffering=1 << 16)
+        try:
+            while not self.closed:
+                frame = protocol.read_frame(rfile, broker.max_frame_size)
+                if frame is None:
+                    break
+                self.__execute(*frame)
+        except (OSError, ValueError, UnicodeDecodeError) as exc:
+            logging.info("[Broker] closing %s: %s", self.client_address, exc)
+            self.__control(protocol.ERROR, str(exc))
+        finally:
+            rfile.close()
+
+    def finish(self):
+        self.closed = True
+        for (pattern, name), forwarder in list(self.forwarders.items()):
+            if pattern:
+                forwarder.remove_pattern(name)
+            else:
+                forwarder.remove_channel(name)
+        self.forwarders.clear()
+        # the writer stops once it wrote, or discarded, what is queued.
+        self.finished = True
+        self.writer.join(5)
+        self.server.broker._sessions.discard(self)
+
+    def __execute(self, opcode: int, body: memoryview):
+        if opcode == protocol.PUBLISH:
+            channel, records = protocol.parse_batch(body)
+            accepted = self.server.broker.accepted
+            if accepted is not None:
+                for kind, _ in records:
+                    if not any(codec.accepts(kind) for codec in accepted):
+                        raise ValueError(f"record kind {kind} is not "
+                                         "accepted by this broker")
+            # local subscribers decode with the codec of the channel.
+            expect = self.manager.codec(channel)
+            self.manager.publish_many(channel, [
+                Frame(kind, data, channel, expect=expect)
+                for kind, data in records])
+        elif opcode in (protocol.SUBSCRIBE, protocol.SUBSCRIBE_PATTERN):
+            self.__subscribe(protocol.parse_name(body),
+                             opcode == protocol.SUBSCRIBE_PATTERN)
+        elif opcode in (protocol.UNSUBSCRIBE, protocol.UNSUBSCRIBE_PATTERN):
+            self.__unsubscribe(protocol.parse_name(body),
+                               opcode == protocol.UNSUBSCRIBE_PATTERN)
+        elif opcode == protocol.PING:
+            self.outbound.put(protocol.token_frame(
+                protocol.PONG, protocol.parse_token(body)))
+        else:
+            raise ValueError(f"unknown opcode {opcode}")
+
+    def __subscribe(self, name: str, pattern: bool):
+        if (pattern, name) in self.forwarders:
+            return
+        broker = self.server.broker
+        forwarder = _Forwarder(self, name, self.outbound, broker.overflow())
+        if pattern:
+            split_topic_pattern(name)
+            forwarder.add_pattern(name)
+        else:
+            forwarder.add_channel(name)
+        self.forwarders[(pattern, name)] = forwarder
+
+    def __unsubscribe(self, name: str, pattern: bool):
+        forwarder = self.forwarders.pop((pattern, name), None)
+        if forwarder is None:
+            return
+        if pattern:
+            forwarder.remove_pattern(name)
+        else:
+            forwarder.remove_channel(name)
+
+    def __control(self, opcode: int, text: str):
+        data = text.encode()
+        try:
+            self.outbound.put_nowait(protocol.frame(opcode, [data], len(data)))
+        except Exception:
+            pass
+
+    def __write(self):
+        sock, q = self.request, self.outbound
+        failed = False
+        while True:
+            items = get_many(q, 4096, block=True, timeout=0.2)
+            if not items:
+                if self.finished:
+                    return
+                continue
+            if failed:
+                # keep draining so publishers blocked on the queue resume.
+                continue
+            try:
+                protocol.send_parts(sock, self.__frames(items))
+            except OSError:
+                failed = self.closed = True
+
+    @staticmethod
+    def __frames(items):
+        # items are Frames or the parts of a control frame.
+        parts, batch, batch_channel, batch_size = [], [], None, 0
+        for item in items:
+            control = not isinstance(item, Frame)
+            if batch and (control or item.channel != batch_channel or
+                          batch_size > _MAX_BATCH_BYTES):
+                parts += protocol.batch_frame(protocol.MESSAGE,
+                                              batch_channel, batch)
+                batch, batch_size = [], 0
+            if control:
+                parts += item
+                continue
+            batch_channel = item.channel
+            batch.append((item.kind, item.parts, item.nbytes))
+            batch_size += item.nbytes
+        if batch:
+            parts += protocol.batch_frame(protocol.MESSAGE, batch_channel,
+                                          batch)
+        return parts
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCP6Server(_TCPServer):
+    address_family = socket.AF_INET6
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class Broker:
+    """Serves the channels of this process to remote clients over TCP or\n
+    a Unix socket using the protocol of `subpubpy.protocol`.
+
+    Remote publishes are forwarded to subscribers as encoded Frames,\n
+    the broker never decodes them, local subscribers of its channels\n
+    decode them lazily through `frame.message` with the codec of the\n
+    channel. Deliveries to a client are batched into MESSAGE frames\n
+    written with scatter-gather I/O.
+
+    A record's codec is chosen by its publisher. Brokers reachable by\n
+    untrusted clients restrict `codecs`, e.g. to ("json",), pickle and\n
+    marshal records can execute code wherever they are decoded.
+
+    Parameters:
+    -----------
+    address: Union[Tuple[str, int], str]
+        (host, port) to listen on, port 0 picks a free one, or the path\n
+        of a Unix socket.
+
+    queue_size: int
+        deliveries buffered per client before the overflow policy applies.
+
+    overflow: Callable[[], AbstractOverflowPolicy]
+        creates the overflow policy of each client subscription,\n
+        BlockPolicy by default.
+
+    max_frame_size: int
+        larger frames close the connection.
+
+    codecs: Optional[Iterable[Union[str, AbstractCodec]]]
+        codecs clients may publish with, a record of another kind closes\n
+        the connection. None accepts every registered codec.
+    """
+
+    def __init__(self, address=("127.0.0.1", 7600), queue_size: int = 10000,
+                 overflow: Callable[[], AbstractOverflowPolicy] = None,
+                 max_frame_size: int = protocol.MAX_FRAME_SIZE,
+                 codecs: Iterable[Union[str, AbstractCodec]] = None):
+        if queue_size <= 0:
+            raise ValueError("queue_size must be greater than 0")
+        family, address = protocol.parse_address(address)
+        self.queue_size = queue_size
+        self.overflow = overflow or BlockPolicy
+        self.max_frame_size = max_frame_size
+        self.accepted = None if codecs is None else \
+            tuple(get_codec(codec) for codec in codecs)
+        self._sessions = set()
+        self.__path = None
+        if family == socket.AF_UNIX:
+            if os.path.exists(address) and \
+                    stat.S_ISSOCK(os.stat(address).st_mode):
+                os.unlink(address)
+            self.__path = address
+            server = _UnixServer(address, _Session)
+        elif family == socket.AF_INET6:
+            server = _TCP6Server(address, _Session)
+        else:
+            server = _TCPServer(address, _Session)
+        server.broker = self
+        self.__server = server
+        self.__thread = None
+        self.__lock = Lock()
+
+    @property
+    def address(self):
+        return self.__server.server_address
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        self.__server.serve_forever(poll_interval)
+
+    def start(self) -> "Broker":
+        """Serves from a daemon thread."""
+        with self.__lock:
+            if self.__thread is None:
+                self.__thread = Thread(target=self.serve_forever,
+                                       name="subpub-broker", daemon=True)
+                self.__thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        """Stops serving and closes every client connection."""
+        with self.__lock:
+            if self.__thread is not None:
+                self.__server.shutdown()
+                self.__thread.join()
+                self.__thread = None
+        self.__server.server_close()
+        for session in list(self._sessions):
+            try:
+                session.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.__path is not None and os.path.exists(self.__path):
+            os.unlink(self.__path)
+
+    def __enter__(self) -> "Broker":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m subpubpy.broker",
+                                     description="Runs a subpubpy broker.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7600)
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--queue-size", type=int, default=10000,
+                        help="deliveries buffered per client")
+    parser.add_argument("--codec", action="append", dest="codecs",
+                        help="codec clients may publish with, repeatable, "
+                             "every registered codec when omitted")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    broker = Broker(args.unix or (args.host, args.port), args.queue_size,
+                    codecs=args.codecs)
+    logging.info("[Broker] listening on %s", broker.address)
+    # stop like on Ctrl-C, so the Unix socket is removed.
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Execution budgets isolating slow or failing subscriptions from the\n
+healthy ones of the same bus."""
+import time
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+from typing import Any, Callable, Dict
+from .utils import report_exception
+from . import metrics
+
+# seconds an idle isolated lane keeps its worker thread.
+_IDLE_TIMEOUT = 5.0
+
+
+class Budget:
+    """Execution budget of one subscription, pass it to `sub(budget=...)`.
+
+    A call taking longer than `timeout` seconds, or raising, is a strike.\n
+    After `max_strikes` strikes in a row the subscription leaves the bus\n
+    dispatcher for an isolated lane, a worker thread of its own with a\n
+    bounded queue, so it no longer delays the other subscriptions.\n
+    `max_strikes` calls in budget in a row on the lane move it back.
+    Strikes on the lane, or a lane call still running after `timeout`,\n
+    trip the subscription. Its payloads are then rejected for `cooldown`\n
+    seconds before it gets another chance on the lane.
+
+    A subscription never occupies more than one dispatcher thread, its\n
+    payloads published while a call is running go to the lane, and a\n
+    call overrunning `timeout` isolates it at once. Python cannot\n
+    interrupt a running callback, the thread of an overrunning call is\n
+    released when the callback returns.
+
+    Exceptions of a budgeted callback are reported and never reach the\n
+    publisher. A Budget guards a single subscription, it compares equal\n
+    to its callback so `unsub(event, callback)` removes it.
+
+    Attributes:
+    -----------
+    timeout: float
+        seconds a call may take.
+
+    max_strikes: int
+        consecutive strikes isolating or tripping the subscription.
+
+    cooldown: float
+        seconds a tripped subscription rejects its payloads.
+
+    lane_size: int
+        capacity of the isolated lane, payloads are dropped when it is\n
+        full.
+
+    state: str
+        "closed", "isolated" or "open" (tripped).
+
+    stats: dict
+        counters of calls, exceeded budgets, errors, timeouts, rejected\n
+        and dropped payloads, isolations and trips.
+    """
+    CLOSED = "closed"
+    ISOLATED = "isolated"
+    OPEN = "open"
+
+    def __init__(self, timeout: float, max_strikes: int = 3,
+                 cooldown: float = 5.0, lane_size: int = 1000):
+        if timeout <= 0:
+            raise ValueError("timeout must be greater than 0")
+        if max_strikes <= 0:
+            raise ValueError("max_strikes must be greater than 0")
+        if cooldown < 0:
+            raise ValueError("cooldown must not be negative")
+        if lane_size <= 0:
+            raise ValueError("lane_size must be greater than 0")
+        self.__timeout = timeout
+        self.__max_strikes = max_strikes
+        self.__cooldown = cooldown
+        self.__lane = Queue(maxsize=lane_size)
+        self.__lock = Lock()
+        self.__callback = None
+        self.__bus = None
+        self.__worker = None
+        self.__state = Budget.CLOSED
+        self.__strikes = 0
+        self.__passes = 0
+        self.__opened_at = 0.0
+        self.__inflight_since = None
+        self.__running_since = None
+        self.__counters = dict.fromkeys(
+            ("calls", "exceeded", "errors", "timeouts", "rejected",
+             "dropped", "isolations", "trips"), 0)
+
+    @property
+    def timeout(self) -> float:
+        return self.__timeout
+
+    @property
+    def max_strikes(self) -> int:
+        return self.__max_strikes
+
+    @property
+    def cooldown(self) -> float:
+        return self.__cooldown
+
+    @property
+    def lane_size(self) -> int:
+        return self.__lane.maxsize
+
+    @property
+    def callback(self) -> Callable[[str, Any], None]:
+        return self.__callback
+
+    @property
+    def state(self) -> str:
+        return self.__state
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self.__lock:
+            stats = dict(self.__counters)
+        stats["state"] = self.__state
+        return stats
+
+    def bind(self, callback: Callable[[str, Any], None],
+             bus: str = None) -> "Budget":
+        """Attaches the budget to the callback of its subscription, bus\n
+        names the bus in the metrics."""
+        with self.__lock:
+            if self.__callback is not None:
+                raise ValueError(f"{self!r} already guards a subscription")
+            self.__callback = callback
+            self.__bus = bus
+        return self
+
+    def __call__(self, event: str, payload: Any) -> None:
+        state = self.__state
+        if state == Budget.OPEN:
+            if time.monotonic() - self.__opened_at < self.__cooldown:
+                self.__count(event, "rejected")
+                return
+            with self.__lock:
+                if self.__state == Budget.OPEN:
+                    self.__state = Budget.ISOLATED
+            state = Budget.ISOLATED
+        if state == Budget.ISOLATED:
+            return self.__offer(event, payload)
+        now = time.monotonic()
+        with self.__lock:
+            since = self.__inflight_since
+            if since is None:
+                self.__inflight_since = now
+        if since is None:
+            return self.__run(event, payload, False)
+        if now - since > self.__timeout:
+            self.__count(event, "timeouts")
+            with self.__lock:
+                if self.__state == Budget.CLOSED:
+                    self.__isolate(event)
+        self.__offer(event, payload)
+
+    def __offer(self, event: str, payload: Any):
+        since = self.__running_since
+        if since is not None and time.monotonic() - since > self.__timeout:
+            # the lane is stuck in a call, queueing behind it is pointless.
+            self.__count(event, "timeouts")
+            with self.__lock:
+                self.__trip(event)
+            self.__count(event, "rejected")
+            return
+        try:
+            self.__lane.put_nowait((event, payload))
+        except Full:
+            self.__count(event, "dropped")
+            return
+        with self.__lock:
+            if self.__worker is None:
+                self.__worker = Thread(target=self.__work, daemon=True,
+                                       name="subpub-budget-lane")
+                self.__worker.start()
+
+    def __work(self):
+        lane = self.__lane
+        while True:
+            try:
+                event, payload = lane.get(timeout=_IDLE_TIMEOUT)
+            except Empty:
+                with self.__lock:
+                    if lane.empty():
+                        self.__worker = None
+                        return
+                continue
+            if self.__state == Budget.OPEN:
+                self.__count(event, "rejected")
+            else:
+                self.__run(event, payload, True)
+
+    def __run(self, event: str, payload: Any, isolated: bool):
+        start = time.monotonic()
+        if isolated:
+            self.__running_since = start
+        failed = False
+        try:
+            self.__callback(event, payload)
+        except Exception as exc:
+            failed = True
+            report_exception(exc, event, bus=self.__bus)
+        finally:
+            if isolated:
+                self.__running_since = None
+            else:
+                self.__inflight_since = None
+        exceeded = time.monotonic() - start > self.__timeout
+        self.__count(event, "calls")
+        if failed:
+            self.__count(event, "errors")
+        if exceeded:
+            self.__count(event, "exceeded")
+        with self.__lock:
+            self.__record(event, failed or exceeded, isolated)
+
+    def __record(self, event: str, strike: bool, isolated: bool):
+        # called with the lock held.
+        if not strike:
+            self.__strikes = 0
+            if isolated and self.__state == Budget.ISOLATED:
+                self.__passes += 1
+                if self.__passes >= self.__max_strikes:
+                    self.__state = Budget.CLOSED
+            return
+        self.__passes = 0
+        self.__strikes += 1
+        if self.__strikes < self.__max_strikes:
+            return
+        if self.__state == Budget.CLOSED:
+            self.__isolate(event)
+        elif isolated:
+            self.__trip(event)
+
+    def __isolate(self, event: str):
+        # called with the lock held.
+        self.__strikes = self.__passes = 0
+        self.__state = Budget.ISOLATED
+        self.__count(event, "isolations", locked=True)
+
+    def __trip(self, event: str):
+        # called with the lock held.
+        if self.__state == Budget.OPEN:
+            return
+        self.__strikes = self.__passes = 0
+        self.__opened_at = time.monotonic()
+        self.__state = Budget.OPEN
+        self.__count(event, "trips", locked=True)
+
+    def __count(self, event: str, name: str, locked: bool = False):
+        if locked:
+            self.__counters[name] += 1
+        else:
+            with self.__lock:
+                self.__counters[name] += 1
+        registry = metrics.active
+        if registry is not None:
+            registry.budget(self.__bus, event, name)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Budget):
+            other = other.callback
+        return self.__callback == other
+
+    def __hash__(self) -> int:
+        return hash(self.__callback)
+
+    def __repr__(self) -> str:
+        return "Budget({}, {!r})".format(self.__timeout, self.__callback)
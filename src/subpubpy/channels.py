@@ -1,11 +1,46 @@
-from typing import AnyStr
-from .abstract import AbstractSubscriber, AbstractChannel
+from threading import Lock
+from typing import AnyStr, Union
+from .abstract import (AbstractSubscriber, AbstractChannel,
+                       AbstractRetainedStore, AbstractCodec)
+from .serialization import Frame, get_codec
+from .shm import SharedRingBuffer, SharedMemoryQueue
+from .ring import BroadcastRing, RingBufferQueue
+from .log import SegmentedLog, LogReaderQueue
 
 
 class SimpleChannel(AbstractChannel):
+    """In-process channel which puts every message into the queue of each\n
+    subscriber.
 
-    def __init__(self, name: AnyStr):
+    Subscribers forwarding messages out of the process, like the broker\n
+    connections, receive a `Frame` instead. It is encoded once per publish\n
+    with the channel codec and shared by all of them.
+
+    Attributes:
+    -----------
+    retained: Optional[AbstractRetainedStore]
+        store of retained messages, e.g. LastNStore or LastValueStore.\n
+        They are delivered to a subscriber as soon as it attaches and\n
+        exactly once together with the messages published meanwhile.\n
+        The replay runs in the attaching thread and never waits for room\n
+        in the subscriber queue, messages that do not fit are dropped.
+
+    codec: AbstractCodec
+        codec of the frames, pickle by default.
+    """
+
+    def __init__(self, name: AnyStr, retained: AbstractRetainedStore = None,
+                 codec: Union[str, AbstractCodec] = None):
         super().__init__(name)
+        if retained is not None and \
+                not isinstance(retained, AbstractRetainedStore):
+            raise TypeError(f"{retained} is not an AbstractRetainedStore")
+        self.__retained = retained
+        self.__retained_lock = Lock()
+        # subscribers whose replay is being delivered, mapped to the
+        # messages published meanwhile.
+        self.__replaying = dict()
+        self.__codec = get_codec(codec)
 
     def __str__(self) -> str:
         return "Channel {}".format(self.name)
@@ -13,11 +48,288 @@ class SimpleChannel(AbstractChannel):
     def __repr__(self) -> str:
         return "Channel({})".format(self.name)
 
+    @property
+    def retained(self) -> AbstractRetainedStore:
+        return self.__retained
+
+    @property
+    def codec(self) -> AbstractCodec:
+        return self.__codec
+
+    def attach(self, subscriber: AbstractSubscriber):
+        store = self.__retained
+        if store is None:
+            return super().attach(subscriber)
+        # attaching and publishing swap the store and the subscribers
+        # under one lock, a message is either retained or published to
+        # the new subscriber, never both. Messages published until the
+        # replay is delivered queue up behind it to keep their order.
+        with self.__retained_lock:
+            if subscriber in self.subscribers:
+                return
+            super().attach(subscriber)
+            messages = store.messages()
+            if not messages:
+                return
+            pending = self.__replaying[subscriber] = []
+        while messages:
+            if subscriber.encoded:
+                messages = self.__frames(messages)
+            subscriber.replay(messages)
+            with self.__retained_lock:
+                messages = list(pending)
+                pending.clear()
+                if not messages:
+                    del self.__replaying[subscriber]
+
+    def detach(self, subscriber: AbstractSubscriber):
+        return super().detach(subscriber)
+
+    def on_message(self, message):
+        store = self.__retained
+        if store is None:
+            refs = self._subscriber_refs
+        else:
+            with self.__retained_lock:
+                store.update(message)
+                refs = self.__live(message)
+        frame = None
+        for ref in refs:
+            subscriber = ref()
+            if subscriber is None:
+                continue
+            if subscriber.encoded:
+                if frame is None:
+                    frame = Frame.of(message, self.__codec, self.name)
+                subscriber.notify(frame)
+            else:
+                subscriber.notify(message)
+
+    def on_messages(self, messages):
+        messages = list(messages)
+        store = self.__retained
+        if store is None:
+            refs = self._subscriber_refs
+        else:
+            with self.__retained_lock:
+                store.update_many(messages)
+                refs = self.__live(*messages)
+        frames = None
+        for ref in refs:
+            subscriber = ref()
+            if subscriber is None:
+                continue
+            if subscriber.encoded:
+                if frames is None:
+                    frames = self.__frames(messages)
+                subscriber.notify_many(frames)
+            else:
+                subscriber.notify_many(messages)
+
+    def __live(self, *messages):
+        # called with the retained lock held, returns the references of
+        # the subscribers not replaying and queues messages for the others.
+        refs, replaying = self._subscriber_refs, self.__replaying
+        if not replaying:
+            return refs
+        for pending in replaying.values():
+            pending.extend(messages)
+        return [ref for ref in refs if ref() not in replaying]
+
+    def __frames(self, messages):
+        codec, name = self.__codec, self.name
+        return [Frame.of(message, codec, name) for message in messages]
+
+
+class SharedMemoryChannel(AbstractChannel):
+    """Channel which crosses process boundaries through a SharedRingBuffer.
+
+    Every published message is encoded once into the ring buffer. A\n
+    Subscriber of any process reads it through its own cursor by using\n
+    `channel.reader()` as its queue, the channel object itself can be\n
+    passed to child processes.
+
+    Attributes:
+    -----------
+    ring: SharedRingBuffer
+        shared memory ring buffer holding the messages.
+
+    codec: AbstractCodec
+        codec messages are encoded with, pickle by default. Readers\n
+        decode records of any registered codec.
+    """
+
+    def __init__(self, name: AnyStr, capacity: int = 1 << 20,
+                 max_readers: int = 16, ring: SharedRingBuffer = None,
+                 codec: Union[str, AbstractCodec] = None):
+        super().__init__(name)
+        self.__ring = ring or SharedRingBuffer(capacity, max_readers)
+        self.__codec = get_codec(codec)
+
+    def __str__(self) -> str:
+        return "SharedMemoryChannel {}".format(self.name)
+
+    def __repr__(self) -> str:
+        return "SharedMemoryChannel({}, {})".format(self.name,
+                                                    self.__ring.name)
+
+    def __reduce__(self):
+        ring = self.__ring
+        return (self.__class__,
+                (self.name, ring.capacity, ring.max_readers, ring,
+                 self.__codec))
+
+    @property
+    def ring(self) -> SharedRingBuffer:
+        return self.__ring
+
+    @property
+    def codec(self) -> AbstractCodec:
+        return self.__codec
+
+    def reader(self) -> SharedMemoryQueue:
+        return SharedMemoryQueue(self.__ring)
+
+    def attach(self, subscriber: AbstractSubscriber):
+        q = subscriber.queue
+        if not isinstance(q, SharedMemoryQueue) or q.ring is not self.__ring:
+            raise ValueError(
+                f"{subscriber} must use {self!r}.reader() as its queue")
+        return super().attach(subscriber)
+
+    def detach(self, subscriber: AbstractSubscriber):
+        return super().detach(subscriber)
+
+    def on_message(self, message):
+        kind, data = self.__codec.encode(message)
+        self.__ring.write(data, kind)
+
+    def on_messages(self, messages):
+        encode = self.__codec.encode
+        self.__ring.write_many(encode(message) for message in messages)
+
+    def close(self):
+        self.__ring.close()
+
+    def unlink(self):
+        self.__ring.unlink()
+
+
+class RingBufferChannel(AbstractChannel):
+    """Channel which writes every message once into a BroadcastRing.
+
+    Subscribers use `channel.reader()` as their queue and consume the\n
+    ring through their own cursor, so publishing costs the same for one\n
+    or for many subscribers. `get_messages(max_n)` drains a batch.
+
+    Attributes:
+    -----------
+    ring: BroadcastRing
+        preallocated ring buffer holding the messages.
+    """
+
+    def __init__(self, name: AnyStr, capacity: int = 1024,
+                 blocking: bool = True):
+        super().__init__(name)
+        self.__ring = BroadcastRing(capacity, blocking)
+
+    def __str__(self) -> str:
+        return "RingBufferChannel {}".format(self.name)
+
+    def __repr__(self) -> str:
+        return "RingBufferChannel({})".format(self.name)
+
+    @property
+    def ring(self) -> BroadcastRing:
+        return self.__ring
+
+    def reader(self) -> RingBufferQueue:
+        return RingBufferQueue(self.__ring)
+
     def attach(self, subscriber: AbstractSubscriber):
+        q = subscriber.queue
+        if not isinstance(q, RingBufferQueue) or q.ring is not self.__ring:
+            raise ValueError(
+                f"{subscriber} must use {self!r}.reader() as its queue")
         return super().attach(subscriber)
 
     def detach(self, subscriber: AbstractSubscriber):
         return super().detach(subscriber)
 
     def on_message(self, message):
-        return super().on_message(message)
+        self.__ring.publish(message)
+
+    def on_messages(self, messages):
+        self.__ring.publish_many(messages)
+
+
+class DurableChannel(AbstractChannel):
+    """Channel which appends every message to a durable SegmentedLog.
+
+    Subscribers use `channel.reader(offset=..., timestamp=...)` as their\n
+    queue. A reader replays the retained history from its offset, or from\n
+    the first message at or after timestamp, and then follows new\n
+    messages, so subscribers joining late or restarting lose nothing.\n
+    Opening the same directory again continues the existing log.
+
+    Attributes:
+    -----------
+    log: SegmentedLog
+        memory-mapped append-only log holding the messages.
+
+    codec: Union[str, AbstractCodec]
+        codec of the log created for directory, pickle by default.
+    """
+
+    def __init__(self, name: AnyStr, directory: str = None,
+                 segment_size: int = 64 << 20, retention_bytes: int = None,
+                 retention_seconds: float = None, log: SegmentedLog = None,
+                 codec: Union[str, AbstractCodec] = None):
+        super().__init__(name)
+        if log is None:
+            if directory is None:
+                raise ValueError("DurableChannel requires a directory or log")
+            log = SegmentedLog(directory, segment_size,
+                               retention_bytes=retention_bytes,
+                               retention_seconds=retention_seconds,
+                               codec=codec)
+        self.__log = log
+
+    def __str__(self) -> str:
+        return "DurableChannel {}".format(self.name)
+
+    def __repr__(self) -> str:
+        return "DurableChannel({}, {})".format(self.name,
+                                               self.__log.directory)
+
+    @property
+    def log(self) -> SegmentedLog:
+        return self.__log
+
+    def reader(self, offset: int = None,
+               timestamp: float = None) -> LogReaderQueue:
+        """Returns a reader starting at offset, at timestamp, or at the\n
+        end of the log when both are None."""
+        return LogReaderQueue(self.__log, offset, timestamp)
+
+    def attach(self, subscriber: AbstractSubscriber):
+        q = subscriber.queue
+        if not isinstance(q, LogReaderQueue) or q.log is not self.__log:
+            raise ValueError(
+                f"{subscriber} must use {self!r}.reader() as its queue")
+        return super().attach(subscriber)
+
+    def detach(self, subscriber: AbstractSubscriber):
+        return super().detach(subscriber)
+
+    def on_message(self, message):
+        self.__log.append(message)
+
+    def on_messages(self, messages):
+        self.__log.append_many(messages)
+
+    def flush(self):
+        self.__log.flush()
+
+    def close(self):
+        self.__log.close()
@@ -0,0 +1,487 @@
+import itertools
+import logging
+import socket
+import time
+from queue import Queue
+from threading import Condition, Event, Lock, Thread, local
+from typing import Any, AnyStr, Callable, Dict, Iterable, List, Set, Union
+from . import protocol
+from .abstract import (AbstractChannelManager, AbstractOverflowPolicy,
+                       AbstractPublisher, AbstractSubscriber, AbstractCodec)
+from .policies import BlockPolicy
+from .serialization import Frame, get_codec
+
+
+class BrokerConnection:
+    """Pipelined connection to a `Broker`.
+
+    Publishes are encoded right away and coalesced into one PUBLISH frame\n
+    per channel, a flusher thread writes them after `linger` seconds or\n
+    as soon as `max_batch_bytes` are pending. Subscriptions are written\n
+    immediately, after the pending publishes, so frames keep their order.\n
+    A reader thread splits MESSAGE frames into `Frame`s, without decoding\n
+    them, and passes them to `on_messages(channel, frames)`.
+
+    Parameters:
+    -----------
+    address: Union[Tuple[str, int], str]
+        (host, port) of a TCP broker or path of a Unix socket.
+
+    on_messages: Optional[Callable[[str, List[Frame]], None]]
+        receives the messages delivered by the broker.
+
+    linger: float
+        seconds small publishes wait to be batched with the next ones.
+
+    max_batch_bytes: int
+        pending bytes which are written without waiting.
+
+    timeout: float
+        seconds to connect and to wait in `flush`.
+    """
+
+    def __init__(self, address, on_messages: Callable[[str, list], None] = None,
+                 linger: float = 0.0005, max_batch_bytes: int = 1 << 16,
+                 timeout: float = 10.0):
+        if linger < 0:
+            raise ValueError("linger must not be negative")
+        if max_batch_bytes <= 0:
+            raise ValueError("max_batch_bytes must be greater than 0")
+        family, address = protocol.parse_address(address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(address)
+            sock.settimeout(None)
+            if family != socket.AF_UNIX:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            sock.close()
+            raise
+        self.__sock = sock
+        self.__on_messages = on_messages
+        self.__linger = linger
+        self.__max_batch_bytes = max_batch_bytes
+        self.__timeout = timeout
+        self.__closed = False
+        self.__error = None
+        # the send lock orders frames, taking the pending publishes and
+        # writing them happen under it.
+        self.__send_lock = Lock()
+        self.__pending = []
+        self.__pending_bytes = 0
+        self.__pending_changed = Condition(Lock())
+        self.__tokens = itertools.count(1)
+        self.__pongs = dict()
+        self.__reader = Thread(target=self.__read, daemon=True,
+                               name="subpub-client-reader")
+        self.__flusher = Thread(target=self.__flush_pending, daemon=True,
+                                name="subpub-client-flusher")
+        self.__reader.start()
+        self.__flusher.start()
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def publish(self, channel: AnyStr, message: Any,
+                codec: Union[str, AbstractCodec] = None):
+        self.publish_many(channel, (message,), codec)
+
+    def publish_many(self, channel: AnyStr, messages: Iterable[Any],
+                     codec: Union[str, AbstractCodec] = None):
+        codec = get_codec(codec)
+        records = [protocol.encode_record(message, codec)
+                   for message in messages]
+        if not records:
+            return
+        with self.__pending_changed:
+            self.__check()
+            pending = self.__pending
+            if pending and pending[-1][0] == channel:
+                pending[-1][1].extend(records)
+            else:
+                pending.append((channel, records))
+            self.__pending_bytes += sum(record[2] for record in records)
+            full = self.__pending_bytes >= self.__max_batch_bytes
+            if not full:
+                self.__pending_changed.notify()
+        if full:
+            self.__send()
+
+    def subscribe(self, channel: AnyStr):
+        self.__send(protocol.name_frame(protocol.SUBSCRIBE, channel))
+
+    def unsubscribe(self, channel: AnyStr):
+        self.__send(protocol.name_frame(protocol.UNSUBSCRIBE, channel))
+
+    def subscribe_pattern(self, pattern: AnyStr):
+        self.__send(protocol.name_frame(protocol.SUBSCRIBE_PATTERN, pattern))
+
+    def unsubscribe_pattern(self, pattern: AnyStr):
+        self.__send(protocol.name_frame(protocol.UNSUBSCRIBE_PATTERN, pattern))
+
+    def flush(self, timeout: float = None):
+        """Writes the pending frames and waits until the broker executed\n
+        them, raises TimeoutError when it did not answer in time."""
+        token = next(self.__tokens)
+        answered = self.__pongs[token] = Event()
+        self.__send(protocol.token_frame(protocol.PING, token))
+        if not answered.wait(self.__timeout if timeout is None else timeout):
+            self.__pongs.pop(token, None)
+            raise TimeoutError("broker did not answer the ping")
+        self.__check()
+
+    def close(self):
+        """Writes the pending publishes and closes the connection."""
+        if self.__closed:
+            return
+        try:
+            self.__send()
+        except (ConnectionError, ValueError):
+            pass
+        with self.__pending_changed:
+            self.__closed = True
+            self.__pending_changed.notify_all()
+        for answered in list(self.__pongs.values()):
+            answered.set()
+        try:
+            self.__sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.__sock.close()
+
+    def __enter__(self) -> "BrokerConnection":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __check(self):
+        if self.__closed:
+            raise ConnectionError("connection to the broker is closed") \
+                from self.__error
+
+    def __send(self, control: List[Any] = ()):
+        with self.__send_lock:
+            with self.__pending_changed:
+                self.__check()
+                pending, self.__pending = self.__pending, []
+                self.__pending_bytes = 0
+            parts = []
+            for channel, records in pending:
+                parts += protocol.batch_frame(protocol.PUBLISH, channel,
+                                              records)
+            parts += control
+            if not parts:
+                return
+            try:
+                protocol.send_parts(self.__sock, parts)
+            except OSError as exc:
+                self.__error = exc
+                raise ConnectionError("connection to the broker is lost") \
+                    from exc
+
+    def __flush_pending(self):
+        while True:
+            with self.__pending_changed:
+                while not self.__pending and not self.__closed:
+                    self.__pending_changed.wait()
+                if self.__closed:
+                    return
+            if self.__linger:
+                # let the next small publishes join the batch.
+                time.sleep(self.__linger)
+            try:
+                self.__send()
+            except (ConnectionError, ValueError):
+                return
+
+    def __read(self):
+        rfile = self.__sock.makefile("rb", buffering=1 << 16)
+        try:
+            while True:
+                frame = protocol.read_frame(rfile)
+                if frame is None:
+                    break
+                opcode, body = frame
+                if opcode == protocol.MESSAGE:
+                    channel, records = protocol.parse_batch(body)
+                    if self.__on_messages is not None:
+                        self.__on_messages(channel, [
+                            Frame(kind, data, channel)
+                            for kind, data in records])
+                elif opcode == protocol.PONG:
+                    answered = self.__pongs.pop(protocol.parse_token(body),
+                                                None)
+                    if answered is not None:
+                        answered.set()
+                elif opcode == protocol.ERROR:
+                    self.__error = ConnectionError(protocol.parse_name(body))
+        except (OSError, ValueError) as exc:
+            self.__error = self.__error or exc
+        finally:
+            rfile.close()
+            self.close()
+
+
+class ConnectionPool:
+    """Fixed set of `BrokerConnection`s shared by publishers.
+
+    Each thread keeps using the same connection, so messages a thread\n
+    publishes reach the broker in order. Connections are opened lazily\n
+    and reopened after they were closed.
+
+    Parameters:
+    -----------
+    address: Union[Tuple[str, int], str]
+        address of the broker.
+
+    size: int
+        number of connections.
+
+    **options
+        passed to every BrokerConnection.
+    """
+    __shared = dict()
+    __shared_lock = Lock()
+
+    def __init__(self, address, size: int = 4, **options):
+        if size <= 0:
+            raise ValueError("size must be greater than 0")
+        self.__address = address
+        self.__options = options
+        self.__connections = [None] * size
+        self.__lock = Lock()
+        self.__next = itertools.count()
+        self.__local = local()
+        self.__closed = False
+
+    @classmethod
+    def shared(cls, address) -> "ConnectionPool":
+        """Returns the pool shared by every publisher of address."""
+        key = protocol.parse_address(address)
+        with cls.__shared_lock:
+            pool = cls.__shared.get(key)
+            if pool is None or pool.closed:
+                pool = cls.__shared[key] = cls(address)
+            return pool
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def get(self) -> BrokerConnection:
+        """Returns the connection of the calling thread."""
+        index = getattr(self.__local, "index", None)
+        if index is None:
+            index = self.__local.index = \
+                next(self.__next) % len(self.__connections)
+        connection = self.__connections[index]
+        if connection is None or connection.closed:
+            with self.__lock:
+                if self.__closed:
+                    raise ConnectionError("connection pool is closed")
+                connection = self.__connections[index]
+                if connection is None or connection.closed:
+                    connection = BrokerConnection(self.__address,
+                                                  **self.__options)
+                    self.__connections[index] = connection
+        return connection
+
+    def flush(self, timeout: float = None):
+        for connection in list(self.__connections):
+            if connection is not None and not connection.closed:
+                connection.flush(timeout)
+
+    def close(self):
+        with self.__lock:
+            self.__closed = True
+            connections = self.__connections
+            self.__connections = [None] * len(connections)
+        for connection in connections:
+            if connection is not None:
+                connection.close()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _RemoteChannels(AbstractChannelManager):
+    """Channel manager of remote clients, forwards to a broker connection."""
+
+    def __init__(self, connection: Callable[[], BrokerConnection],
+                 codec: Union[str, AbstractCodec] = None,
+                 codecs: Dict[str, Union[str, AbstractCodec]] = None):
+        self.__connection = connection
+        self.__codec = get_codec(codec)
+        self.__codecs = {channel: get_codec(codec)
+                         for channel, codec in (codecs or {}).items()}
+
+    def add(self, channel_name: AnyStr, subscriber: AbstractSubscriber):
+        self.__connection().subscribe(channel_name)
+
+    def remove(self, channel_name: AnyStr, subscriber: AbstractSubscriber):
+        self.__connection().unsubscribe(channel_name)
+
+    def add_pattern(self, pattern: AnyStr, subscriber: AbstractSubscriber):
+        self.__connection().subscribe_pattern(pattern)
+
+    def remove_pattern(self, pattern: AnyStr, subscriber: AbstractSubscriber):
+        self.__connection().unsubscribe_pattern(pattern)
+        return True
+
+    def publish(self, channel_name, msg):
+        self.__connection().publish(
+            channel_name, msg, self.__codecs.get(channel_name, self.__codec))
+
+    def publish_many(self, channel_name, msgs: Iterable):
+        self.__connection().publish_many(
+            channel_name, msgs, self.__codecs.get(channel_name, self.__codec))
+
+
+class RemotePublisher(AbstractPublisher):
+    """Publisher of a `Broker` running in another process or host.
+
+    Publishes return once the message is encoded, they are batched and\n
+    written in the background. Publishers of one address share a\n
+    ConnectionPool unless a pool is given.
+
+    Parameters:
+    -----------
+    codec: Union[str, AbstractCodec]
+        codec of the published messages, pickle by default.
+
+    codecs: Optional[Dict[str, Union[str, AbstractCodec]]]
+        codec of specific channels, e.g. {"prices": "json"}.
+    """
+
+    def __init__(self, address=None, pool: ConnectionPool = None,
+                 codec: Union[str, AbstractCodec] = None,
+                 codecs: Dict[str, Union[str, AbstractCodec]] = None):
+        if pool is None:
+            if address is None:
+                raise ValueError("address or pool is required")
+            pool = ConnectionPool.shared(address)
+        self.__pool = pool
+        super().__init__(_RemoteChannels(pool.get, codec, codecs))
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return self.__pool
+
+    def publish(self, channel: AnyStr, message: Any):
+        return super().publish(channel, message)
+
+    def publish_many(self, channel: AnyStr, messages: Iterable[Any]):
+        return super().publish_many(channel, messages)
+
+    def flush(self, timeout: float = None):
+        """Waits until the broker received every message published so far."""
+        self.__pool.flush(timeout)
+
+
+class RemoteSubscriber(AbstractSubscriber):
+    """Subscriber of a `Broker` running in another process or host.
+
+    Owns a BrokerConnection, messages of its channels and patterns are\n
+    decoded by the connection reader and put into the subscriber queue\n
+    through the overflow policy, like a local Subscriber.
+
+    Parameters:
+    -----------
+    lazy: bool
+        if True the queue receives `Frame`s, a frame decodes its message\n
+        on the first access of `frame.message`, consumers routing on\n
+        `frame.channel` never decode.
+
+    codec: Union[str, AbstractCodec]
+        codec of the received messages, pickle by default. Records of\n
+        other kinds are dropped and logged, never decoded. Use a codec\n
+        like json when publishers are not trusted, unpickling a record\n
+        can execute arbitrary code.
+
+    codecs: Optional[Dict[str, Union[str, AbstractCodec]]]
+        codec of specific channels, e.g. {"prices": "json"}.
+    """
+
+    def __init__(self, address, channels: Set = None, q: Queue = None,
+                 overflow: AbstractOverflowPolicy = None,
+                 default_queue_size: int = 150, lazy: bool = False,
+                 codec: Union[str, AbstractCodec] = None,
+                 codecs: Dict[str, Union[str, AbstractCodec]] = None,
+                 **options):
+        self.__lazy = lazy
+        self.__codec = get_codec(codec)
+        self.__codecs = {channel: get_codec(codec)
+                         for channel, codec in (codecs or {}).items()}
+        self.__connection = BrokerConnection(
+            address, on_messages=self.__on_messages, **options)
+        try:
+            super().__init__(_RemoteChannels(lambda: self.__connection),
+                             channels, q, default_queue_size,
+                             overflow=overflow or BlockPolicy())
+            if self.channels:
+                super().add_channel(*self.channels)
+        except Exception:
+            self.__connection.close()
+            raise
+
+    def __on_messages(self, channel: str, frames: List[Frame]):
+        codec = self.__codecs.get(channel, self.__codec)
+        accepted = [frame for frame in frames if codec.accepts(frame.kind)]
+        if len(accepted) != len(frames):
+            logging.warning("[RemoteSubscriber] dropped %d records of %s "
+                            "not encoded with %s", len(frames) - len(accepted),
+                            channel, codec.name)
+        for frame in accepted:
+            frame.expect = codec
+        frames = accepted
+        if not frames:
+            return
+        if self.__lazy:
+            self.notify_many(frames)
+        else:
+            self.notify_many([frame.message for frame in frames])
+
+    @property
+    def connection(self) -> BrokerConnection:
+        return self.__connection
+
+    def get_message(self, block: bool = False):
+        return super().get_message(block)
+
+    def get_messages(self, max_n: int, block: bool = False,
+                     timeout: float = None):
+        return super().get_messages(max_n, block, timeout)
+
+    def listen(self):
+        return super().listen()
+
+    def notify(self, message: Any):
+        return super().notify(message)
+
+    def notify_many(self, messages: Iterable[Any]):
+        return super().notify_many(messages)
+
+    def add_channel(self, *args):
+        return super().add_channel(*args)
+
+    def remove_channel(self, *args):
+        return super().remove_channel(*args)
+
+    def flush(self, timeout: float = None):
+        """Waits until the broker applied every subscription change."""
+        self.__connection.flush(timeout)
+
+    def close(self):
+        self.__connection.close()
+
+    def __enter__(self) -> "RemoteSubscriber":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,7 +1,8 @@
 from .abstract import *
-from .utils import RegexDict
-from threading import Lock
-from typing import Set
+from .utils import PatternIndex, SnapshotHandlerDict
+from .dispatchers import InlineDispatcher, AsyncioDispatcher
+import asyncio
+from typing import Hashable, Set
 from queue import Queue
 from .subscribers import SimpleSubscriber
 from .publishers import SimplePublisher
@@ -13,7 +14,7 @@ class SimpleSubpub(AbstractSubpub):
 
     Attributes:
     -----------
-    _handler: dict
+    _handler: HandlerDict
         dictionary data structure to handle key as event and value\n
         as the callable function which runs on when event is called.
 
@@ -28,11 +29,23 @@ class SimpleSubpub(AbstractSubpub):
     unsub(event, callback)
         unregister callback with the event."""
 
-    def __init__(self):
-        """Simple subpub constructor."""
-        super().__init__()
+    def __init__(self, dispatcher: AbstractDispatcher = None,
+                 name: str = None):
+        """Simple subpub constructor.
 
-    def pub(self, event: str, payload: Any, verbose: bool = True) -> None:
+        Parameters:
+        -----------
+        dispatcher: Optional[AbstractDispatcher]
+            dispatch engine which runs the subscribed callbacks,\n
+            defaults to InlineDispatcher.
+
+        name: Optional[str]
+            namespace of the bus, defaults to the class name.
+        """
+        super().__init__(dispatcher or InlineDispatcher(), name)
+
+    def pub(self, event: str, payload: Any, verbose: bool = True,
+            key: Hashable = None) -> None:
         """Publishes the events.
 
         Parameters:
@@ -45,10 +58,16 @@ class SimpleSubpub(AbstractSubpub):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        key: Optional[Hashable]
+            partition key, callbacks of one key run in publishing order\n
+            with a PartitionedDispatcher.
         """
-        super().pub(event, payload, verbose)
+        super().pub(event, payload, verbose, key)
 
-    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True) -> Union[None, TypeError]:
+    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True,
+            window: AbstractWindow = None, where: Dict[str, Any] = None,
+            budget: Budget = None) -> Union[None, TypeError]:
         """Subscribes event with callback.\n
         It checks if callback is not callable then raises TypeError
         else returns None.
@@ -64,9 +83,22 @@ class SimpleSubpub(AbstractSubpub):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        window: Optional[AbstractWindow]
+            Conflate, Throttle or Debounce window collapsing the payloads\n
+            of high-frequency events before they are dispatched.
+
+        where: Optional[dict]
+            content filter on payload fields, only matching payloads are\n
+            dispatched, e.g. {"symbol": "EURUSD", "qty": {">": 0}}.
+
+        budget: Optional[Budget]
+            execution budget isolating or tripping the subscription when\n
+            its callback keeps running late or raising.
         """
 
-        super().sub(event, callback)
+        super().sub(event, callback, window=window, where=where,
+                    budget=budget)
 
 
 class ThreadSafeSubpub(AbstractSubpub):
@@ -75,9 +107,10 @@ class ThreadSafeSubpub(AbstractSubpub):
 
     Attributes:
     -----------
-    _handler: dict
-        dictionary data structure to handle key as event and value\n
-        as the callable function which runs on when event is called.
+    _handler: SnapshotHandlerDict
+        immutable snapshot of event as key and the tuple of callable\n
+        functions as value. sub and unsub swap in a new snapshot under\n
+        a writer lock, pub reads the current one without locking.
 
     Methods:
     --------
@@ -90,20 +123,26 @@ class ThreadSafeSubpub(AbstractSubpub):
     unsub(event, callback)
         unregister callback with the event."""
 
-    _instance = None
-    _lock: Lock = Lock()
+    def __init__(self, dispatcher: AbstractDispatcher = None,
+                 name: str = None):
+        """Thread safe subpub constructor.
 
-    def __new__(cls, *args, **kwargs):
-        """
-        Possible changes to the value of the `__init__` argument do not affect
-        the returned instance.
+        Parameters:
+        -----------
+        dispatcher: Optional[AbstractDispatcher]
+            dispatch engine which runs the subscribed callbacks,\n
+            defaults to InlineDispatcher.
+
+        name: Optional[str]
+            namespace of the bus, defaults to the class name.
         """
-        with cls._lock:
-            if not cls._instance:
-                cls._instance = super(ThreadSafeSubpub, cls).__new__(cls)
-        return cls._instance
+        super().__init__(dispatcher or InlineDispatcher(), name)
 
-    def pub(self, event: str, payload: Any, verbose: bool = True) -> None:
+    def _make_handler(self):
+        return SnapshotHandlerDict()
+
+    def pub(self, event: str, payload: Any, verbose: bool = True,
+            key: Hashable = None) -> None:
         """Publishes the events.
 
         Parameters:
@@ -116,11 +155,16 @@ class ThreadSafeSubpub(AbstractSubpub):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        key: Optional[Hashable]
+            partition key, callbacks of one key run in publishing order\n
+            with a PartitionedDispatcher.
         """
-        with self._lock:
-            super().pub(event, payload, verbose)
+        super().pub(event, payload, verbose, key)
 
-    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True) -> Union[None, TypeError]:
+    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True,
+            window: AbstractWindow = None, where: Dict[str, Any] = None,
+            budget: Budget = None) -> Union[None, TypeError]:
         """Subscribes event with callback.\n
         It checks if callback is not callable then raises TypeError
         else returns None.
@@ -136,9 +180,20 @@ class ThreadSafeSubpub(AbstractSubpub):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        window: Optional[AbstractWindow]
+            Conflate, Throttle or Debounce window collapsing the payloads\n
+            of high-frequency events before they are dispatched.
+
+        where: Optional[dict]
+            content filter on payload fields, only matching payloads are\n
+            dispatched, e.g. {"symbol": "EURUSD", "qty": {">": 0}}.
+
+        budget: Optional[Budget]
+            execution budget isolating or tripping the subscription when\n
+            its callback keeps running late or raising.
         """
-        with self._lock:
-            super().sub(event, callback, verbose)
+        super().sub(event, callback, verbose, window, where, budget)
 
 
 class RegexSubpub(AbstractSubpub):
@@ -147,9 +202,9 @@ class RegexSubpub(AbstractSubpub):
 
     Attributes:
     -----------
-    _handler: RegexDict
-        dictionary data structure to handle key as event and value\n
-        as the callable function which runs on when event is called.
+    _handler: PatternIndex
+        compiled patterns as key and the callable functions as value,\n
+        every pattern which fully matches a published event is called.
 
     Methods:
     --------
@@ -162,11 +217,26 @@ class RegexSubpub(AbstractSubpub):
     unsub(event, callback)
         unregister callback with the event."""
 
-    def __init__(self):
-        """Regex subpub constructor."""
-        self._handler = RegexDict()
+    def __init__(self, dispatcher: AbstractDispatcher = None,
+                 name: str = None):
+        """Regex subpub constructor.
 
-    def pub(self, event: str, payload: Any, verbose: bool = True) -> None:
+        Parameters:
+        -----------
+        dispatcher: Optional[AbstractDispatcher]
+            dispatch engine which runs the subscribed callbacks,\n
+            defaults to InlineDispatcher.
+
+        name: Optional[str]
+            namespace of the bus, defaults to the class name.
+        """
+        super().__init__(dispatcher or InlineDispatcher(), name)
+
+    def _make_handler(self):
+        return PatternIndex()
+
+    def pub(self, event: str, payload: Any, verbose: bool = True,
+            key: Hashable = None) -> None:
         """Publishes the events.
 
         Parameters:
@@ -179,10 +249,16 @@ class RegexSubpub(AbstractSubpub):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        key: Optional[Hashable]
+            partition key, callbacks of one key run in publishing order\n
+            with a PartitionedDispatcher.
         """
-        super().pub(event, payload, verbose)
+        super().pub(event, payload, verbose, key)
 
-    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True) -> Union[None, TypeError]:
+    def sub(self, event: str, callback: Callable[[str, Any], None], verbose: bool = True,
+            window: AbstractWindow = None, where: Dict[str, Any] = None,
+            budget: Budget = None) -> Union[None, TypeError]:
         """Subscribes event with callback.\n
         It checks if callback is not callable then raises TypeError
         else returns None.
@@ -198,9 +274,22 @@ class RegexSubpub(AbstractSubpub):
 
         verbose: Optional[bool]
             used for logging purpose if False no log message are passed.
+
+        window: Optional[AbstractWindow]
+            Conflate, Throttle or Debounce window collapsing the payloads\n
+            of high-frequency events before they are dispatched.
+
+        where: Optional[dict]
+            content filter on payload fields, only matching payloads are\n
+            dispatched, e.g. {"symbol": "EURUSD", "qty": {">": 0}}.
+
+        budget: Optional[Budget]
+            execution budget isolating or tripping the subscription when\n
+            its callback keeps running late or raising.
         """
 
-        super().sub(event, callback)
+        super().sub(event, callback, window=window, where=where,
+                    budget=budget)
 
 
 class ThreadSafeRegexSubpub(ThreadSafeSubpub):
@@ -209,9 +298,9 @@ class ThreadSafeRegexSubpub(ThreadSafeSubpub):
 
     Attributes:
     -----------
-    _handler: RegexDict
-        dictionary data structure to handle key as event and value\n
-        as the callable function which runs on when event is called.
+    _handler: PatternIndex
+        compiled patterns as key and the callable functions as value,\n
+        every pattern which fully matches a published event is called.
 
     Methods:
     --------
@@ -224,13 +313,125 @@ class ThreadSafeRegexSubpub(ThreadSafeSubpub):
     unsub(event, callback)
         unregister callback with the event."""
 
-    def __init__(self):
-        self._handler = RegexDict()
+    def _make_handler(self):
+        return PatternIndex()
+
+
+class AsyncSubpub(AbstractSubpub):
+    """Publish subscriber model which runs the callbacks on an asyncio\n
+    event loop.
+
+    `async def` callbacks are scheduled as tasks with bounded\n
+    concurrency, plain callbacks run on the loop. pub can be called\n
+    from the loop or from any other thread.
+
+    Attributes:
+    -----------
+    _handler: SnapshotHandlerDict
+        immutable snapshot of event as key and the tuple of callable\n
+        functions as value.
+
+    _dispatcher: AsyncioDispatcher
+        dispatch engine bound to the event loop.
+
+    Methods:
+    --------
+    pub(event, msg)
+        event is published then notify everyone who have subscribed.
+
+    sub(event, callback)
+        register callback or coroutine function with the event.
+
+    unsub(event, callback)
+        unregister callback with the event.
+
+    join()
+        wait until every published event has been handled."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None,
+                 max_concurrency: int = 100, name: str = None):
+        """Async subpub constructor.
+
+        Parameters:
+        -----------
+        loop: Optional[asyncio.AbstractEventLoop]
+            event loop running the callbacks, defaults to the loop which\n
+            is running when the first event is published.
+
+        max_concurrency: Optional[int]
+            upper bound of callback tasks running at the same time.
+
+        name: Optional[str]
+            namespace of the bus, defaults to the class name.
+        """
+        super().__init__(AsyncioDispatcher(loop, max_concurrency), name)
+
+    def _make_handler(self):
+        return SnapshotHandlerDict()
+
+    def pub(self, event: str, payload: Any, verbose: bool = True,
+            key: Hashable = None) -> None:
+        """Publishes the events.
+
+        Parameters:
+        -----------
+        event: str
+            event which need to be published.
+
+        payload: Any
+            Any kind of data structure to handle with event.
+
+        verbose: Optional[bool]
+            used for logging purpose if False no log message are passed.
+
+        key: Optional[Hashable]
+            partition key, callbacks of one key run in publishing order\n
+            with a PartitionedDispatcher.
+        """
+        super().pub(event, payload, verbose, key)
+
+    def sub(self, event: str, callback: Callable[[str, Any], Any], verbose: bool = True,
+            window: AbstractWindow = None, where: Dict[str, Any] = None,
+            budget: Budget = None) -> Union[None, TypeError]:
+        """Subscribes event with callback.\n
+        It checks if callback is not callable then raises TypeError
+        else returns None.
+        Then, subscribes the event.
+
+        Parameters:
+        -----------
+        event: str
+            event which need to be subscribe.
+
+        callback: Callable
+            callback must be callable function or coroutine function.
+
+        verbose: Optional[bool]
+            used for logging purpose if False no log message are passed.
+
+        window: Optional[AbstractWindow]
+            Conflate, Throttle or Debounce window collapsing the payloads\n
+            of high-frequency events before they are dispatched.
+
+        where: Optional[dict]
+            content filter on payload fields, only matching payloads are\n
+            dispatched, e.g. {"symbol": "EURUSD", "qty": {">": 0}}.
+
+        budget: Optional[Budget]
+            execution budget isolating or tripping the subscription when\n
+            its callback keeps running late or raising.
+        """
+        super().sub(event, callback, verbose, window, where, budget)
+
+    async def join(self) -> None:
+        """Waits until every published event has been handled."""
+        await self._dispatcher.join()
 
 
 class ThreadSafeSimplePubsub(SimpleSubscriber, SimplePublisher):
 
-    def __init__(self, channels: Set = None, q: Queue = None):
-        super().__init__(channels, q)
+    def __init__(self, channels: Set = None, q: Queue = None,
+                 overflow: AbstractOverflowPolicy = None):
+        super().__init__(channels, q, overflow)
         # AbstractSubscriber.__init__(AbstractSubscriber, channels, q)
         # AbstractPublisher.__init__(AbstractPublisher)
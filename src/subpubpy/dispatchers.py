@@ -0,0 +1,428 @@
+import asyncio
+import inspect
+import os
+from collections import deque
+from concurrent.futures import Executor, Future
+from functools import partial
+from queue import Queue
+from threading import Lock, Semaphore, Thread
+from typing import Any, Callable, Hashable, Iterable
+from .abstract import AbstractDispatcher
+from .utils import report_exception
+
+
+def _work(q: Queue, idle: Semaphore = None):
+    # worker loop of the thread dispatchers, None stops it. idle is
+    # released whenever the worker goes back to waiting for an item.
+    while True:
+        item = q.get()
+        try:
+            if item is None:
+                return
+            callback, event, payload, many = item
+            for payload in (payload if many else (payload,)):
+                try:
+                    callback(event, payload)
+                except Exception as exc:
+                    report_exception(exc, event, callback)
+        finally:
+            if idle is not None and item is not None:
+                idle.release()
+            q.task_done()
+
+
+class InlineDispatcher(AbstractDispatcher):
+    """Runs every callback in the publishing thread.
+
+    Exceptions raised by a callback propagate to the caller of `pub`."""
+
+    def dispatch(self, callback: Callable[[str, Any], None], event: str,
+                 payload: Any) -> None:
+        callback(event, payload)
+
+
+class ThreadPoolDispatcher(AbstractDispatcher):
+    """Runs callbacks on a bounded pool of long-lived worker threads.
+
+    Attributes:
+    -----------
+    max_workers: int
+        upper bound of worker threads, they are started lazily when\n
+        every worker is busy.
+
+    max_queue_size: int
+        upper bound of pending callbacks, `dispatch` blocks when the\n
+        queue is full. 0 means unbounded.
+
+    Methods:
+    --------
+    dispatch(callback, event, payload)
+        enqueue callback for one of the workers.
+
+    join()
+        block until every dispatched callback has run.
+
+    shutdown(wait)
+        stop the workers.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue_size: int = 0,
+                 name: str = "subpub-dispatcher"):
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must not be negative")
+        self.__max_workers = max_workers
+        self.__max_queue_size = max_queue_size
+        self.__name = name
+        self.__q = Queue(maxsize=max_queue_size)
+        self.__workers = []
+        self.__idle = Semaphore(0)
+        self.__lock = Lock()
+        self.__shutdown = False
+
+    @property
+    def max_workers(self) -> int:
+        return self.__max_workers
+
+    @property
+    def max_queue_size(self) -> int:
+        return self.__max_queue_size
+
+    @property
+    def workers(self) -> int:
+        return len(self.__workers)
+
+    def dispatch(self, callback: Callable[[str, Any], None], event: str,
+                 payload: Any) -> None:
+        if self.__shutdown:
+            raise RuntimeError("cannot dispatch after shutdown")
+        self.__adjust_workers()
+        self.__q.put((callback, event, payload, False))
+
+    def dispatch_many(self, callback: Callable[[str, Any], None], event: str,
+                      payloads: Iterable[Any]) -> None:
+        """Enqueues the whole batch as one work item, a single worker runs\n
+        callback for every payload in order."""
+        if self.__shutdown:
+            raise RuntimeError("cannot dispatch after shutdown")
+        self.__adjust_workers()
+        self.__q.put((callback, event, payloads, True))
+
+    def join(self) -> None:
+        self.__q.join()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.__lock:
+            if self.__shutdown:
+                return
+            self.__shutdown = True
+            workers = list(self.__workers)
+        for _ in workers:
+            self.__q.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def __adjust_workers(self):
+        # an idle worker takes the item, a new one is started only when
+        # every worker is busy.
+        if self.__idle.acquire(blocking=False):
+            return
+        if len(self.__workers) < self.__max_workers:
+            self.__start_worker()
+
+    def __start_worker(self):
+        with self.__lock:
+            if self.__shutdown or len(self.__workers) >= self.__max_workers:
+                return
+            worker = Thread(
+                name=f"{self.__name}-{len(self.__workers)}",
+                target=_work, args=(self.__q, self.__idle), daemon=True)
+            self.__workers.append(worker)
+        worker.start()
+
+
+class PartitionedDispatcher(AbstractDispatcher):
+    """Runs callbacks on a fixed set of partition workers, each owning\n
+    its queue.
+
+    `pub(event, payload, key=...)` hashes the key to one partition, the\n
+    callbacks of one key, e.g. one account, run strictly in publishing\n
+    order while different keys are handled in parallel. Payloads\n
+    published without a key are partitioned by their event.
+
+    Attributes:
+    -----------
+    partitions: int
+        number of partition workers, they are started lazily.
+
+    max_queue_size: int
+        upper bound of pending callbacks per partition, `dispatch`\n
+        blocks when the queue of its partition is full. 0 means unbounded.
+
+    Methods:
+    --------
+    dispatch_keyed(callback, event, payload, key)
+        enqueue callback on the partition of key.
+
+    partition(key)
+        return the partition index of key.
+
+    join()
+        block until every dispatched callback has run.
+
+    shutdown(wait)
+        stop the workers.
+    """
+
+    def __init__(self, partitions: int = None, max_queue_size: int = 0,
+                 name: str = "subpub-partition"):
+        if partitions is None:
+            partitions = os.cpu_count() or 1
+        if partitions <= 0:
+            raise ValueError("partitions must be greater than 0")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must not be negative")
+        self.__partitions = partitions
+        self.__max_queue_size = max_queue_size
+        self.__name = name
+        self.__queues = tuple(Queue(maxsize=max_queue_size)
+                              for _ in range(partitions))
+        self.__workers = [None] * partitions
+        self.__lock = Lock()
+        self.__shutdown = False
+
+    @property
+    def partitions(self) -> int:
+        return self.__partitions
+
+    @property
+    def max_queue_size(self) -> int:
+        return self.__max_queue_size
+
+    def partition(self, key: Hashable) -> int:
+        return hash(key) % self.__partitions
+
+    def dispatch(self, callback: Callable[[str, Any], None], event: str,
+                 payload: Any) -> None:
+        self.__put(event, (callback, event, payload, False))
+
+    def dispatch_many(self, callback: Callable[[str, Any], None], event: str,
+                      payloads: Iterable[Any]) -> None:
+        self.__put(event, (callback, event, payloads, True))
+
+    def dispatch_keyed(self, callback: Callable[[str, Any], None],
+                       event: str, payload: Any, key: Hashable) -> None:
+        self.__put(key, (callback, event, payload, False))
+
+    def dispatch_many_keyed(self, callback: Callable[[str, Any], None],
+                            event: str, payloads: Iterable[Any],
+                            key: Hashable) -> None:
+        self.__put(key, (callback, event, payloads, True))
+
+    def join(self) -> None:
+        for q in self.__queues:
+            q.join()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.__lock:
+            if self.__shutdown:
+                return
+            self.__shutdown = True
+            workers = [(index, worker) for index, worker
+                       in enumerate(self.__workers) if worker is not None]
+        for index, _ in workers:
+            self.__queues[index].put(None)
+        if wait:
+            for _, worker in workers:
+                worker.join()
+
+    def __put(self, key: Hashable, item):
+        if self.__shutdown:
+            raise RuntimeError("cannot dispatch after shutdown")
+        index = hash(key) % self.__partitions
+        if self.__workers[index] is None:
+            self.__start_worker(index)
+        self.__queues[index].put(item)
+
+    def __start_worker(self, index: int):
+        with self.__lock:
+            if self.__shutdown or self.__workers[index] is not None:
+                return
+            worker = self.__workers[index] = Thread(
+                name=f"{self.__name}-{index}", target=_work,
+                args=(self.__queues[index],), daemon=True)
+        worker.start()
+
+
+class ExecutorDispatcher(AbstractDispatcher):
+    """Submits callbacks to a caller supplied `concurrent.futures.Executor`.
+
+    The executor is owned by the caller, `shutdown` only shuts it down\n
+    when `owns_executor` is True."""
+
+    def __init__(self, executor: Executor, owns_executor: bool = False):
+        if not isinstance(executor, Executor):
+            raise TypeError(f"{executor} is not an Executor")
+        self.__executor = executor
+        self.__owns_executor = owns_executor
+
+    @property
+    def executor(self) -> Executor:
+        return self.__executor
+
+    def dispatch(self, callback: Callable[[str, Any], None], event: str,
+                 payload: Any) -> None:
+        future = self.__executor.submit(callback, event, payload)
+        future.add_done_callback(partial(self.__on_done, event, callback))
+
+    def dispatch_many(self, callback: Callable[[str, Any], None], event: str,
+                      payloads: Iterable[Any]) -> None:
+        future = self.__executor.submit(self.__run_many, callback, event,
+                                        payloads)
+        future.add_done_callback(partial(self.__on_done, event, callback))
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self.__owns_executor:
+            self.__executor.shutdown(wait=wait)
+
+    @staticmethod
+    def __run_many(callback: Callable[[str, Any], None], event: str,
+                   payloads: Iterable[Any]):
+        for payload in payloads:
+            try:
+                callback(event, payload)
+            except Exception as exc:
+                report_exception(exc, event, callback)
+
+    @staticmethod
+    def __on_done(event: str, callback: Callable[[str, Any], None],
+                  future: Future):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            report_exception(exc, event, callback)
+
+
+class AsyncioDispatcher(AbstractDispatcher):
+    """Schedules callbacks on an asyncio event loop.
+
+    `async def` callbacks run as tasks, at most `max_concurrency` of them\n
+    at a time, plain callbacks run directly on the loop. Publishers on\n
+    other threads append to a pending deque and wake the loop only when\n
+    no drain is already scheduled, so a burst costs a single wakeup.
+
+    Attributes:
+    -----------
+    loop: asyncio.AbstractEventLoop
+        event loop running the callbacks, bound to the running loop of\n
+        the first dispatch when not given.
+
+    max_concurrency: int
+        upper bound of callback tasks running at the same time.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None,
+                 max_concurrency: int = 100):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be greater than 0")
+        self.__loop = loop
+        self.__max_concurrency = max_concurrency
+        self.__pending = deque()
+        self.__lock = Lock()
+        self.__scheduled = False
+        self.__active = 0
+        self.__idle = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.__loop
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.__max_concurrency
+
+    def dispatch(self, callback: Callable[[str, Any], None], event: str,
+                 payload: Any) -> None:
+        loop = self.__bind()
+        self.__pending.append((callback, event, payload))
+        self.__schedule(loop)
+
+    def dispatch_many(self, callback: Callable[[str, Any], None], event: str,
+                      payloads: Iterable[Any]) -> None:
+        loop = self.__bind()
+        self.__pending.extend((callback, event, payload)
+                              for payload in payloads)
+        self.__schedule(loop)
+
+    def __schedule(self, loop: asyncio.AbstractEventLoop):
+        with self.__lock:
+            if self.__scheduled:
+                return
+            self.__scheduled = True
+        if self.__in_loop(loop):
+            loop.call_soon(self.__drain)
+        else:
+            loop.call_soon_threadsafe(self.__drain)
+
+    async def join(self) -> None:
+        """Waits until every dispatched callback has finished."""
+        self.__bind()
+        if self.__idle is None:
+            self.__idle = asyncio.Event()
+        while self.__pending or self.__active:
+            self.__idle.clear()
+            await self.__idle.wait()
+
+    def __bind(self) -> asyncio.AbstractEventLoop:
+        if self.__loop is None:
+            try:
+                self.__loop = asyncio.get_running_loop()
+            except RuntimeError:
+                raise RuntimeError(
+                    "AsyncioDispatcher requires a loop or a running loop")
+        return self.__loop
+
+    @staticmethod
+    def __in_loop(loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
+    def __drain(self):
+        with self.__lock:
+            self.__scheduled = False
+        pending = self.__pending
+        while pending and self.__active < self.__max_concurrency:
+            callback, event, payload = pending.popleft()
+            try:
+                result = callback(event, payload)
+            except Exception as exc:
+                report_exception(exc, event, callback)
+                continue
+            if inspect.isawaitable(result):
+                self.__active += 1
+                task = asyncio.ensure_future(result, loop=self.__loop)
+                task.add_done_callback(
+                    partial(self.__on_done, event, callback))
+        self.__notify_idle()
+
+    def __on_done(self, event: str, callback: Callable[[str, Any], None],
+                  task: asyncio.Future):
+        self.__active -= 1
+        if not task.cancelled() and task.exception() is not None:
+            report_exception(task.exception(), event, callback)
+        if self.__pending:
+            self.__drain()
+        else:
+            self.__notify_idle()
+
+    def __notify_idle(self):
+        if self.__idle is not None and \
+                not self.__pending and not self.__active:
+            self.__idle.set()
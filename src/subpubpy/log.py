@@ -0,0 +1,541 @@
+import bisect
+import mmap
+import os
+import struct
+import time
+import zlib
+from queue import Queue, Empty
+from threading import Condition, Lock
+from typing import Any, Iterable, List, Tuple, Union
+from .abstract import AbstractCodec
+from .serialization import decode, get_codec
+
+# record header: payload size, encoding kind, crc32 of the payload, offset
+# and timestamp. The payload is written before the header, a record is
+# only valid once its header is, so a torn append is dropped on recovery.
+_HEADER = struct.Struct("<IIIQd")
+# sparse index entry: offset, position in the segment and timestamp.
+_INDEX = struct.Struct("<QQd")
+
+_LOG_SUFFIX = ".log"
+_INDEX_SUFFIX = ".index"
+
+
+def _parts(data) -> List[memoryview]:
+    parts = []
+    for part in data if isinstance(data, (list, tuple)) else (data,):
+        part = memoryview(part)
+        if part.ndim != 1 or part.format != "B":
+            part = part.cast("B")
+        parts.append(part)
+    return parts
+
+
+class _Segment:
+    """One memory-mapped file of a SegmentedLog with its sparse index."""
+
+    def __init__(self, directory: str, base: int):
+        self.base = base
+        self.path = os.path.join(directory, f"{base:020d}{_LOG_SUFFIX}")
+        self.index_path = os.path.join(directory,
+                                       f"{base:020d}{_INDEX_SUFFIX}")
+        self.file = None
+        self.mm = None
+        self.capacity = 0
+        self.position = 0
+        self.next_offset = base
+        self.last_time = None
+        self.offsets: List[int] = []
+        self.positions: List[int] = []
+        self.times: List[float] = []
+        self.index_file = None
+        self.indexed_at = None
+
+    def create(self, capacity: int):
+        self.file = open(self.path, "w+b")
+        self.file.truncate(capacity)
+        self.capacity = capacity
+        self.mm = mmap.mmap(self.file.fileno(), capacity)
+        self.index_file = open(self.index_path, "wb")
+
+    def recover(self, capacity: int, active: bool):
+        """Maps an existing segment and finds its end starting from the\n
+        last indexed record."""
+        self.file = open(self.path, "r+b")
+        size = os.fstat(self.file.fileno()).st_size
+        if active and size < capacity:
+            self.file.truncate(capacity)
+            size = capacity
+        self.capacity = size
+        self.mm = None
+        if size:
+            self.mm = mmap.mmap(self.file.fileno(), size, access=(
+                mmap.ACCESS_WRITE if active else mmap.ACCESS_READ))
+        self.__load_index()
+        position, offset = 0, self.base
+        if self.offsets:
+            position, offset = self.positions[-1], self.offsets[-1]
+        while True:
+            record = self.record_at(position)
+            if record is None or record[3] != offset:
+                break
+            size, _, _, _, self.last_time = record
+            position += _HEADER.size + size
+            offset += 1
+        self.position, self.next_offset = position, offset
+        # entries of a torn last record point at or after the end.
+        end = bisect.bisect_left(self.positions, position)
+        del self.offsets[end:], self.positions[end:], self.times[end:]
+        if self.last_time is None and self.times:
+            self.last_time = self.times[-1]
+        self.index_file = open(self.index_path, "r+b" if os.path.exists(
+            self.index_path) else "w+b")
+        self.index_file.truncate(len(self.offsets) * _INDEX.size)
+        self.index_file.seek(0, os.SEEK_END)
+        self.indexed_at = self.positions[-1] if self.positions else None
+
+    def __load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            data = f.read()
+        previous = -1
+        for entry in range(len(data) // _INDEX.size):
+            offset, position, timestamp = _INDEX.unpack_from(
+                data, entry * _INDEX.size)
+            if position <= previous or position >= self.capacity:
+                break
+            previous = position
+            self.offsets.append(offset)
+            self.positions.append(position)
+            self.times.append(timestamp)
+
+    def record_at(self, position: int):
+        """Returns the header fields of a valid record at position."""
+        mm = self.mm
+        if mm is None or position + _HEADER.size > self.capacity:
+            return None
+        size, kind, crc, offset, timestamp = _HEADER.unpack_from(mm, position)
+        start = position + _HEADER.size
+        if timestamp <= 0 or start + size > self.capacity or \
+                zlib.crc32(mm[start:start + size]) != crc:
+            return None
+        return size, kind, crc, offset, timestamp
+
+    def append(self, kind: int, parts: List[memoryview], size: int,
+               timestamp: float, index_interval: int) -> int:
+        mm, position, offset = self.mm, self.position, self.next_offset
+        start = position + _HEADER.size
+        crc = 0
+        for part in parts:
+            mm[start:start + part.nbytes] = part
+            crc = zlib.crc32(part, crc)
+            start += part.nbytes
+        _HEADER.pack_into(mm, position, size, kind, crc, offset, timestamp)
+        if self.indexed_at is None or \
+                position - self.indexed_at >= index_interval:
+            self.offsets.append(offset)
+            self.positions.append(position)
+            self.times.append(timestamp)
+            self.index_file.write(_INDEX.pack(offset, position, timestamp))
+            self.indexed_at = position
+        self.last_time = timestamp
+        self.position = start
+        self.next_offset = offset + 1
+        return offset
+
+    def locate(self, offset: int) -> int:
+        """Returns the position of the record with offset."""
+        entry = bisect.bisect_right(self.offsets, offset) - 1
+        position, current = 0, self.base
+        if entry >= 0:
+            position, current = self.positions[entry], self.offsets[entry]
+        mm = self.mm
+        while current < offset:
+            position += _HEADER.size + _HEADER.unpack_from(mm, position)[0]
+            current += 1
+        return position
+
+    def find(self, timestamp: float) -> int:
+        """Returns the offset of the first record at or after timestamp."""
+        entry = max(bisect.bisect_left(self.times, timestamp) - 1, 0)
+        position, offset = 0, self.base
+        if self.offsets:
+            position, offset = self.positions[entry], self.offsets[entry]
+        mm = self.mm
+        while offset < self.next_offset:
+            size, _, _, _, recorded = _HEADER.unpack_from(mm, position)
+            if recorded >= timestamp:
+                break
+            position += _HEADER.size + size
+            offset += 1
+        return offset
+
+    def flush(self):
+        if self.mm is not None:
+            self.mm.flush()
+        if self.index_file is not None:
+            self.index_file.flush()
+
+    def seal(self):
+        """Truncates the file to its records and maps it read-only."""
+        self.flush()
+        self.mm.close()
+        self.file.truncate(self.position)
+        self.capacity = self.position
+        self.mm = mmap.mmap(self.file.fileno(), self.position,
+                            access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self.mm is not None:
+            self.flush()
+            self.mm.close()
+            self.mm = None
+        for f in (self.file, self.index_file):
+            if f is not None:
+                f.close()
+        self.file = self.index_file = None
+
+    def delete(self):
+        self.close()
+        for path in (self.path, self.index_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class SegmentedLog:
+    """Durable append-only message log split into memory-mapped segments.
+
+    Every message gets a sequential offset and a timestamp. Appends write\n
+    into the preallocated mmap of the active segment, which rolls over to\n
+    a new file once full. A sparse index per segment maps offsets and\n
+    timestamps to file positions so reads can start anywhere, readers\n
+    copy whole batches of records out of the mapping at once. Reopening\n
+    the directory recovers the log, a torn last record is dropped.
+
+    Attributes:
+    -----------
+    directory: str
+        directory holding the segment and index files.
+
+    segment_size: int
+        bytes preallocated per segment.
+
+    index_interval: int
+        bytes between two sparse index entries.
+
+    retention_bytes: Optional[int]
+        oldest segments are deleted while the log is larger.
+
+    retention_seconds: Optional[float]
+        segments whose newest record is older are deleted.
+
+    codec: Union[str, AbstractCodec]
+        codec appended messages are encoded with, pickle by default.\n
+        Records of any registered codec are read back.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 << 20,
+                 index_interval: int = 4096, retention_bytes: int = None,
+                 retention_seconds: float = None,
+                 codec: Union[str, AbstractCodec] = None):
+        if segment_size < _HEADER.size:
+            raise ValueError(f"segment_size must be at least {_HEADER.size}")
+        if index_interval <= 0:
+            raise ValueError("index_interval must be greater than 0")
+        self.__directory = os.fspath(directory)
+        self.__segment_size = segment_size
+        self.__index_interval = index_interval
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.__codec = get_codec(codec)
+        self.__lock = Lock()
+        self.__readable = Condition(self.__lock)
+        self.__waiting_readers = 0
+        self.__segments: List[_Segment] = []
+        self.__bases: List[int] = []
+        self.__closed = False
+        os.makedirs(self.__directory, exist_ok=True)
+        self.__recover()
+
+    def __recover(self):
+        bases = sorted(int(name[:-len(_LOG_SUFFIX)])
+                       for name in os.listdir(self.__directory)
+                       if name.endswith(_LOG_SUFFIX))
+        for i, base in enumerate(bases):
+            segment = _Segment(self.__directory, base)
+            segment.recover(self.__segment_size, active=i == len(bases) - 1)
+            self.__segments.append(segment)
+            self.__bases.append(base)
+        if not self.__segments:
+            self.__roll(self.__segment_size)
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def segment_size(self) -> int:
+        return self.__segment_size
+
+    @property
+    def index_interval(self) -> int:
+        return self.__index_interval
+
+    @property
+    def codec(self) -> AbstractCodec:
+        return self.__codec
+
+    @property
+    def start_offset(self) -> int:
+        """Offset of the oldest retained message."""
+        return self.__segments[0].base
+
+    @property
+    def next_offset(self) -> int:
+        """Offset the next appended message gets."""
+        return self.__segments[-1].next_offset
+
+    @property
+    def segments(self) -> int:
+        return len(self.__segments)
+
+    @property
+    def size(self) -> int:
+        """Bytes used by the records of every segment."""
+        return sum(segment.position for segment in self.__segments)
+
+    def append(self, message: Any) -> int:
+        """Appends message and returns its offset."""
+        return self.append_many((message,))
+
+    def append_many(self, messages: Iterable[Any]) -> int:
+        """Appends messages taking the lock once, returns the offset of\n
+        the first one."""
+        records = []
+        encode = self.__codec.encode
+        for message in messages:
+            kind, data = encode(message)
+            parts = _parts(data)
+            records.append((kind, parts, sum(p.nbytes for p in parts)))
+        with self.__lock:
+            self.__check_open()
+            first = self.next_offset
+            last_time = self.__segments[-1].last_time or 0.0
+            for kind, parts, size in records:
+                active = self.__segments[-1]
+                if active.position + _HEADER.size + size > active.capacity:
+                    active = self.__roll(_HEADER.size + size)
+                timestamp = last_time = max(time.time(), last_time)
+                active.append(kind, parts, size, timestamp,
+                              self.__index_interval)
+            if self.__waiting_readers:
+                self.__readable.notify_all()
+        return first
+
+    def read(self, offset: int, max_n: int) -> Tuple[List[Any], int, int]:
+        """Returns (messages, next offset, skipped) starting at offset.
+
+        Messages older than the retention are skipped. A batch never\n
+        spans two segments."""
+        if max_n <= 0:
+            raise ValueError("max_n must be greater than 0")
+        with self.__lock:
+            self.__check_open()
+            skipped = 0
+            if offset < self.start_offset:
+                skipped = self.start_offset - offset
+                offset = self.start_offset
+            if offset >= self.next_offset:
+                return [], offset, skipped
+            segment = self.__segments[
+                bisect.bisect_right(self.__bases, offset) - 1]
+            start = position = segment.locate(offset)
+            mm = segment.mm
+            records = []
+            count = min(max_n, segment.next_offset - offset)
+            for _ in range(count):
+                size, kind = _HEADER.unpack_from(mm, position)[:2]
+                records.append((kind, position - start + _HEADER.size, size))
+                position += _HEADER.size + size
+            chunk = mm[start:position]
+        view = memoryview(chunk)
+        messages = [decode(kind, view[begin:begin + size])
+                    for kind, begin, size in records]
+        return messages, offset + count, skipped
+
+    def find(self, timestamp: float) -> int:
+        """Returns the offset of the first message appended at or after\n
+        timestamp, next_offset when there is none."""
+        with self.__lock:
+            self.__check_open()
+            for segment in self.__segments:
+                if segment.last_time is not None and \
+                        segment.last_time >= timestamp:
+                    return segment.find(timestamp)
+            return self.next_offset
+
+    def wait_readable(self, offset: int, timeout: float = None) -> bool:
+        if offset < self.next_offset:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__lock:
+            self.__waiting_readers += 1
+            try:
+                while offset >= self.next_offset and not self.__closed:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                    self.__readable.wait(remaining)
+                return offset < self.next_offset
+            finally:
+                self.__waiting_readers -= 1
+
+    def retain(self) -> int:
+        """Deletes the oldest segments exceeding the retention limits and\n
+        returns how many were deleted. Called on every rollover."""
+        with self.__lock:
+            self.__check_open()
+            return self.__retain()
+
+    def flush(self) -> None:
+        """Writes the mapped pages of the active segment to disk."""
+        with self.__lock:
+            if not self.__closed:
+                self.__segments[-1].flush()
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+            for segment in self.__segments:
+                segment.close()
+            self.__readable.notify_all()
+
+    def __check_open(self):
+        if self.__closed:
+            raise ValueError(f"log {self.__directory} is closed")
+
+    def __roll(self, record_size: int) -> _Segment:
+        if self.__segments and not self.__segments[-1].position:
+            # an empty segment is too small for the record, replace it.
+            self.__segments.pop().delete()
+            self.__bases.pop()
+        elif self.__segments:
+            self.__segments[-1].seal()
+        segment = _Segment(self.__directory, self.next_offset
+                           if self.__segments else 0)
+        segment.create(max(self.__segment_size, record_size))
+        self.__segments.append(segment)
+        self.__bases.append(segment.base)
+        self.__retain()
+        return segment
+
+    def __retain(self) -> int:
+        deleted = 0
+        now = time.time()
+        size = sum(segment.position for segment in self.__segments)
+        while len(self.__segments) > 1:
+            oldest = self.__segments[0]
+            expired = self.retention_seconds is not None and \
+                oldest.last_time is not None and \
+                oldest.last_time < now - self.retention_seconds
+            oversized = self.retention_bytes is not None and \
+                size > self.retention_bytes
+            if not (expired or oversized):
+                break
+            size -= oldest.position
+            oldest.delete()
+            del self.__segments[0], self.__bases[0]
+            deleted += 1
+        return deleted
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class LogReaderQueue(Queue):
+    """Reader of a `SegmentedLog` with the `queue.Queue` interface.
+
+    Used as the queue of a Subscriber, it replays the log from its offset\n
+    and then follows new messages. put appends to the log.
+
+    Attributes:
+    -----------
+    offset: int
+        offset of the next message to read.
+
+    dropped: int
+        messages skipped because retention deleted them before they\n
+        were read.
+    """
+
+    def __init__(self, log: SegmentedLog, offset: int = None,
+                 timestamp: float = None):
+        super().__init__()
+        self.__log = log
+        self.__dropped = 0
+        self.seek(offset, timestamp)
+
+    @property
+    def log(self) -> SegmentedLog:
+        return self.__log
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    def seek(self, offset: int = None, timestamp: float = None):
+        """Moves to offset, to the first message at or after timestamp,\n
+        or to the end of the log when both are None."""
+        if offset is not None and timestamp is not None:
+            raise ValueError("pass either offset or timestamp")
+        if offset is not None:
+            if offset < 0:
+                raise ValueError("offset must not be negative")
+            self.offset = offset
+        elif timestamp is not None:
+            self.offset = self.__log.find(timestamp)
+        else:
+            self.offset = self.__log.next_offset
+
+    def get(self, block: bool = True, timeout: float = None):
+        return self.get_many(1, block, timeout)[0]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_many(self, max_n: int, block: bool = False,
+                 timeout: float = None) -> List[Any]:
+        """Returns up to max_n messages, raises Empty when there is none."""
+        log = self.__log
+        while True:
+            if not log.wait_readable(self.offset, timeout if block else 0):
+                raise Empty
+            messages, self.offset, skipped = log.read(self.offset, max_n)
+            self.__dropped += skipped
+            if messages:
+                return messages
+
+    def put(self, item: Any, block: bool = True, timeout: float = None):
+        self.__log.append(item)
+
+    def put_nowait(self, item: Any):
+        return self.put(item)
+
+    def qsize(self) -> int:
+        return max(self.__log.next_offset - self.offset, 0)
+
+    def empty(self) -> bool:
+        return self.offset >= self.__log.next_offset
+
+    def full(self) -> bool:
+        return False
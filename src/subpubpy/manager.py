@@ -1,34 +1,266 @@
-from typing import AnyStr
+import logging
+import weakref
+from typing import AnyStr, Iterable
 from threading import Lock
 from .abstract import AbstractSubscriber, AbstractChannel, AbstractChannelManager
 from .channels import SimpleChannel
+from .utils import TopicTrie, topic_matches, _reaper
+from . import metrics
 
 
 class _ChannelManager(AbstractChannelManager):
+    """Process wide registry of the channels by name.
+
+    The channel map is split into lock stripes chosen by the hash of the\n
+    channel name. Publishing looks channels up without locking, creating,\n
+    registering and removing a channel only lock its own stripe, so\n
+    publishers and subscribers of unrelated channels never contend.
+
+    Pattern subscriptions live in a TopicTrie. The pattern subscribers of\n
+    a channel are resolved once when the channel is created, cached, and\n
+    attached to it, adding or removing a pattern updates the cache and\n
+    the matching channels incrementally. Publishing never looks at them.
+
+    Subscribers are held through weak references, by the channels and by\n
+    the pattern trie, a collected subscriber is removed from both. The\n
+    channels the manager created on demand are removed again once their\n
+    last subscriber left, publishing to a name nobody subscribed to, by\n
+    name or pattern, does not create a channel. Registered channels stay\n
+    until they are replaced or unregistered.
+
+    The manager is a singleton constructed by every Publisher and\n
+    Subscriber, only the first construction initializes it.
+    """
     _instance = None
     _lock: Lock = Lock()
+    _stripes: int = 16
 
     def __new__(cls):
-        if not cls._instance:
-            cls._instance = super(_ChannelManager, cls).__new__(cls)
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(_ChannelManager, cls).__new__(cls)
         return cls._instance
 
     def __init__(self):
-        self.__channels = dict()
+        if '_ChannelManager__shards' in self.__dict__:
+            return
+        with self._lock:
+            if '_ChannelManager__shards' in self.__dict__:
+                return
+            self.__mask = self._stripes - 1
+            self.__locks = tuple(Lock() for _ in range(self._stripes))
+            self.__patterns = TopicTrie()
+            self.__patterns_lock = Lock()
+            self.__resolved = dict()
+            self.__shards = tuple(dict() for _ in range(self._stripes))
+            metrics.track(self)
+
+    def __stripe(self, channel_name: AnyStr) -> int:
+        return hash(channel_name) & self.__mask
 
     def _get_or_create(self, channel_name: AnyStr) -> AbstractChannel:
-        if channel_name not in self.__channels:
-            self.__channels[channel_name] = SimpleChannel(channel_name)
-        return self.__channels[channel_name]
+        index = self.__stripe(channel_name)
+        shard = self.__shards[index]
+        channel = shard.get(channel_name)
+        if channel is None:
+            with self.__locks[index]:
+                channel = shard.get(channel_name)
+                if channel is None:
+                    channel = SimpleChannel(channel_name)
+                    channel._emptied = self.__drop
+                    with self.__patterns_lock:
+                        self.__join_patterns(channel)
+                        shard[channel_name] = channel
+        return channel
+
+    def __lookup(self, channel_name: AnyStr) -> AbstractChannel:
+        channel = self.__shards[self.__stripe(channel_name)].get(channel_name)
+        if channel is None and len(self.__patterns):
+            with self.__patterns_lock:
+                resolved = self.__patterns.get(channel_name)
+                if resolved:
+                    # cached for the channel created below.
+                    self.__resolved[channel_name] = resolved
+            if resolved:
+                channel = self._get_or_create(channel_name)
+        return channel
+
+    def __drop(self, channel: AbstractChannel):
+        # removes a channel created on demand once nobody subscribes to
+        # it, a subscriber attaching meanwhile keeps it.
+        name = channel.name
+        index = self.__stripe(name)
+        shard = self.__shards[index]
+        with self.__locks[index]:
+            if shard.get(name) is not channel or channel.subscribers:
+                return
+            with self.__patterns_lock:
+                del shard[name]
+                self.__resolved.pop(name, None)
+
+    def __pattern_subscribers(self, channel_name: AnyStr) -> frozenset:
+        # called with the patterns lock held.
+        resolved = self.__resolved.get(channel_name)
+        if resolved is None:
+            resolved = self.__patterns.get(channel_name)
+            self.__resolved[channel_name] = resolved
+        return resolved
+
+    def __join_patterns(self, channel: AbstractChannel):
+        for ref in self.__pattern_subscribers(channel.name):
+            subscriber = ref()
+            if subscriber is not None:
+                self.__attach(channel, subscriber)
+
+    @staticmethod
+    def __attach(channel: AbstractChannel, subscriber: AbstractSubscriber):
+        try:
+            channel.attach(subscriber)
+        except ValueError as exc:
+            # channels with their own buffer, e.g. a RingBufferChannel,
+            # only accept subscribers reading it through its reader().
+            logging.warning("[Pattern] %s skips %s: %s", subscriber,
+                            channel.name, exc)
+
+    def register(self, channel: AbstractChannel):
+        """Registers a channel instance, e.g. a SharedMemoryChannel, under\n
+        its name so publishing to that name uses it."""
+        if not isinstance(channel, AbstractChannel):
+            raise TypeError(f"{channel} is not an AbstractChannel")
+        index = self.__stripe(channel.name)
+        with self.__locks[index]:
+            with self.__patterns_lock:
+                self.__join_patterns(channel)
+                self.__shards[index][channel.name] = channel
+
+    def unregister(self, channel: AbstractChannel) -> bool:
+        """Removes a registered channel, publishing to its name no longer\n
+        reaches it. Returns False when the name holds another channel."""
+        name = channel.name
+        index = self.__stripe(name)
+        shard = self.__shards[index]
+        with self.__locks[index]:
+            if shard.get(name) is not channel:
+                return False
+            with self.__patterns_lock:
+                del shard[name]
+                self.__resolved.pop(name, None)
+            return True
 
     def add(self, channel_name: AnyStr, subscriber: AbstractSubscriber):
-        channel = self._get_or_create(channel_name)
-        channel.attach(subscriber)
+        index = self.__stripe(channel_name)
+        while True:
+            channel = self._get_or_create(channel_name)
+            channel.attach(subscriber)
+            # the channel may have been dropped before the attach.
+            with self.__locks[index]:
+                if self.__shards[index].get(channel_name) is channel:
+                    return
 
     def remove(self, channel_name: AnyStr, subscriber: AbstractSubscriber):
-        channel = self._get_or_create(channel_name)
+        channel = self.__shards[self.__stripe(channel_name)].get(channel_name)
+        if channel is None:
+            return
+        with self.__patterns_lock:
+            if weakref.ref(subscriber) in \
+                    self.__pattern_subscribers(channel_name):
+                return
         channel.detach(subscriber)
+        if channel._emptied is not None:
+            self.__drop(channel)
+
+    def add_pattern(self, pattern: AnyStr, subscriber: AbstractSubscriber):
+        ref = _reaper.ref(subscriber, self.__forget, pattern)
+        with self.__patterns_lock:
+            self.__patterns.add(pattern, ref)
+            channels = self.channels
+            for name, resolved in list(self.__resolved.items()):
+                if topic_matches(pattern, name):
+                    self.__resolved[name] = resolved | {ref}
+                    if name in channels:
+                        self.__attach(channels[name], subscriber)
+
+    def remove_pattern(self, pattern: AnyStr,
+                       subscriber: AbstractSubscriber) -> bool:
+        ref = weakref.ref(subscriber)
+        detached = []
+        with self.__patterns_lock:
+            if not self.__patterns.remove(pattern, ref):
+                return False
+            channels = self.channels
+            for name in list(self.__resolved):
+                if not topic_matches(pattern, name):
+                    continue
+                resolved = self.__resolved[name] = self.__patterns.get(name)
+                if name in channels and ref not in resolved and \
+                        name not in subscriber.channels:
+                    channels[name].detach(subscriber)
+                    detached.append(channels[name])
+        for channel in detached:
+            if channel._emptied is not None:
+                self.__drop(channel)
+        return True
+
+    def __forget(self, pattern: AnyStr, ref: weakref.ref):
+        # runs on the reaper thread once a pattern subscriber is collected,
+        # the channels detach it on their own.
+        with self.__patterns_lock:
+            if not self.__patterns.remove(pattern, ref):
+                return
+            for name in list(self.__resolved):
+                if topic_matches(pattern, name):
+                    self.__resolved[name] = self.__patterns.get(name)
+
+    @property
+    def patterns(self) -> dict:
+        patterns = dict()
+        with self.__patterns_lock:
+            for pattern in self.__patterns:
+                subscribers = (ref() for ref in self.__patterns[pattern])
+                patterns[pattern] = frozenset(
+                    subscriber for subscriber in subscribers
+                    if subscriber is not None)
+        return patterns
+
+    def retained(self, channel_name: AnyStr) -> list:
+        """Returns the retained messages of a channel without subscribing,\n
+        an empty list when the channel retains nothing."""
+        channel = self.__shards[self.__stripe(channel_name)].get(channel_name)
+        store = getattr(channel, "retained", None)
+        return store.messages() if store is not None else []
+
+    def codec(self, channel_name: AnyStr):
+        """Returns the codec of a channel, None when the channel does not\n
+        exist or has no codec."""
+        channel = self.__shards[self.__stripe(channel_name)].get(channel_name)
+        return getattr(channel, "codec", None)
+
+    @property
+    def channels(self) -> dict:
+        channels = dict()
+        for shard in self.__shards:
+            channels.update(shard.copy())
+        return channels
 
     def publish(self, channel_name, msg):
-        channel = self._get_or_create(channel_name)
-        channel.on_message(msg)
+        channel = self.__lookup(channel_name)
+        registry = metrics.active
+        if registry is not None:
+            registry.published(metrics.CHANNELS, channel_name)
+        if channel is not None:
+            channel.on_message(msg)
+
+    def publish_many(self, channel_name, msgs: Iterable):
+        channel = self.__lookup(channel_name)
+        msgs = list(msgs)
+        registry = metrics.active
+        if registry is not None:
+            registry.published(metrics.CHANNELS, channel_name, len(msgs))
+        if channel is not None:
+            channel.on_messages(msgs)
+
+    def _metrics(self, high_watermarks):
+        for name, channel in self.channels.items():
+            yield metrics.CHANNELS, name, metrics.channel_stats(
+                channel, high_watermarks)
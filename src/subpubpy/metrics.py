@@ -0,0 +1,284 @@
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+from weakref import WeakKeyDictionary, WeakSet
+
+# Registry which receives the measurements, None while metrics are
+# disabled. Hot paths only read this attribute, so disabled metrics cost
+# a single global lookup.
+active: "MetricsRegistry" = None
+
+# Buses and channel managers created by this process, they are inspected
+# lazily when a snapshot is taken.
+_tracked = WeakSet()
+
+# Bus name the channel metrics are reported under, buses cannot take it.
+CHANNELS = "channels"
+
+
+def track(obj: Any) -> None:
+    """Makes a bus or channel manager visible in metrics snapshots."""
+    _tracked.add(obj)
+
+
+def owner(event: str, callback: Callable) -> Optional[str]:
+    """Name of the tracked bus callback is subscribed to event on, None\n
+    when there is none. Only looked up when a callback fails."""
+    for obj in list(_tracked):
+        owns = getattr(obj, "_owns", None)
+        if owns is not None and owns(event, callback):
+            return obj.name
+    return None
+
+
+def enable(registry: "MetricsRegistry" = None) -> "MetricsRegistry":
+    """Starts collecting metrics into registry, a new one by default."""
+    global active
+    active = registry or MetricsRegistry()
+    return active
+
+
+def disable() -> None:
+    """Stops collecting metrics."""
+    global active
+    active = None
+
+
+class AbstractExporter(ABC):
+    """Abstract metrics exporter.
+
+    Methods:
+    --------
+    @abstractmethod\n
+    export(snapshot)
+        publish a snapshot taken by MetricsRegistry.snapshot().
+    """
+
+    @abstractmethod
+    def export(self, snapshot: Dict[str, Any]) -> None:
+        pass
+
+
+class MetricsRegistry:
+    """Collects publish counts and callback errors and reports them, with\n
+    the subscriber counts, queue depths and drops of every tracked bus\n
+    and channel manager, through `snapshot`.
+
+    Methods:
+    --------
+    snapshot()
+        return the current metrics as nested dictionaries.
+
+    add_exporter(exporter)
+        register an exporter used by export().
+
+    export()
+        hand a snapshot to every exporter.
+
+    start(interval) / stop()
+        export periodically from a daemon thread.
+    """
+    _stripes: int = 16
+
+    def __init__(self):
+        self.__lock = Lock()
+        # publish counts and high watermarks are recorded on every publish
+        # of every bus and channel, they are split into lock stripes so
+        # unrelated publishers never contend and merged by snapshot().
+        self.__mask = self._stripes - 1
+        self.__locks = tuple(Lock() for _ in range(self._stripes))
+        self.__published = tuple(defaultdict(int)
+                                 for _ in range(self._stripes))
+        self.__high_watermarks = tuple(WeakKeyDictionary()
+                                       for _ in range(self._stripes))
+        self.__errors = defaultdict(int)
+        self.__budgets = defaultdict(int)
+        self.__exporters: List[AbstractExporter] = []
+        self.__stop = None
+
+    def published(self, bus: str, name: str, count: int = 1) -> None:
+        key = (bus, name)
+        index = hash(key) & self.__mask
+        with self.__locks[index]:
+            self.__published[index][key] += count
+
+    def budget(self, bus: str, event: str, name: str,
+               count: int = 1) -> None:
+        """Counts a budget event, e.g. a trip, of a subscription."""
+        with self.__lock:
+            self.__budgets[(bus, event, name)] += count
+
+    def callback_error(self, event: str = None, bus: str = None) -> None:
+        with self.__lock:
+            self.__errors[(bus, event)] += 1
+
+    def observe_queue(self, subscriber: Any, depth: int) -> None:
+        index = id(subscriber) >> 4 & self.__mask
+        with self.__locks[index]:
+            high_watermarks = self.__high_watermarks[index]
+            if depth > high_watermarks.get(subscriber, 0):
+                high_watermarks[subscriber] = depth
+
+    def snapshot(self) -> Dict[str, Any]:
+        published, high_watermarks = dict(), dict()
+        for index, lock in enumerate(self.__locks):
+            with lock:
+                published.update(self.__published[index])
+                high_watermarks.update(self.__high_watermarks[index])
+        with self.__lock:
+            errors = dict(self.__errors)
+            budgets = dict(self.__budgets)
+
+        events = defaultdict(dict)
+        channels = dict()
+        for obj in list(_tracked):
+            for bus, name, stats in obj._metrics(high_watermarks):
+                if bus == CHANNELS:
+                    channels[name] = stats
+                elif name in events[bus]:
+                    # buses sharing a name are reported together.
+                    events[bus][name]["subscribers"] += stats["subscribers"]
+                else:
+                    events[bus][name] = stats
+        for (bus, name), count in published.items():
+            if bus == CHANNELS:
+                stats = channels.setdefault(name, _channel_stats())
+            else:
+                stats = events[bus].setdefault(name, _event_stats())
+            stats["published"] = count
+        for (bus, name, counter), count in budgets.items():
+            stats = events[bus].setdefault(name, _event_stats())
+            stats[f"budget_{counter}"] = count
+        callback_errors = defaultdict(dict)
+        for (bus, event), count in errors.items():
+            callback_errors[bus][event] = count
+        return {"events": dict(events), "channels": channels,
+                "callback_errors": dict(callback_errors)}
+
+    def add_exporter(self, exporter: AbstractExporter) -> None:
+        if not isinstance(exporter, AbstractExporter):
+            raise TypeError(f"{exporter} is not an AbstractExporter")
+        self.__exporters.append(exporter)
+
+    def export(self) -> None:
+        snapshot = self.snapshot()
+        for exporter in self.__exporters:
+            exporter.export(snapshot)
+
+    def start(self, interval: float = 10.0) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be greater than 0")
+        if self.__stop is not None:
+            raise RuntimeError("exporting already started")
+        stop = self.__stop = Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.export()
+
+        Thread(name="subpub-metrics", target=run, daemon=True).start()
+
+    def stop(self) -> None:
+        if self.__stop is not None:
+            self.__stop.set()
+            self.__stop = None
+
+
+def _event_stats() -> Dict[str, int]:
+    return {"published": 0, "subscribers": 0}
+
+
+def _channel_stats() -> Dict[str, int]:
+    return {"published": 0, "subscribers": 0, "queue_depth": 0,
+            "queue_high_watermark": 0, "dropped": 0}
+
+
+def event_stats(handler: Any) -> Dict[str, Dict[str, int]]:
+    """Subscriber counts of a subpub handler registry."""
+    result = dict()
+    for event in list(handler):
+        try:
+            subscribers = len(handler[event])
+        except KeyError:
+            continue
+        stats = _event_stats()
+        stats["subscribers"] = subscribers
+        result[event] = stats
+    return result
+
+
+def channel_stats(channel: Any, high_watermarks: Dict[Any, int]
+                  ) -> Dict[str, int]:
+    """Subscriber, queue depth and drop figures of a channel."""
+    stats = _channel_stats()
+    for subscriber in list(channel.subscribers):
+        depth = subscriber.qsize()
+        stats["subscribers"] += 1
+        stats["queue_depth"] += depth
+        stats["dropped"] += subscriber.dropped
+        stats["queue_high_watermark"] = max(
+            stats["queue_high_watermark"], depth,
+            high_watermarks.get(subscriber, 0))
+    return stats
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n") \
+        .replace('"', '\\"')
+
+
+def to_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Renders a snapshot in the Prometheus text exposition format."""
+    samples = defaultdict(list)
+    for bus, events in snapshot["events"].items():
+        for event, stats in events.items():
+            labels = f'bus="{_escape(bus)}",event="{_escape(event)}"'
+            for key, value in stats.items():
+                samples[f"subpub_event_{key}"].append((labels, value))
+    for channel, stats in snapshot["channels"].items():
+        labels = f'channel="{_escape(channel)}"'
+        for key, value in stats.items():
+            samples[f"subpub_channel_{key}"].append((labels, value))
+    for bus, errors in snapshot["callback_errors"].items():
+        for event, value in errors.items():
+            labels = (f'bus="{_escape(bus if bus is not None else "")}",'
+                      f'event="{_escape(event if event is not None else "")}"')
+            samples["subpub_callback_errors"].append((labels, value))
+
+    lines = []
+    for metric, values in samples.items():
+        counter = metric.endswith(("published", "dropped", "errors", "calls",
+                                   "exceeded", "timeouts", "rejected",
+                                   "isolations", "trips"))
+        name = f"{metric}_total" if counter else metric
+        lines.append(f"# TYPE {name} {'counter' if counter else 'gauge'}")
+        for labels, value in values:
+            lines.append(f"{name}{{{labels}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusFileExporter(AbstractExporter):
+    """Writes snapshots in the Prometheus text format to a file, e.g. for\n
+    the node exporter textfile collector. The file is replaced atomically.
+    """
+
+    def __init__(self, path: str):
+        self.__path = os.fspath(path)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def export(self, snapshot: Dict[str, Any]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.__path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(to_prometheus(snapshot))
+            os.replace(tmp, self.__path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
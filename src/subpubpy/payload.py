@@ -0,0 +1,201 @@
+import pickle
+from typing import Any, Tuple
+from .shm import _attach, _create, _unlink
+
+
+def _shaped(data: Any, format: str, shape: Tuple[int, ...]) -> memoryview:
+    view = memoryview(data)
+    if view.format != format or view.shape != shape:
+        try:
+            view = view.cast("B").cast(format, shape)
+        except (TypeError, ValueError):
+            # formats memoryview can't cast to stay readable as bytes.
+            view = view.cast("B")
+    return view
+
+
+def _restore(data: Any, format: str, shape: Tuple[int, ...]):
+    return SharedPayload(_shaped(data, format, shape))
+
+
+def _open(name: str, nbytes: int, format: str, shape: Tuple[int, ...]):
+    return SharedMemoryPayload._open(name, nbytes, format, shape)
+
+
+class SharedPayload:
+    """Read-only binary payload shared by every subscriber without copies.
+
+    Wraps any C-contiguous object supporting the buffer protocol (bytes,\n
+    bytearray, mmap, array, numpy arrays, ...) without copying it. A frame\n
+    published to many subscribers exists once in memory and every\n
+    subscriber reads it through the same read-only `view`.
+
+    From python 3.12 the payload itself supports the buffer protocol,\n
+    older versions pass `view` to consumers of buffers, e.g.\n
+    `numpy.frombuffer(payload.view)`.
+
+    Pickling with protocol 5 passes the buffer out-of-band to the\n
+    `buffer_callback` instead of copying it into the pickle stream, the\n
+    SharedMemoryChannel uses this to copy the frame straight into shared\n
+    memory.
+
+    Attributes:
+    -----------
+    view: memoryview
+        read-only view of the payload with its original format and shape.
+
+    nbytes: int
+        size of the payload in bytes.
+
+    Methods:
+    --------
+    tobytes()
+        return a copy of the payload as bytes.
+
+    release()
+        release the view, the payload can't be read afterwards.
+    """
+
+    def __init__(self, data: Any):
+        if isinstance(data, SharedPayload):
+            data = data.view
+        view = memoryview(data)
+        if not view.c_contiguous:
+            raise ValueError("payload must be a C-contiguous buffer")
+        self.__view = view.toreadonly()
+
+    def __repr__(self) -> str:
+        view = self.__view
+        return "{}(nbytes={}, format={!r}, shape={})".format(
+            type(self).__name__, view.nbytes, view.format, view.shape)
+
+    def __len__(self) -> int:
+        return self.__view.nbytes
+
+    def __bytes__(self) -> bytes:
+        return self.__view.tobytes()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SharedPayload):
+            other = other.view
+        try:
+            other = memoryview(other)
+        except TypeError:
+            return NotImplemented
+        return self.__view.cast("B") == other.cast("B")
+
+    __hash__ = None
+
+    def __buffer__(self, flags: int) -> memoryview:
+        # buffer protocol of python >= 3.12, memoryview(payload) works.
+        # Older versions pass `payload.view` to buffer consumers.
+        return self.__view
+
+    def __reduce_ex__(self, protocol: int):
+        view = self.__view
+        data = pickle.PickleBuffer(view) if protocol >= 5 else view.tobytes()
+        return _restore, (data, view.format, view.shape)
+
+    @property
+    def view(self) -> memoryview:
+        return self.__view
+
+    @property
+    def nbytes(self) -> int:
+        return self.__view.nbytes
+
+    @property
+    def format(self) -> str:
+        return self.__view.format
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.__view.shape
+
+    def tobytes(self) -> bytes:
+        return self.__view.tobytes()
+
+    def release(self) -> None:
+        self.__view.release()
+
+
+class SharedMemoryPayload(SharedPayload):
+    """SharedPayload stored in its own `multiprocessing.shared_memory`\n
+    segment and passed between processes by handle.
+
+    The data is copied once into the segment. Pickling only transfers the\n
+    segment name, receivers of any process map the same memory without\n
+    copying it, e.g. after reading it from a SharedMemoryChannel.
+
+    The creating process owns the segment and unlinks it on `release()`\n
+    or when the payload is garbage collected, so it must keep the payload\n
+    alive until every receiver has read it. Receivers keep their mapping\n
+    after the owner unlinked the segment. Slices taken from `view` must\n
+    be released before the payload, `release()` raises BufferError\n
+    while one is still referenced.
+
+    Attributes:
+    -----------
+    name: str
+        name of the shared memory segment.
+
+    owner: bool
+        True in the process which created the segment.
+    """
+
+    def __init__(self, data: Any, name: str = None):
+        source = SharedPayload(data).view
+        self.__owner = True
+        self.__unlinked = False
+        self.__shm = _create(name, max(source.nbytes, 1))
+        self.__buf = self.__shm.buf[:source.nbytes]
+        self.__buf[:] = source.cast("B")
+        super().__init__(_shaped(self.__buf, source.format, source.shape))
+
+    @classmethod
+    def _open(cls, name: str, nbytes: int, format: str,
+              shape: Tuple[int, ...]) -> "SharedMemoryPayload":
+        self = cls.__new__(cls)
+        self.__owner = False
+        self.__unlinked = False
+        self.__shm = _attach(name)
+        self.__buf = self.__shm.buf[:nbytes]
+        SharedPayload.__init__(self, _shaped(self.__buf, format, shape))
+        return self
+
+    def __reduce_ex__(self, protocol: int):
+        if self.__shm is None:
+            raise ValueError(f"{self!r} is released")
+        return _open, (self.name, self.nbytes, self.format, self.shape)
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name if self.__shm is not None else None
+
+    @property
+    def owner(self) -> bool:
+        return self.__owner
+
+    def release(self) -> None:
+        """Releases the view and unmaps the segment, the owner also unlinks\n
+        it so receivers can no longer attach."""
+        shm = self.__shm
+        if shm is None:
+            return
+        super().release()
+        self.__buf.release()
+        if self.__owner and not self.__unlinked:
+            self.__unlinked = True
+            _unlink(shm)
+        try:
+            shm.close()
+        except BufferError:
+            raise BufferError(f"slices of {shm.name} are still referenced, "
+                              "release them first") from None
+        self.__shm = None
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from queue import Queue, Full
+from typing import Any, Callable, Hashable, Iterable
+from .abstract import AbstractOverflowPolicy
+from .utils import put_many
+
+
+def _require_standard_queue(q: Queue, policy: AbstractOverflowPolicy):
+    if type(q).put is not Queue.put:
+        raise ValueError(f"{policy} requires a queue.Queue which does not "
+                         f"override put, got {type(q).__name__}")
+
+
+class BlockPolicy(AbstractOverflowPolicy):
+    """Blocks the publisher until the subscriber queue has room, this is\n
+    the default policy and never drops messages."""
+
+    def put(self, q: Queue, message: Any) -> bool:
+        q.put(message)
+        return True
+
+    def put_many(self, q: Queue, messages: Iterable[Any]):
+        put_many(q, messages)
+
+
+class BlockTimeoutPolicy(AbstractOverflowPolicy):
+    """Blocks the publisher for at most `timeout` seconds, then drops the\n
+    message."""
+
+    def __init__(self, timeout: float):
+        super().__init__()
+        if timeout < 0:
+            raise ValueError("timeout must not be negative")
+        self.__timeout = timeout
+
+    @property
+    def timeout(self) -> float:
+        return self.__timeout
+
+    def put(self, q: Queue, message: Any) -> bool:
+        try:
+            q.put(message, timeout=self.__timeout)
+            return True
+        except Full:
+            self._count_drop()
+            return False
+
+
+class DropNewestPolicy(AbstractOverflowPolicy):
+    """Drops the incoming message when the subscriber queue is full."""
+
+    def put(self, q: Queue, message: Any) -> bool:
+        try:
+            q.put_nowait(message)
+            return True
+        except Full:
+            self._count_drop()
+            return False
+
+
+class DropOldestPolicy(AbstractOverflowPolicy):
+    """Makes room by dropping the message the queue would return next,\n
+    so the subscriber always sees the most recent messages."""
+
+    def validate(self, q: Queue):
+        _require_standard_queue(q, self)
+
+    def put(self, q: Queue, message: Any) -> bool:
+        with q.not_full:
+            dropped = q.maxsize > 0 and q._qsize() >= q.maxsize
+            if dropped:
+                q._get()
+                q.unfinished_tasks -= 1
+                self._count_drop()
+            q._put(message)
+            q.unfinished_tasks += 1
+            q.not_empty.notify()
+        return not dropped
+
+    def offer_many(self, q: Queue, messages: Iterable[Any]):
+        # put never waits with this policy.
+        self.put_many(q, messages)
+
+
+class ConflatingQueue(Queue):
+    """Queue which keeps only the latest message per key.
+
+    A message whose key is already queued replaces the queued one and\n
+    keeps its position.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable], maxsize: int = 0):
+        if not callable(key):
+            raise TypeError(f"{type(key)} is not Callable")
+        self.__key = key
+        super().__init__(maxsize)
+
+    @property
+    def key(self) -> Callable[[Any], Hashable]:
+        return self.__key
+
+    def _init(self, maxsize):
+        self.queue = OrderedDict()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        self.queue[self.__key(item)] = item
+
+    def _get(self):
+        return self.queue.popitem(last=False)[1]
+
+
+class ConflatePolicy(AbstractOverflowPolicy):
+    """Keeps only the latest message per key, computed by `key(message)`.
+
+    A newer message replaces the queued message of the same key. When\n
+    the queue is full with distinct keys the oldest key is dropped.\n
+    Replaced and dropped messages are both counted as drops. Messages\n
+    are keyed by the ConflatingQueue, a queue passed to the subscriber\n
+    explicitly conflates by its own key.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable]):
+        super().__init__()
+        if not callable(key):
+            raise TypeError(f"{type(key)} is not Callable")
+        self.__key = key
+
+    @property
+    def key(self) -> Callable[[Any], Hashable]:
+        return self.__key
+
+    def make_queue(self, maxsize: int) -> Queue:
+        return ConflatingQueue(self.__key, maxsize)
+
+    def validate(self, q: Queue):
+        if not isinstance(q, ConflatingQueue):
+            raise ValueError(f"{self} requires a ConflatingQueue")
+
+    def put(self, q: ConflatingQueue, message: Any) -> bool:
+        key = q.key(message)
+        with q.not_full:
+            if key in q.queue:
+                q.queue[key] = message
+                self._count_drop()
+                return False
+            dropped = q.maxsize > 0 and q._qsize() >= q.maxsize
+            if dropped:
+                q._get()
+                q.unfinished_tasks -= 1
+                self._count_drop()
+            q.queue[key] = message
+            q.unfinished_tasks += 1
+            q.not_empty.notify()
+        return not dropped
+
+    def offer_many(self, q: Queue, messages: Iterable[Any]):
+        # put never waits with this policy.
+        self.put_many(q, messages)
@@ -0,0 +1,166 @@
+"""Waiting on several subscribers at once, in a thread with a Poller or\n
+in a selector or event loop through the `fileno()` of each subscriber."""
+import os
+import time
+from threading import Condition, Lock
+from typing import Iterable, List
+
+
+class _Signal:
+    """File descriptor readable while the signal is set, an eventfd where\n
+    the platform has one and a pipe elsewhere.
+
+    Setting a set signal, or clearing a clear one, costs no system call.
+    """
+
+    def __init__(self):
+        if hasattr(os, "eventfd"):
+            fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+            self.__rfd = self.__wfd = fd
+        else:
+            self.__rfd, self.__wfd = os.pipe()
+            os.set_blocking(self.__rfd, False)
+            os.set_blocking(self.__wfd, False)
+        self.__lock = Lock()
+        self.__set = False
+
+    def fileno(self) -> int:
+        return self.__rfd
+
+    @property
+    def is_set(self) -> bool:
+        return self.__set
+
+    def set(self) -> None:
+        if self.__set:
+            return
+        with self.__lock:
+            if self.__set:
+                return
+            self.__set = True
+            if self.__rfd == self.__wfd:
+                os.eventfd_write(self.__wfd, 1)
+            else:
+                os.write(self.__wfd, b"\x01")
+
+    def clear(self) -> None:
+        if not self.__set:
+            return
+        with self.__lock:
+            if not self.__set:
+                return
+            self.__set = False
+            try:
+                if self.__rfd == self.__wfd:
+                    os.eventfd_read(self.__rfd)
+                else:
+                    os.read(self.__rfd, 64)
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        with self.__lock:
+            os.close(self.__rfd)
+            if self.__wfd != self.__rfd:
+                os.close(self.__wfd)
+
+
+class Poller:
+    """Waits until one of its subscribers has pending messages.
+
+    Subscribers wake their pollers when they are notified, a waiting\n
+    `poll` sleeps on a condition and uses no CPU. Readiness is level\n
+    triggered, a subscriber is returned by every `poll` until it is\n
+    drained. Only subscribers fed through `notify` wake a poller,\n
+    shared memory, ring buffer and durable readers are not.
+
+    Parameters:
+    -----------
+    subscribers: Optional[Iterable]
+        subscribers registered at once.
+
+    Methods:
+    --------
+    register(*subscribers)
+        starts watching subscribers.
+
+    unregister(*subscribers)
+        stops watching subscribers.
+
+    poll(timeout)
+        returns the ready subscribers.
+
+    close()
+        unregisters every subscriber.
+    """
+
+    def __init__(self, subscribers: Iterable = ()):
+        self.__cond = Condition(Lock())
+        self.__subscribers = set()
+        self.__flagged = set()
+        self.register(*subscribers)
+
+    def register(self, *subscribers) -> None:
+        for subscriber in subscribers:
+            if subscriber in self.__subscribers:
+                continue
+            subscriber._watch(self._wake)
+            with self.__cond:
+                self.__subscribers.add(subscriber)
+            if not subscriber.is_empty():
+                self._wake(subscriber)
+
+    def unregister(self, *subscribers) -> None:
+        for subscriber in subscribers:
+            with self.__cond:
+                if subscriber not in self.__subscribers:
+                    continue
+                self.__subscribers.discard(subscriber)
+                self.__flagged.discard(subscriber)
+            subscriber._unwatch(self._wake)
+
+    def close(self) -> None:
+        self.unregister(*list(self.__subscribers))
+
+    def _wake(self, subscriber) -> None:
+        with self.__cond:
+            if subscriber in self.__subscribers:
+                self.__flagged.add(subscriber)
+                self.__cond.notify_all()
+
+    def poll(self, timeout: float = None) -> List:
+        """Returns the subscribers with pending messages, waiting up to\n
+        timeout seconds for one, an empty list when none became ready.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__cond:
+            while True:
+                ready = [subscriber for subscriber in self.__flagged
+                         if not subscriber.is_empty()]
+                self.__flagged = set(ready)
+                if ready:
+                    return ready
+                if deadline is None:
+                    self.__cond.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return ready
+                self.__cond.wait(remaining)
+
+    def __len__(self) -> int:
+        return len(self.__subscribers)
+
+    def __enter__(self) -> "Poller":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def wait_any(subscribers: Iterable, timeout: float = None) -> List:
+    """Blocks until one of subscribers has pending messages, returns the\n
+    ready ones, an empty list once timeout expires. Keep a Poller to wait\n
+    on the same subscribers repeatedly."""
+    with Poller(subscribers) as poller:
+        return poller.poll(timeout)
@@ -0,0 +1,147 @@
+"""Length-prefixed binary protocol spoken between a broker and clients.
+
+Every frame is `<u32 length><u8 opcode><body>`, length counting the\n
+opcode and body. Frames are pipelined, a client never waits for a reply\n
+unless it sends a PING. PUBLISH and MESSAGE frames carry a batch of\n
+records of one channel:
+
+    <u16 name length><name utf-8><u32 count>{<u8 kind><u32 size><data>}
+
+Records hold messages encoded by a codec of `subpubpy.serialization`,\n
+the broker forwards them without decoding.
+"""
+import socket
+import struct
+from typing import Any, Iterable, List, Tuple, Union
+from .abstract import AbstractCodec
+from .serialization import get_codec
+
+SUBSCRIBE = 1
+UNSUBSCRIBE = 2
+SUBSCRIBE_PATTERN = 3
+UNSUBSCRIBE_PATTERN = 4
+PUBLISH = 5
+MESSAGE = 6
+PING = 7
+PONG = 8
+ERROR = 9
+
+MAX_FRAME_SIZE = 1 << 28
+
+_FRAME = struct.Struct("<IB")
+_NAME = struct.Struct("<H")
+_COUNT = struct.Struct("<I")
+_RECORD = struct.Struct("<BI")
+_TOKEN = struct.Struct("<Q")
+
+# sendmsg accepts at most IOV_MAX buffers per call.
+_MAX_PARTS = 512
+
+
+def encode_record(message: Any, codec: Union[str, AbstractCodec] = None
+                  ) -> Tuple[int, List[Any], int]:
+    """Returns (kind, data parts, size) of message."""
+    kind, data = get_codec(codec).encode(message)
+    parts = data if isinstance(data, list) else [data]
+    return kind, parts, sum(memoryview(part).nbytes for part in parts)
+
+
+def frame(opcode: int, parts: List[Any], size: int) -> List[Any]:
+    """Prefixes body parts of size bytes with the frame header."""
+    if size + 1 > MAX_FRAME_SIZE:
+        raise ValueError(f"frame of {size} bytes exceeds {MAX_FRAME_SIZE}")
+    return [_FRAME.pack(size + 1, opcode), *parts]
+
+
+def name_frame(opcode: int, name: str) -> List[Any]:
+    data = name.encode()
+    return frame(opcode, [data], len(data))
+
+
+def token_frame(opcode: int, token: int) -> List[Any]:
+    return frame(opcode, [_TOKEN.pack(token)], _TOKEN.size)
+
+
+def batch_frame(opcode: int, channel: str,
+                records: Iterable[Tuple[int, List[Any], int]]) -> List[Any]:
+    """Frames the (kind, parts, size) records of channel."""
+    name = channel.encode()
+    parts = [_NAME.pack(len(name)), name, None]
+    count = 0
+    size = _NAME.size + len(name) + _COUNT.size
+    for kind, data, nbytes in records:
+        parts.append(_RECORD.pack(kind, nbytes))
+        parts.extend(data)
+        size += _RECORD.size + nbytes
+        count += 1
+    parts[2] = _COUNT.pack(count)
+    return frame(opcode, parts, size)
+
+
+def parse_name(body: memoryview) -> str:
+    return bytes(body).decode()
+
+
+def parse_token(body: memoryview) -> int:
+    return _TOKEN.unpack_from(body)[0]
+
+
+def parse_batch(body: memoryview) -> Tuple[str, List[Tuple[int, memoryview]]]:
+    """Returns the channel and the (kind, data) records of a batch frame,\n
+    data are views of body."""
+    length = _NAME.unpack_from(body)[0]
+    position = _NAME.size + length
+    channel = bytes(body[_NAME.size:position]).decode()
+    count = _COUNT.unpack_from(body, position)[0]
+    position += _COUNT.size
+    records = []
+    for _ in range(count):
+        kind, size = _RECORD.unpack_from(body, position)
+        position += _RECORD.size
+        if position + size > len(body):
+            raise ValueError("truncated record")
+        records.append((kind, body[position:position + size]))
+        position += size
+    return channel, records
+
+
+def read_frame(rfile, max_frame_size: int = MAX_FRAME_SIZE):
+    """Reads the next (opcode, body) from a buffered socket file, returns\n
+    None when the peer closed the connection."""
+    header = rfile.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    length, opcode = _FRAME.unpack(header)
+    if not 0 < length <= max_frame_size:
+        raise ValueError(f"invalid frame length {length}")
+    body = rfile.read(length - 1)
+    if len(body) < length - 1:
+        return None
+    return opcode, memoryview(body)
+
+
+def send_parts(sock: socket.socket, parts: List[Any]) -> None:
+    """Writes parts with scatter-gather I/O, without joining them."""
+    views = [view.cast("B") for view in map(memoryview, parts) if view.nbytes]
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(views))
+        return
+    while views:
+        chunk = views[:_MAX_PARTS]
+        sent = sock.sendmsg(chunk)
+        while sent:
+            if sent >= chunk[0].nbytes:
+                sent -= chunk[0].nbytes
+                chunk.pop(0)
+                views.pop(0)
+            else:
+                views[0] = chunk[0] = chunk[0][sent:]
+                sent = 0
+
+
+def parse_address(address):
+    """Returns the socket family of a (host, port) tuple or a unix path."""
+    if isinstance(address, (tuple, list)):
+        return socket.AF_INET6 if ":" in address[0] else socket.AF_INET, \
+            tuple(address)
+    return socket.AF_UNIX, str(address)
@@ -1,4 +1,4 @@
-from typing import AnyStr
+from typing import AnyStr, Iterable
 from .abstract import AbstractPublisher
 from .manager import _ChannelManager
 
@@ -10,3 +10,6 @@ class SimplePublisher(AbstractPublisher):
 
     def publish(self, channel: AnyStr, message: AnyStr):
         return super().publish(channel, message)
+
+    def publish_many(self, channel: AnyStr, messages: Iterable[AnyStr]):
+        return super().publish_many(channel, messages)
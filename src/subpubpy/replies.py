@@ -0,0 +1,202 @@
+"""Request/reply over a bus: requests carry a correlation id and the\n
+inbox of their caller, replies complete the waiting future directly."""
+import itertools
+import time
+from concurrent.futures import Future, InvalidStateError
+from threading import Lock
+from typing import Any, Optional, Tuple
+from .utils import _timers
+
+
+class Request:
+    """Payload delivered to the responders of `request` and `scatter`.
+
+    Attributes:
+    -----------
+    payload: Any
+        payload of the request.
+
+    correlation_id: int
+        id of the request in the inbox of its caller.
+
+    inbox: Inbox
+        inbox the replies go to.
+
+    Methods:
+    --------
+    reply(value)
+        answer the request.
+
+    fail(exc)
+        answer the request with an exception.
+    """
+    __slots__ = ("payload", "correlation_id", "inbox")
+
+    def __init__(self, payload: Any, correlation_id: int, inbox: "Inbox"):
+        self.payload = payload
+        self.correlation_id = correlation_id
+        self.inbox = inbox
+
+    def reply(self, value: Any = None) -> bool:
+        """Completes the request with value, returns False when it is\n
+        already complete, expired or cancelled."""
+        return self.inbox.deliver(self.correlation_id, value)
+
+    def fail(self, exc: BaseException) -> bool:
+        """Completes the request with exc, raised by `future.result()`."""
+        return self.inbox.deliver(self.correlation_id, error=exc)
+
+    def __repr__(self) -> str:
+        return "Request({}, {!r})".format(self.correlation_id, self.payload)
+
+
+class _Pending:
+    __slots__ = ("future", "replies", "expected")
+
+    def __init__(self, future: Future, replies: Optional[list],
+                 expected: Optional[int]):
+        self.future = future
+        self.replies = replies
+        self.expected = expected
+
+
+class Inbox:
+    """Reply inbox of a caller, it maps the correlation ids of the\n
+    pending requests to their futures.
+
+    A reply completes its future in the thread of the responder, there\n
+    is no thread per request and nothing polls. Timeouts are scheduled on\n
+    the shared timer thread of the windows. Every bus has a default\n
+    inbox, components pass an inbox of their own to keep their requests\n
+    apart and `close` them together.
+
+    Attributes:
+    -----------
+    pending: int
+        number of requests waiting for replies.
+    """
+
+    def __init__(self):
+        self.__ids = itertools.count(1)
+        self.__lock = Lock()
+        self.__pending = dict()
+        self.__closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self.__pending)
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def open(self, payload: Any, timeout: float = None,
+             gather: bool = False,
+             replies: int = None) -> Tuple[Request, Future]:
+        """Registers a request, returns it with the future of its reply.
+
+        Parameters:
+        -----------
+        payload: Any
+            payload of the request.
+
+        timeout: Optional[float]
+            seconds to wait for the replies.
+
+        gather: Optional[bool]
+            collect a list of replies instead of the first one.
+
+        replies: Optional[int]
+            number of replies completing a gather, when None a gather\n
+            completes when timeout expires.
+        """
+        if timeout is not None and timeout <= 0:
+            raise ValueError("timeout must be greater than 0")
+        if replies is not None and replies <= 0:
+            raise ValueError("replies must be greater than 0")
+        if gather and replies is None and timeout is None:
+            raise ValueError("a gather requires replies or a timeout")
+        if self.__closed:
+            raise RuntimeError("cannot open a request on a closed inbox")
+        correlation_id = next(self.__ids)
+        future = Future()
+        entry = _Pending(future, [] if gather else None, replies)
+        with self.__lock:
+            self.__pending[correlation_id] = entry
+        future.add_done_callback(
+            lambda _: self.__pending.pop(correlation_id, None))
+        if timeout is not None:
+            _timers.call_at(time.monotonic() + timeout,
+                            lambda: self.__expire(correlation_id, timeout))
+        return Request(payload, correlation_id, self), future
+
+    def deliver(self, correlation_id: int, value: Any = None,
+                error: BaseException = None) -> bool:
+        """Completes, or adds a reply to, a pending request."""
+        with self.__lock:
+            entry = self.__pending.get(correlation_id)
+            if entry is None:
+                return False
+            if entry.replies is None:
+                del self.__pending[correlation_id]
+                result = None
+            else:
+                entry.replies.append(error if error is not None else value)
+                if entry.expected is None or \
+                        len(entry.replies) < entry.expected:
+                    return True
+                del self.__pending[correlation_id]
+                result = entry.replies
+        if result is not None:
+            return _complete(entry.future, result)
+        if error is not None:
+            return _fail(entry.future, error)
+        return _complete(entry.future, value)
+
+    def finish(self, correlation_id: int) -> bool:
+        """Completes a pending request at once, a gather with the replies\n
+        received so far, a single request with LookupError."""
+        with self.__lock:
+            entry = self.__pending.pop(correlation_id, None)
+        if entry is None:
+            return False
+        if entry.replies is None:
+            return _fail(entry.future, LookupError("no responders"))
+        return _complete(entry.future, list(entry.replies))
+
+    def close(self) -> None:
+        """Cancels every pending request, later requests raise."""
+        with self.__lock:
+            self.__closed = True
+            entries = list(self.__pending.values())
+            self.__pending.clear()
+        for entry in entries:
+            entry.future.cancel()
+
+    def __expire(self, correlation_id: int, timeout: float):
+        with self.__lock:
+            entry = self.__pending.pop(correlation_id, None)
+        if entry is None:
+            return
+        if entry.replies is None:
+            _fail(entry.future, TimeoutError(
+                f"no reply within {timeout} seconds"))
+        else:
+            _complete(entry.future, list(entry.replies))
+
+
+def _complete(future: Future, result: Any) -> bool:
+    try:
+        future.set_result(result)
+    except InvalidStateError:
+        # cancelled by its caller meanwhile.
+        return False
+    return True
+
+
+def _fail(future: Future, exc: BaseException) -> bool:
+    try:
+        future.set_exception(exc)
+    except InvalidStateError:
+        return False
+    return True
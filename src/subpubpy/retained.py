@@ -0,0 +1,101 @@
+from collections import OrderedDict, deque
+from typing import Any, Callable, Hashable, Iterable, List
+from .abstract import AbstractRetainedStore
+
+
+class LastNStore(AbstractRetainedStore):
+    """Retains the last `n` messages of a channel."""
+
+    def __init__(self, n: int = 1):
+        super().__init__()
+        if n <= 0:
+            raise ValueError("n must be greater than 0")
+        self.__messages = deque(maxlen=n)
+
+    @property
+    def n(self) -> int:
+        return self.__messages.maxlen
+
+    def update(self, message: Any):
+        with self._lock:
+            self.__messages.append(message)
+
+    def update_many(self, messages: Iterable[Any]):
+        with self._lock:
+            self.__messages.extend(messages)
+
+    def messages(self) -> List[Any]:
+        with self._lock:
+            return list(self.__messages)
+
+    def clear(self):
+        with self._lock:
+            self.__messages.clear()
+
+    def __len__(self) -> int:
+        return len(self.__messages)
+
+
+class LastValueStore(AbstractRetainedStore):
+    """Retains the last message per key, e.g. the last price per symbol.
+
+    Parameters:
+    -----------
+    key: Callable[[Any], Hashable]
+        returns the key of a message.
+
+    max_keys: int
+        keys retained at most, the least recently updated key is\n
+        evicted first.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable],
+                 max_keys: int = 10000):
+        super().__init__()
+        if not callable(key):
+            raise TypeError(f"{key} is not callable")
+        if max_keys <= 0:
+            raise ValueError("max_keys must be greater than 0")
+        self.__key = key
+        self.__max_keys = max_keys
+        self.__messages = OrderedDict()
+
+    @property
+    def max_keys(self) -> int:
+        return self.__max_keys
+
+    def update(self, message: Any):
+        key = self.__key(message)
+        with self._lock:
+            self.__store(key, message)
+
+    def update_many(self, messages: Iterable[Any]):
+        keyed = [(self.__key(message), message) for message in messages]
+        with self._lock:
+            for key, message in keyed:
+                self.__store(key, message)
+
+    def __store(self, key: Hashable, message: Any):
+        messages = self.__messages
+        messages[key] = message
+        messages.move_to_end(key)
+        if len(messages) > self.__max_keys:
+            messages.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the last message of key."""
+        return self.__messages.get(key, default)
+
+    def messages(self) -> List[Any]:
+        with self._lock:
+            return list(self.__messages.values())
+
+    def clear(self):
+        with self._lock:
+            self.__messages.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__messages
+
+    def __len__(self) -> int:
+        return len(self.__messages)
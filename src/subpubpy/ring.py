@@ -0,0 +1,223 @@
+from queue import Queue, Empty, Full
+from threading import Condition, Lock
+from typing import Any, Iterable, List
+from weakref import WeakSet
+import time
+
+
+class BroadcastRing:
+    """Preallocated broadcast ring buffer for a single process.
+
+    Every message is stored once, each reader follows it with its own\n
+    sequence cursor. Writers share one lock, readers consume without it\n
+    and only touch the lock to sleep while there is nothing to read.
+
+    Attributes:
+    -----------
+    capacity: int
+        number of slots, rounded up to a power of two.
+
+    blocking: bool
+        if True writers wait for the slowest reader when the ring is\n
+        full, else they overwrite and lapped readers skip ahead, the\n
+        skipped messages are counted as dropped by the reader.
+    """
+
+    def __init__(self, capacity: int = 1024, blocking: bool = True):
+        if capacity <= 0:
+            raise ValueError("capacity must be greater than 0")
+        capacity = 1 << (capacity - 1).bit_length()
+        self.__capacity = capacity
+        self.__mask = capacity - 1
+        self.__blocking = blocking
+        self.__slots = [None] * capacity
+        self.__published = 0
+        self.__gate = 0
+        self.__readers = WeakSet()
+        self.__lock = Lock()
+        self.__readable = Condition(self.__lock)
+        self.__writable = Condition(self.__lock)
+        self.__waiting_readers = 0
+        self.__waiting_writers = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def blocking(self) -> bool:
+        return self.__blocking
+
+    @property
+    def published(self) -> int:
+        return self.__published
+
+    @property
+    def readers(self) -> int:
+        return len(self.__readers)
+
+    def register(self, reader: "RingBufferQueue") -> int:
+        """Adds reader and returns its start cursor, the next sequence."""
+        with self.__lock:
+            self.__readers.add(reader)
+            return self.__published
+
+    def unregister(self, reader: "RingBufferQueue"):
+        with self.__lock:
+            self.__readers.discard(reader)
+            if self.__waiting_writers:
+                self.__writable.notify_all()
+
+    def publish(self, message: Any, timeout: float = None):
+        self.publish_many((message,), timeout)
+
+    def publish_many(self, messages: Iterable[Any], timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        slots, mask, capacity = self.__slots, self.__mask, self.__capacity
+        with self.__lock:
+            seq = self.__published
+            try:
+                for message in messages:
+                    while self.__blocking and seq - self.__gate >= capacity:
+                        self.__published = seq
+                        self.__wait_writable(seq, deadline)
+                        # other writers may have published while waiting.
+                        seq = self.__published
+                    slots[seq & mask] = message
+                    seq += 1
+            finally:
+                self.__published = seq
+                if self.__waiting_readers:
+                    self.__readable.notify_all()
+
+    def read(self, cursor: int, max_n: int):
+        """Returns (messages, next cursor, skipped) starting at cursor."""
+        slots, mask, capacity = self.__slots, self.__mask, self.__capacity
+        while True:
+            published = self.__published
+            skipped = 0
+            if published - cursor > capacity:
+                skipped = published - capacity - cursor
+                cursor += skipped
+            count = min(max_n, published - cursor)
+            messages = [slots[seq & mask]
+                        for seq in range(cursor, cursor + count)]
+            # a lossy writer may have lapped the slots while copying them.
+            if self.__blocking or self.__published - cursor <= capacity:
+                return messages, cursor + count, skipped
+            cursor -= skipped
+
+    def advanced(self):
+        """Called by readers after moving their cursor."""
+        if self.__waiting_writers:
+            with self.__lock:
+                self.__writable.notify_all()
+
+    def wait_readable(self, cursor: int, timeout: float = None) -> bool:
+        if cursor != self.__published:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__lock:
+            self.__waiting_readers += 1
+            try:
+                while cursor == self.__published:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                    self.__readable.wait(remaining)
+                return True
+            finally:
+                self.__waiting_readers -= 1
+
+    def __min_cursor(self, seq: int) -> int:
+        return min((reader.cursor for reader in self.__readers), default=seq)
+
+    def __wait_writable(self, seq: int, deadline: float):
+        # announce the writer before reading the cursors, a reader moving
+        # its cursor afterwards sees it in advanced() and wakes it up.
+        self.__waiting_writers += 1
+        try:
+            self.__gate = self.__min_cursor(seq)
+            while seq - self.__gate >= self.__capacity:
+                if self.__waiting_readers:
+                    self.__readable.notify_all()
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Full("ring buffer is full")
+                self.__writable.wait(remaining)
+                self.__gate = self.__min_cursor(seq)
+        finally:
+            self.__waiting_writers -= 1
+
+
+class RingBufferQueue(Queue):
+    """Reader cursor of a `BroadcastRing` with the `queue.Queue` interface.
+
+    Used as the queue of a Subscriber, get_message and get_messages read\n
+    straight from the shared ring. put publishes to every reader.
+
+    Attributes:
+    -----------
+    cursor: int
+        sequence of the next message to read.
+
+    dropped: int
+        messages skipped because a lossy ring lapped this reader.
+    """
+
+    def __init__(self, ring: BroadcastRing):
+        super().__init__()
+        self.__ring = ring
+        self.__dropped = 0
+        self.cursor = ring.register(self)
+
+    @property
+    def ring(self) -> BroadcastRing:
+        return self.__ring
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    def get(self, block: bool = True, timeout: float = None):
+        return self.get_many(1, block, timeout)[0]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_many(self, max_n: int, block: bool = False,
+                 timeout: float = None) -> List[Any]:
+        """Returns up to max_n messages, raises Empty when there is none."""
+        if max_n <= 0:
+            raise ValueError("max_n must be greater than 0")
+        ring = self.__ring
+        if not ring.wait_readable(self.cursor, timeout if block else 0):
+            raise Empty
+        messages, self.cursor, skipped = ring.read(self.cursor, max_n)
+        if skipped:
+            self.__dropped += skipped
+        ring.advanced()
+        return messages
+
+    def put(self, item: Any, block: bool = True, timeout: float = None):
+        self.__ring.publish(item, timeout if block else 0)
+
+    def put_nowait(self, item: Any):
+        return self.put(item, block=False)
+
+    def qsize(self) -> int:
+        return min(self.__ring.published - self.cursor, self.__ring.capacity)
+
+    def empty(self) -> bool:
+        return self.__ring.published == self.cursor
+
+    def full(self) -> bool:
+        return False
+
+    def close(self):
+        """Stops following the ring so writers no longer wait for it."""
+        self.__ring.unregister(self)
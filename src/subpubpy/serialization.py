@@ -0,0 +1,265 @@
+"""Codecs encoding messages for the transports crossing the process:\n
+shared memory, durable logs and the broker. A channel selects its codec\n
+by name, records carry their kind so they decode without it.
+
+Pickle and marshal must not decode records of untrusted peers, loading\n
+a pickle can execute arbitrary code. Receivers of such records pass the\n
+codec they expect to `decode`, records of other kinds are rejected."""
+import json
+import marshal
+import pickle
+import struct
+from threading import Lock
+from typing import Any, List, Union
+from .abstract import AbstractCodec
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_KIND_PICKLE = 0
+_KIND_BYTES = 1
+_KIND_OUT_OF_BAND = 2
+_KIND_MARSHAL = 3
+_KIND_JSON = 4
+_KIND_MSGPACK = 5
+
+_OOB_HEADER = struct.Struct("<QQ")
+
+_UNSET = object()
+
+
+class PickleCodec(AbstractCodec):
+    """Pickle protocol 5, the default codec. Bytes-like messages are stored\n
+    raw, out-of-band buffers of the pickle (SharedPayload, numpy arrays,\n
+    ...) are not copied into the stream, they are written next to it."""
+    name = "pickle"
+    kinds = (_KIND_PICKLE, _KIND_OUT_OF_BAND)
+
+    def encode(self, message: Any):
+        if isinstance(message, (bytes, bytearray, memoryview)):
+            return _KIND_BYTES, message
+        buffers = []
+        stream = pickle.dumps(message, protocol=5,
+                              buffer_callback=buffers.append)
+        if not buffers:
+            return _KIND_PICKLE, stream
+        views = [buffer.raw() for buffer in buffers]
+        header = _OOB_HEADER.pack(len(views), len(stream)) + struct.pack(
+            f"<{len(views)}Q", *(view.nbytes for view in views))
+        return _KIND_OUT_OF_BAND, [header, stream, *views]
+
+    def accepts(self, kind: int) -> bool:
+        return kind in self.kinds or kind == _KIND_BYTES
+
+    def decode(self, kind: int, view: memoryview) -> Any:
+        if kind != _KIND_OUT_OF_BAND:
+            return pickle.loads(view)
+        count, size = _OOB_HEADER.unpack_from(view)
+        start = _OOB_HEADER.size + 8 * count
+        sizes = struct.unpack_from(f"<{count}Q", view, _OOB_HEADER.size)
+        # out-of-band buffers are copied out of the record once, the
+        # message does not reference the transport memory.
+        data = memoryview(bytearray(view[start + size:]))
+        buffers, offset = [], 0
+        for nbytes in sizes:
+            buffers.append(data[offset:offset + nbytes])
+            offset += nbytes
+        return pickle.loads(view[start:start + size], buffers=buffers)
+
+
+class RawCodec(AbstractCodec):
+    """Bytes-like messages as they are, decoded as bytes."""
+    name = "raw"
+    kinds = (_KIND_BYTES,)
+
+    def encode(self, message: Any):
+        if not isinstance(message, (bytes, bytearray, memoryview)):
+            raise TypeError(f"{type(message).__name__} is not bytes-like")
+        return _KIND_BYTES, message
+
+    def decode(self, kind: int, view: memoryview) -> Any:
+        return bytes(view)
+
+
+class MarshalCodec(AbstractCodec):
+    """marshal of the builtin types, faster than pickle for plain data."""
+    name = "marshal"
+    kinds = (_KIND_MARSHAL,)
+
+    def encode(self, message: Any):
+        return _KIND_MARSHAL, marshal.dumps(message)
+
+    def decode(self, kind: int, view: memoryview) -> Any:
+        return marshal.loads(view)
+
+
+class JSONCodec(AbstractCodec):
+    """Compact UTF-8 JSON, readable by clients in any language."""
+    name = "json"
+    kinds = (_KIND_JSON,)
+
+    def encode(self, message: Any):
+        return _KIND_JSON, json.dumps(
+            message, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def decode(self, kind: int, view: memoryview) -> Any:
+        return json.loads(bytes(view))
+
+
+class MsgpackCodec(AbstractCodec):
+    """MessagePack, registered when the msgpack package is installed."""
+    name = "msgpack"
+    kinds = (_KIND_MSGPACK,)
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("MsgpackCodec requires the msgpack package")
+
+    def encode(self, message: Any):
+        return _KIND_MSGPACK, msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, kind: int, view: memoryview) -> Any:
+        return msgpack.unpackb(view, raw=False)
+
+
+_codecs = dict()
+_kinds = dict()
+_lock = Lock()
+
+
+def register_codec(codec: AbstractCodec) -> AbstractCodec:
+    """Makes codec selectable by its name, raises ValueError when its name\n
+    or one of its kinds is taken by another codec."""
+    if not isinstance(codec, AbstractCodec):
+        raise TypeError(f"{codec} is not an AbstractCodec")
+    with _lock:
+        if codec.name in _codecs:
+            raise ValueError(f"codec {codec.name!r} is already registered")
+        taken = [kind for kind in codec.kinds if kind in _kinds]
+        if taken:
+            raise ValueError(f"record kinds {taken} are already registered")
+        _codecs[codec.name] = codec
+        for kind in codec.kinds:
+            _kinds[kind] = codec
+    return codec
+
+
+def get_codec(codec: Union[str, AbstractCodec] = None) -> AbstractCodec:
+    """Returns the codec registered as codec, or codec itself, pickle when\n
+    codec is None."""
+    if codec is None:
+        return _DEFAULT
+    if isinstance(codec, AbstractCodec):
+        return codec
+    try:
+        return _codecs[codec]
+    except KeyError:
+        raise ValueError(f"unknown codec {codec!r}, registered codecs "
+                         f"are {sorted(_codecs)}") from None
+
+
+def codecs() -> List[str]:
+    return list(_codecs)
+
+
+def encode(message: Any, codec: Union[str, AbstractCodec] = None):
+    """Returns the (kind, data) record of message."""
+    return get_codec(codec).encode(message)
+
+
+def decode(kind: int, view: memoryview,
+           expect: Union[str, AbstractCodec] = None) -> Any:
+    """Returns the message of a record with the codec of its kind, when\n
+    expect is given records that codec does not accept raise ValueError."""
+    if expect is not None:
+        expect = get_codec(expect)
+        if not expect.accepts(kind):
+            raise ValueError(f"record kind {kind} is not accepted by the "
+                             f"{expect.name} codec")
+    try:
+        codec = _kinds[kind]
+    except KeyError:
+        raise ValueError(f"unknown record kind {kind}") from None
+    return codec.decode(kind, view)
+
+
+_DEFAULT = register_codec(PickleCodec())
+register_codec(RawCodec())
+register_codec(MarshalCodec())
+register_codec(JSONCodec())
+if msgpack is not None:
+    register_codec(MsgpackCodec())
+
+
+class Frame:
+    """Message encoded once and shared by every subscriber forwarding it\n
+    out of the process.
+
+    Decoding is lazy: `message` decodes the record on first access and\n
+    caches it, consumers only looking at `channel` never decode. A frame\n
+    created from a message returns that message without decoding.
+
+    Attributes:
+    -----------
+    channel: str
+        channel the message was published to.
+
+    kind: int
+        record kind, it selects the codec decoding the message.
+
+    parts: list
+        bytes-like parts of the record.
+
+    nbytes: int
+        size of the record.
+
+    expect: Optional[AbstractCodec]
+        codec the record must have been encoded with, `message` raises\n
+        ValueError for records of other kinds. Frames received from\n
+        untrusted peers set it, None decodes any registered kind.
+    """
+    __slots__ = ("channel", "kind", "parts", "nbytes", "expect", "_message")
+
+    def __init__(self, kind: int, data: Any, channel: str = None,
+                 message: Any = _UNSET,
+                 expect: Union[str, AbstractCodec] = None):
+        parts = data if isinstance(data, list) else [data]
+        self.channel = channel
+        self.kind = kind
+        self.expect = None if expect is None else get_codec(expect)
+        self.parts = parts
+        self.nbytes = sum(memoryview(part).nbytes for part in parts)
+        self._message = message
+
+    @classmethod
+    def of(cls, message: Any, codec: Union[str, AbstractCodec] = None,
+           channel: str = None) -> "Frame":
+        """Encodes message, frames are returned as they are."""
+        if isinstance(message, Frame):
+            return message
+        kind, data = get_codec(codec).encode(message)
+        return cls(kind, data, channel, message)
+
+    @property
+    def codec(self) -> AbstractCodec:
+        return _kinds[self.kind]
+
+    @property
+    def decoded(self) -> bool:
+        return self._message is not _UNSET
+
+    @property
+    def message(self) -> Any:
+        message = self._message
+        if message is _UNSET:
+            parts = self.parts
+            view = memoryview(parts[0]) if len(parts) == 1 else \
+                memoryview(b"".join(parts))
+            message = self._message = decode(self.kind, view, self.expect)
+        return message
+
+    def __repr__(self) -> str:
+        return "Frame({}, {}, {} bytes)".format(
+            self.channel, self.codec.name, self.nbytes)
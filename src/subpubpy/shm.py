@@ -0,0 +1,350 @@
+import struct
+import time
+import multiprocessing
+import weakref
+from multiprocessing import shared_memory
+from queue import Queue, Empty, Full
+from typing import Any, Iterable, List, Tuple
+from .serialization import _KIND_PICKLE, encode, decode
+
+_MAGIC = 0x53554250554250  # "SUBPUBP"
+_U64 = struct.Struct("<Q")
+_RECORD = struct.Struct("<II")
+
+# header layout, every field is an unsigned 64 bit integer.
+_MAGIC_OFFSET = 0
+_CAPACITY_OFFSET = 8
+_MAX_READERS_OFFSET = 16
+_WRITE_SEQ_OFFSET = 24
+_WAITING_OFFSET = 32
+_SLOTS_OFFSET = 64
+_SLOT_SIZE = 16
+
+_KIND_WRAP = 0xFFFFFFFF
+
+_WAIT_SLICE = 0.05
+
+
+def _align(value: int, to: int = 8) -> int:
+    return (value + to - 1) & ~(to - 1)
+
+
+# names of the segments created by this process and its forked parents,
+# they are registered with the resource tracker this process shares.
+_created = set()
+
+
+def _create(name: str, size: int) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    _created.add(shm._name)
+    return shm
+
+
+def _unlink(shm: shared_memory.SharedMemory) -> None:
+    _created.discard(shm._name)
+    shm.unlink()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # python < 3.13 registers attached segments with the resource tracker
+    # which would unlink them when this process exits. Segments created
+    # here, or by a forked parent sharing the tracker, keep their single
+    # registration so the tracker still cleans them up after their owner.
+    shm = shared_memory.SharedMemory(name=name)
+    if shm._name not in _created:
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
+
+
+class SharedRingBuffer:
+    """Multi-producer broadcast ring buffer in `multiprocessing.shared_memory`.
+
+    Records are written once and read by every registered reader through\n
+    its own cursor stored in the shared header. A writer only waits when\n
+    the slowest reader is a whole buffer behind. Instances can be passed\n
+    to child processes, they attach to the same segment.
+
+    Attributes:
+    -----------
+    name: str
+        name of the shared memory segment.
+
+    capacity: int
+        size of the data region in bytes.
+
+    max_readers: int
+        number of reader cursors available.
+    """
+
+    def __init__(self, capacity: int = 1 << 20, max_readers: int = 16,
+                 name: str = None, ctx=None):
+        if capacity < 64:
+            raise ValueError("capacity must be at least 64 bytes")
+        if max_readers <= 0:
+            raise ValueError("max_readers must be greater than 0")
+        ctx = ctx or multiprocessing.get_context()
+        capacity = _align(capacity)
+        data_offset = _align(_SLOTS_OFFSET + max_readers * _SLOT_SIZE, 64)
+        self.__shm = _create(name, data_offset + capacity)
+        self.__lock = ctx.Lock()
+        self.__cond = ctx.Condition(ctx.Lock())
+        buf = self.__shm.buf
+        _U64.pack_into(buf, _CAPACITY_OFFSET, capacity)
+        _U64.pack_into(buf, _MAX_READERS_OFFSET, max_readers)
+        _U64.pack_into(buf, _MAGIC_OFFSET, _MAGIC)
+        self.__setup()
+
+    def __setup(self):
+        self.__buf = self.__shm.buf
+        self.__capacity = _U64.unpack_from(self.__buf, _CAPACITY_OFFSET)[0]
+        self.__max_readers = _U64.unpack_from(
+            self.__buf, _MAX_READERS_OFFSET)[0]
+        self.__data_offset = _align(
+            _SLOTS_OFFSET + self.__max_readers * _SLOT_SIZE, 64)
+
+    def __getstate__(self):
+        return self.__shm.name, self.__lock, self.__cond
+
+    def __setstate__(self, state):
+        name, self.__lock, self.__cond = state
+        self.__shm = _attach(name)
+        if _U64.unpack_from(self.__shm.buf, _MAGIC_OFFSET)[0] != _MAGIC:
+            raise ValueError(f"{name} is not a subpubpy ring buffer")
+        self.__setup()
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def max_readers(self) -> int:
+        return self.__max_readers
+
+    @property
+    def write_seq(self) -> int:
+        return _U64.unpack_from(self.__buf, _WRITE_SEQ_OFFSET)[0]
+
+    def write(self, data, kind: int = _KIND_PICKLE,
+              timeout: float = None) -> None:
+        """Appends one record, blocks while the slowest reader is full."""
+        self.write_many(((kind, data),), timeout)
+
+    def write_many(self, records: Iterable[Tuple[int, Any]],
+                   timeout: float = None) -> None:
+        """Appends (kind, data) records taking the writer lock once and\n
+        waking blocked readers once. data is a bytes-like object or a list\n
+        of them which are copied one after the other into the record."""
+        records = [(kind, self.__parts(data)) for kind, data in records]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        buf = self.__buf
+        with self.__lock:
+            for kind, data in records:
+                self.__write_locked(kind, data, deadline)
+        if _U64.unpack_from(buf, _WAITING_OFFSET)[0]:
+            with self.__cond:
+                self.__cond.notify_all()
+
+    def __parts(self, data) -> List[memoryview]:
+        parts = []
+        for part in data if isinstance(data, (list, tuple)) else (data,):
+            part = memoryview(part)
+            if part.ndim != 1 or part.format != "B":
+                part = part.cast("B")
+            parts.append(part)
+        size = sum(part.nbytes for part in parts)
+        if _align(_RECORD.size + size) > self.__capacity:
+            raise ValueError(f"record of {size} bytes exceeds "
+                             f"capacity {self.__capacity}")
+        return parts
+
+    def __write_locked(self, kind: int, parts: List[memoryview],
+                       deadline: float):
+        buf, capacity, base = self.__buf, self.__capacity, self.__data_offset
+        size = sum(part.nbytes for part in parts)
+        record = _align(_RECORD.size + size)
+        seq = self.write_seq
+        pos = seq % capacity
+        skip = capacity - pos if pos + record > capacity else 0
+        delay = 0.00001
+        while seq + skip + record - self.__min_cursor(seq) > capacity:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise Full(f"ring buffer {self.name} is full")
+            if _U64.unpack_from(buf, _WAITING_OFFSET)[0]:
+                with self.__cond:
+                    self.__cond.notify_all()
+            time.sleep(delay)
+            delay = min(delay * 2, 0.001)
+        if skip:
+            _RECORD.pack_into(buf, base + pos, _KIND_WRAP, skip)
+            pos = 0
+        _RECORD.pack_into(buf, base + pos, kind, size)
+        start = base + pos + _RECORD.size
+        for part in parts:
+            buf[start:start + part.nbytes] = part
+            start += part.nbytes
+        _U64.pack_into(buf, _WRITE_SEQ_OFFSET, seq + skip + record)
+
+    def register_reader(self) -> int:
+        """Allocates a reader slot positioned at the current write sequence."""
+        buf = self.__buf
+        with self.__lock:
+            for slot in range(self.__max_readers):
+                offset = _SLOTS_OFFSET + slot * _SLOT_SIZE
+                if not _U64.unpack_from(buf, offset)[0]:
+                    _U64.pack_into(buf, offset + 8, self.write_seq)
+                    _U64.pack_into(buf, offset, 1)
+                    return slot
+        raise ValueError(f"all {self.__max_readers} reader slots are in use")
+
+    def unregister_reader(self, slot: int) -> None:
+        with self.__lock:
+            if self.__buf is None:
+                return
+            _U64.pack_into(self.__buf, _SLOTS_OFFSET + slot * _SLOT_SIZE, 0)
+
+    def read(self, slot: int, block: bool = True, timeout: float = None):
+        """Returns the next (kind, memoryview) record of the reader slot.
+
+        The memoryview is only valid until `advance` is called."""
+        buf, base = self.__buf, self.__data_offset
+        offset = _SLOTS_OFFSET + slot * _SLOT_SIZE + 8
+        cursor = _U64.unpack_from(buf, offset)[0]
+        if cursor == self.write_seq and not self.__wait(
+                cursor, block, timeout):
+            raise Empty
+        pos = cursor % self.__capacity
+        kind, size = _RECORD.unpack_from(buf, base + pos)
+        if kind == _KIND_WRAP:
+            cursor += size
+            _U64.pack_into(buf, offset, cursor)
+            pos = 0
+            kind, size = _RECORD.unpack_from(buf, base)
+        start = base + pos + _RECORD.size
+        return kind, buf[start:start + size], \
+            cursor + _align(_RECORD.size + size)
+
+    def advance(self, slot: int, cursor: int) -> None:
+        _U64.pack_into(self.__buf, _SLOTS_OFFSET + slot * _SLOT_SIZE + 8,
+                       cursor)
+
+    def pending(self, slot: int) -> int:
+        """Number of bytes the reader slot has not consumed yet."""
+        offset = _SLOTS_OFFSET + slot * _SLOT_SIZE + 8
+        return self.write_seq - _U64.unpack_from(self.__buf, offset)[0]
+
+    def close(self) -> None:
+        if self.__buf is None:
+            return
+        self.__buf = None
+        self.__shm.close()
+
+    def unlink(self) -> None:
+        _unlink(self.__shm)
+
+    def __min_cursor(self, seq: int) -> int:
+        buf, lowest = self.__buf, seq
+        for slot in range(self.__max_readers):
+            offset = _SLOTS_OFFSET + slot * _SLOT_SIZE
+            if _U64.unpack_from(buf, offset)[0]:
+                lowest = min(lowest, _U64.unpack_from(buf, offset + 8)[0])
+        return lowest
+
+    def __wait(self, cursor: int, block: bool, timeout: float) -> bool:
+        if not block:
+            return False
+        buf = self.__buf
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__cond:
+            waiting = _U64.unpack_from(buf, _WAITING_OFFSET)[0]
+            _U64.pack_into(buf, _WAITING_OFFSET, waiting + 1)
+            try:
+                while cursor == self.write_seq:
+                    remaining = _WAIT_SLICE
+                    if deadline is not None:
+                        remaining = min(remaining,
+                                        deadline - time.monotonic())
+                        if remaining <= 0:
+                            return False
+                    self.__cond.wait(remaining)
+                return True
+            finally:
+                waiting = _U64.unpack_from(buf, _WAITING_OFFSET)[0]
+                _U64.pack_into(buf, _WAITING_OFFSET, waiting - 1)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class SharedMemoryQueue(Queue):
+    """Reader side of a `SharedRingBuffer` with the `queue.Queue` interface.
+
+    Each queue owns a reader cursor, so it can be handed to a Subscriber\n
+    of another process and consumed with the usual `get_message`. put\n
+    writes to the ring buffer and therefore reaches every reader. The\n
+    cursor is released by `close` or once the queue is garbage collected.
+    """
+
+    def __init__(self, ring: SharedRingBuffer):
+        super().__init__()
+        self.__ring = ring
+        self.__slot = ring.register_reader()
+        self.__finalizer = weakref.finalize(
+            self, ring.unregister_reader, self.__slot)
+
+    @property
+    def ring(self) -> SharedRingBuffer:
+        return self.__ring
+
+    def get(self, block: bool = True, timeout: float = None):
+        ring = self.__ring
+        kind, view, cursor = ring.read(self.__slot, block, timeout)
+        try:
+            return decode(kind, view)
+        finally:
+            view.release()
+            ring.advance(self.__slot, cursor)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def put(self, item: Any, block: bool = True, timeout: float = None):
+        kind, data = encode(item)
+        self.__ring.write(data, kind, timeout if block else 0)
+
+    def put_nowait(self, item: Any):
+        return self.put(item, block=False)
+
+    def qsize(self) -> int:
+        """Approximation: 1 when at least one message is pending else 0."""
+        return 1 if self.__ring.pending(self.__slot) else 0
+
+    def empty(self) -> bool:
+        return not self.__ring.pending(self.__slot)
+
+    def full(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        """Releases the reader cursor so writers no longer wait for it."""
+        if self.__slot is not None:
+            self.__finalizer()
+            self.__slot = None
+
+    def __reduce__(self):
+        raise TypeError("SharedMemoryQueue owns a reader cursor of this "
+                        "process, create one with channel.reader() instead")
@@ -1,25 +1,174 @@
-from typing import AnyStr, Set
+from typing import AnyStr, Iterable, Set
+from collections import deque
+from threading import Lock
 from queue import Queue
-from .abstract import AbstractSubscriber
+import asyncio
+from . import metrics
+from .abstract import AbstractSubscriber, AbstractOverflowPolicy
 from .manager import _ChannelManager
+from .policies import BlockPolicy, DropOldestPolicy
 
 
 class SimpleSubscriber(AbstractSubscriber):
 
-    def __init__(self, channels: Set = None, q: Queue = None):
-        super().__init__(_ChannelManager(), channels, q)
+    def __init__(self, channels: Set = None, q: Queue = None,
+                 overflow: AbstractOverflowPolicy = None):
+        super().__init__(_ChannelManager(), channels, q,
+                         overflow=overflow or BlockPolicy())
+        if self.channels:
+            self.add_channel(*self.channels)
 
     def get_message(self, block: bool = False):
         return super().get_message(block)
 
+    def get_messages(self, max_n: int, block: bool = False,
+                     timeout: float = None):
+        return super().get_messages(max_n, block, timeout)
+
     def listen(self):
         return super().listen()
 
     def notify(self, message: AnyStr):
         return super().notify(message)
 
+    def notify_many(self, messages: Iterable[AnyStr]):
+        return super().notify_many(messages)
+
     def add_channel(self, *args):
         return super().add_channel(*args)
 
     def remove_channel(self, *args):
         return super().remove_channel(*args)
+
+
+class AsyncSubscriber(AbstractSubscriber):
+    """Subscriber which is consumed from an asyncio event loop.
+
+    `notify` can be called from any thread, it only wakes the loop when\n
+    a consumer is waiting. Messages are read with `await get_message()`\n
+    or `async for message in subscriber`.
+
+    Attributes:
+    -----------
+    maxsize: int
+        number of buffered messages, the oldest message is dropped and\n
+        counted in `dropped` when the buffer is full. 0 means unbounded.
+    """
+
+    def __init__(self, channels: Set = None, maxsize: int = 0):
+        super().__init__(_ChannelManager(), channels,
+                         overflow=DropOldestPolicy())
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+        self.__messages = deque(maxlen=maxsize or None)
+        self.__waiters = deque()
+        self.__lock = Lock()
+        if self.channels:
+            self.add_channel(*self.channels)
+
+    async def get_message(self, block: bool = False, timeout: float = None):
+        while True:
+            with self.__lock:
+                if self.__messages:
+                    return self.__messages.popleft()
+                if not block:
+                    return None
+                waiter = asyncio.get_running_loop().create_future()
+                self.__waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self.__discard(waiter)
+
+    async def listen(self):
+        while True:
+            yield await self.get_message(block=True)
+
+    def notify(self, message: AnyStr):
+        with self.__lock:
+            if len(self.__messages) == self.__messages.maxlen:
+                self.overflow._count_drop()
+            self.__messages.append(message)
+            waiter = self.__waiters.popleft() if self.__waiters else None
+        if waiter is not None:
+            self.__wake(waiter)
+        registry = metrics.active
+        if registry is not None:
+            registry.observe_queue(self, len(self.__messages))
+
+    def notify_many(self, messages: Iterable[AnyStr]):
+        with self.__lock:
+            messages = list(messages)
+            maxlen = self.__messages.maxlen
+            if maxlen is not None:
+                overflow = len(self.__messages) + len(messages) - maxlen
+                if overflow > 0:
+                    self.overflow._count_drop(overflow)
+            self.__messages.extend(messages)
+            waiters = list(self.__waiters)[:len(self.__messages)]
+            for _ in waiters:
+                self.__waiters.popleft()
+        for waiter in waiters:
+            self.__wake(waiter)
+        registry = metrics.active
+        if registry is not None:
+            registry.observe_queue(self, len(self.__messages))
+
+    def replay(self, messages: Iterable[AnyStr]):
+        # notify_many never waits, the oldest messages are dropped.
+        self.notify_many(messages)
+
+    def add_channel(self, *args):
+        return super().add_channel(*args)
+
+    def remove_channel(self, *args):
+        return super().remove_channel(*args)
+
+    def is_empty(self):
+        return not self.__messages
+
+    def qsize(self) -> int:
+        return len(self.__messages)
+
+    def __next__(self):
+        raise TypeError(f"{self} must be consumed with 'async for'")
+
+    def fileno(self) -> int:
+        raise TypeError(f"{self} is awaited, it cannot be polled")
+
+    def _watch(self, watcher):
+        raise TypeError(f"{self} is awaited, it cannot be polled")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get_message(block=True)
+
+    def __discard(self, waiter: asyncio.Future):
+        with self.__lock:
+            if waiter in self.__waiters:
+                self.__waiters.remove(waiter)
+                return
+            # waiter was woken up but its consumer gave up, hand the
+            # wakeup over to the next consumer.
+            if waiter.cancelled() and self.__messages and self.__waiters:
+                self.__wake(self.__waiters.popleft())
+
+    @staticmethod
+    def __wake(waiter: asyncio.Future):
+        def wake():
+            if not waiter.done():
+                waiter.set_result(None)
+
+        loop = waiter.get_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wake()
+        else:
+            loop.call_soon_threadsafe(wake)
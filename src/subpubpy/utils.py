@@ -1,5 +1,16 @@
 import re
+import heapq
+import itertools
 import logging
+import time
+import operator
+import threading
+import weakref
+from functools import lru_cache
+from threading import Condition, Event, Lock, Thread
+from queue import Queue, Empty, SimpleQueue
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from . import metrics
 
 
 class RegexDict(dict):
@@ -18,5 +29,680 @@ class RegexDict(dict):
         return self.__getitem__(pattern)
 
 
+class HandlerDict(dict):
+    """Dictionary which maps an exact event to the set of its callbacks."""
+
+    def add(self, event: str, callback: Callable[[str, Any], None]):
+        if event not in self:
+            self[event] = set()
+        self[event].add(callback)
+
+    def remove(self, event: str, callback: Any) -> bool:
+        handlers = super().get(event)
+        if handlers and callback in handlers:
+            handlers.remove(callback)
+            return True
+        return False
+
+    def find_or_add(self, event: str, kind: type,
+                    factory: Callable[[], Any]) -> Any:
+        """Returns the handler of event which is an instance of kind,\n
+        adding factory() when there is none."""
+        for handler in super().get(event, ()):
+            if isinstance(handler, kind):
+                return handler
+        handler = factory()
+        self.add(event, handler)
+        return handler
+
+
+class _Reaper:
+    """Runs the cleanups of collected subscribers on one daemon thread.
+
+    A weak reference callback runs wherever its referent dies, possibly\n
+    inside a locked section of the registry it has to clean. The callbacks\n
+    created here only put the cleanup on a SimpleQueue, whose put is\n
+    reentrant, the "subpub-reaper" thread runs it with no lock held.
+    """
+
+    def __init__(self):
+        self.__queue = SimpleQueue()
+        self.__lock = Lock()
+        self.__thread = None
+
+    def ref(self, obj: Any, cleanup: Callable, *args) -> weakref.ref:
+        """Returns a weak reference to obj, `cleanup(*args, ref)` runs\n
+        once obj is collected."""
+        self.__start()
+        put = self.__queue.put
+        return weakref.ref(obj, lambda ref: put((cleanup, (*args, ref))))
+
+    def method(self, method: Callable, cleanup: Callable,
+               *args) -> weakref.WeakMethod:
+        """WeakMethod flavour of `ref` for bound methods."""
+        self.__start()
+        put = self.__queue.put
+        return weakref.WeakMethod(
+            method, lambda ref: put((cleanup, (*args, ref))))
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until the cleanups scheduled so far have run."""
+        self.__start()
+        done = Event()
+        self.__queue.put((done.set, ()))
+        return done.wait(timeout)
+
+    def __start(self):
+        if self.__thread is None:
+            with self.__lock:
+                if self.__thread is None:
+                    self.__thread = Thread(target=self.__run, daemon=True,
+                                           name="subpub-reaper")
+                    self.__thread.start()
+
+    def __run(self):
+        get = self.__queue.get
+        while True:
+            cleanup, args = get()
+            try:
+                cleanup(*args)
+            except Exception as exc:
+                report_exception(exc)
+
+
+_reaper = _Reaper()
+
+
+class _Timers:
+    """Single daemon thread running the callables scheduled by windows\n
+    and request timeouts."""
+
+    def __init__(self):
+        self.__heap = []
+        self.__seq = itertools.count()
+        self.__cond = Condition(Lock())
+        self.__thread = None
+
+    def call_at(self, deadline: float, fn: Callable[[], None]):
+        with self.__cond:
+            heapq.heappush(self.__heap, (deadline, next(self.__seq), fn))
+            if self.__thread is None:
+                self.__thread = Thread(target=self.__run, daemon=True,
+                                       name="subpub-windows")
+                self.__thread.start()
+            elif self.__heap[0][2] is fn:
+                self.__cond.notify()
+
+    def __run(self):
+        heap, cond = self.__heap, self.__cond
+        while True:
+            with cond:
+                while True:
+                    if not heap:
+                        cond.wait()
+                        continue
+                    delay = heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        fn = heapq.heappop(heap)[2]
+                        break
+                    cond.wait(delay)
+            try:
+                fn()
+            except Exception as exc:
+                report_exception(exc)
+
+
+_timers = _Timers()
+
+
+class WeakCallback:
+    """Bound method held through a WeakMethod, subscribing it does not\n
+    keep its object alive. Calls are dropped once the object is collected\n
+    and `forget(callback)` then runs on the reaper thread.
+
+    It compares equal to the bound method, so unsubscribing the method\n
+    removes it.
+    """
+    __slots__ = ("__method", "__hash", "__forget")
+
+    def __init__(self, method: Callable[[str, Any], None],
+                 forget: Callable[["WeakCallback"], None] = None):
+        self.__hash = hash(method)
+        self.__forget = forget
+        self.__method = _reaper.method(method, self.__collected)
+
+    def __collected(self, ref):
+        if self.__forget is not None:
+            self.__forget(self)
+
+    @property
+    def method(self) -> Callable[[str, Any], None]:
+        """The bound method, None once its object is collected."""
+        return self.__method()
+
+    def __call__(self, event: str, payload: Any):
+        method = self.__method()
+        if method is not None:
+            return method(event, payload)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, WeakCallback):
+            return self.__method == other.__method
+        return self.__method() == other
+
+    def __hash__(self) -> int:
+        return self.__hash
+
+    def __repr__(self) -> str:
+        return "WeakCallback({!r})".format(self.__method())
+
+
+class SnapshotHandlerDict:
+    """Read-mostly mapping of event to the tuple of its callbacks.
+
+    `add` and `remove` build a new immutable snapshot under a writer\n
+    lock and swap it in, `get` reads the current snapshot without any\n
+    lock so publishers never wait for subscribers or for each other.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__snapshot: Dict[str, Tuple] = dict()
+
+    @property
+    def snapshot(self) -> Dict[str, Tuple]:
+        return self.__snapshot
+
+    def add(self, event: str, callback: Callable[[str, Any], None]):
+        with self.__lock:
+            self.__add(event, callback)
+
+    def find_or_add(self, event: str, kind: type,
+                    factory: Callable[[], Any]) -> Any:
+        """Returns the handler of event which is an instance of kind,\n
+        adding factory() when there is none, under the writer lock."""
+        with self.__lock:
+            for handler in self.__snapshot.get(event, ()):
+                if isinstance(handler, kind):
+                    return handler
+            handler = factory()
+            self.__add(event, handler)
+            return handler
+
+    def __add(self, event: str, callback: Callable[[str, Any], None]):
+        handlers = self.__snapshot.get(event, ())
+        if callback in handlers:
+            return
+        snapshot = dict(self.__snapshot)
+        snapshot[event] = handlers + (callback,)
+        self.__snapshot = snapshot
+
+    def remove(self, event: str, callback: Any) -> bool:
+        with self.__lock:
+            handlers = self.__snapshot.get(event, ())
+            if callback not in handlers:
+                return False
+            snapshot = dict(self.__snapshot)
+            handlers = tuple(h for h in handlers if h != callback)
+            if handlers:
+                snapshot[event] = handlers
+            else:
+                del snapshot[event]
+            self.__snapshot = snapshot
+            return True
+
+    def get(self, event: str, default=None):
+        return self.__snapshot.get(event, default)
+
+    def __getitem__(self, event: str) -> Tuple:
+        return self.__snapshot[event]
+
+    def __contains__(self, event: str) -> bool:
+        return event in self.__snapshot
+
+    def __iter__(self):
+        return iter(self.__snapshot)
+
+    def __len__(self) -> int:
+        return len(self.__snapshot)
+
+
+class PatternIndex:
+    """Subscription index keyed by regular expression patterns.
+
+    Patterns are compiled once when they are added. `get(event)` returns\n
+    the callbacks of every pattern which fully matches the event, the\n
+    result is memoized in a LRU cache which is rebuilt whenever a\n
+    pattern or callback is added or removed, so repeated events cost a\n
+    single cache lookup regardless of the number of patterns.
+
+    Attributes:
+    -----------
+    cache_size: int
+        number of resolved events kept in the LRU cache.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        if cache_size <= 0:
+            raise ValueError("cache_size must be greater than 0")
+        self.__cache_size = cache_size
+        self.__lock = Lock()
+        self.__patterns = dict()
+        self.__rebuild()
+
+    @property
+    def cache_size(self) -> int:
+        return self.__cache_size
+
+    def add(self, pattern: str, callback: Callable[[str, Any], None]):
+        with self.__lock:
+            self.__add(pattern, callback)
+
+    def find_or_add(self, pattern: str, kind: type,
+                    factory: Callable[[], Any]) -> Any:
+        """Returns the handler of pattern which is an instance of kind,\n
+        adding factory() when there is none, under the writer lock."""
+        with self.__lock:
+            entry = self.__patterns.get(pattern)
+            for handler in entry[1] if entry is not None else ():
+                if isinstance(handler, kind):
+                    return handler
+            handler = factory()
+            self.__add(pattern, handler)
+            return handler
+
+    def __add(self, pattern: str, callback: Callable[[str, Any], None]):
+        if pattern in self.__patterns:
+            compiled, handlers = self.__patterns[pattern]
+        else:
+            try:
+                compiled = re.compile(pattern)
+            except re.error as exc:
+                raise ValueError(
+                    f"{pattern} is an invalid pattern: {exc}")
+            handlers = set()
+        self.__patterns[pattern] = (compiled, handlers | {callback})
+        self.__rebuild()
+
+    def remove(self, pattern: str, callback: Any) -> bool:
+        with self.__lock:
+            entry = self.__patterns.get(pattern)
+            if entry is None or callback not in entry[1]:
+                return False
+            compiled, handlers = entry
+            handlers = handlers - {callback}
+            if handlers:
+                self.__patterns[pattern] = (compiled, handlers)
+            else:
+                del self.__patterns[pattern]
+            self.__rebuild()
+            return True
+
+    def get(self, event: str) -> Tuple[Callable[[str, Any], None], ...]:
+        return self.__resolve(event)
+
+    def cache_info(self):
+        return self.__resolve.cache_info()
+
+    def __getitem__(self, pattern: str) -> frozenset:
+        return frozenset(self.__patterns[pattern][1])
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self.__patterns
+
+    def __iter__(self):
+        return iter(list(self.__patterns))
+
+    def __len__(self) -> int:
+        return len(self.__patterns)
+
+    def __rebuild(self):
+        # Every change builds a fresh table and cache, a concurrent reader
+        # keeps resolving against the table it started with.
+        table = tuple((compiled.fullmatch, tuple(handlers))
+                      for compiled, handlers in self.__patterns.values())
+
+        def resolve(event):
+            resolved = dict()
+            for fullmatch, handlers in table:
+                if fullmatch(event):
+                    for handler in handlers:
+                        resolved[handler] = None
+            return tuple(resolved)
+
+        self.__resolve = lru_cache(maxsize=self.__cache_size)(resolve)
+
+
+def split_topic_pattern(pattern: str) -> List[str]:
+    """Returns the words of a topic pattern, raises ValueError when a\n
+    wildcard is not a whole word or a word is empty."""
+    if not isinstance(pattern, str):
+        raise ValueError(f"{pattern} should be a valid string.")
+    words = pattern.split(".")
+    for word in words:
+        if not word or (word not in ("*", "#") and
+                        ("*" in word or "#" in word)):
+            raise ValueError(f"{pattern} is an invalid topic pattern")
+    return words
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """True when topic matches the topic pattern, see TopicTrie."""
+    words, topic = split_topic_pattern(pattern), topic.split(".")
+    # reachable[j]: the pattern words seen so far match topic[:j].
+    reachable = [True] + [False] * len(topic)
+    for word in words:
+        if word == "#":
+            for j in range(1, len(reachable)):
+                reachable[j] = reachable[j] or reachable[j - 1]
+            continue
+        reachable = [False] + [
+            reachable[j] and (word == "*" or word == topic[j])
+            for j in range(len(topic))]
+    return reachable[-1]
+
+
+class _TopicNode:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children: Dict[str, "_TopicNode"] = dict()
+        self.values = set()
+
+
+class TopicTrie:
+    """Index of topic patterns, e.g. `orders.*.fx.#`, stored as a trie.
+
+    Topics are words separated by dots. In a pattern `*` matches exactly\n
+    one word and `#` matches zero or more words. `get(topic)` walks the\n
+    trie word by word, so resolving a topic only visits the branches\n
+    which can match it instead of testing every pattern.
+
+    The trie is not locked, callers serialize add and remove with get.
+    """
+
+    def __init__(self):
+        self.__root = _TopicNode()
+        self.__patterns: Dict[str, set] = dict()
+
+    def add(self, pattern: str, value: Any):
+        node = self.__root
+        for word in split_topic_pattern(pattern):
+            node = node.children.setdefault(word, _TopicNode())
+        node.values.add(value)
+        self.__patterns.setdefault(pattern, set()).add(value)
+
+    def remove(self, pattern: str, value: Any) -> bool:
+        values = self.__patterns.get(pattern)
+        if not values or value not in values:
+            return False
+        path = [self.__root]
+        for word in pattern.split("."):
+            path.append(path[-1].children[word])
+        path[-1].values.discard(value)
+        # prune the branch nodes left without values and children.
+        for word, parent, node in zip(reversed(pattern.split(".")),
+                                      reversed(path[:-1]), reversed(path)):
+            if node.values or node.children:
+                break
+            del parent.children[word]
+        values.discard(value)
+        if not values:
+            del self.__patterns[pattern]
+        return True
+
+    def get(self, topic: str) -> frozenset:
+        """Returns the values of every pattern matching topic."""
+        words = topic.split(".")
+        end = len(words)
+        result = set()
+        stack, seen = [(self.__root, 0)], set()
+        while stack:
+            node, i = stack.pop()
+            if (id(node), i) in seen:
+                continue
+            seen.add((id(node), i))
+            children = node.children
+            wildcard = children.get("#")
+            if wildcard is not None:
+                stack.extend((wildcard, j) for j in range(i, end + 1))
+            if i == end:
+                result.update(node.values)
+                continue
+            for key in (words[i], "*"):
+                child = children.get(key)
+                if child is not None:
+                    stack.append((child, i + 1))
+        return frozenset(result)
+
+    def __getitem__(self, pattern: str) -> frozenset:
+        return frozenset(self.__patterns[pattern])
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self.__patterns
+
+    def __iter__(self):
+        return iter(list(self.__patterns))
+
+    def __len__(self) -> int:
+        return len(self.__patterns)
+
+
+_MISSING = object()
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, values: value in values,
+    "not in": lambda value, values: value not in values,
+}
+
+
+def _field(payload: Any, field: str) -> Any:
+    try:
+        return payload[field]
+    except (TypeError, KeyError, IndexError):
+        return getattr(payload, field, _MISSING)
+
+
+def compile_where(where: Dict[str, Any]) -> List[Tuple[str, str, Any]]:
+    """Returns the (field, operator, value) conditions of a filter.
+
+    A plain value means equality, a set, frozenset or list means\n
+    membership and a dict maps operators to values, e.g.\n
+    `{"symbol": {"EURUSD", "GBPUSD"}, "price": {">=": 1.0, "<": 2.0}}`.\n
+    Operators are ==, !=, >, >=, <, <=, in and not in."""
+    if not isinstance(where, dict) or not where:
+        raise TypeError(f"{where} is not a non-empty dict")
+    conditions = []
+    for field, spec in where.items():
+        if isinstance(spec, dict):
+            items = spec.items()
+        elif isinstance(spec, (set, frozenset, list)):
+            items = (("in", spec),)
+        else:
+            items = (("==", spec),)
+        for op, value in items:
+            if op not in _OPERATORS:
+                raise ValueError(f"{op!r} is not a filter operator")
+            if op in ("in", "not in"):
+                value = frozenset(value)
+            conditions.append((field, op, value))
+    return conditions
+
+
+def _matches(payload: Any, conditions) -> bool:
+    for field, op, value in conditions:
+        found = _field(payload, field)
+        if found is _MISSING:
+            return False
+        try:
+            if not _OPERATORS[op](found, value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+class FilterIndex:
+    """Content filters of the subscriptions of one event.
+
+    Every subscription is indexed by one of its equality or membership\n
+    conditions: a hash table per field maps each accepted value to the\n
+    subscriptions, so `match(payload)` does one lookup per indexed field\n
+    and only checks the remaining conditions of the subscriptions found\n
+    there. Subscriptions with range conditions only are checked one by\n
+    one. Changes rebuild the tables, `match` reads them without locking.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__filters = dict()
+        self.__tables = ((), ())
+
+    def add(self, subscriber: Any, where: Dict[str, Any]):
+        """Sets the filter of subscriber, replacing its previous one."""
+        conditions = compile_where(where)
+        with self.__lock:
+            self.__filters[subscriber] = conditions
+            self.__rebuild()
+
+    def remove(self, subscriber: Any) -> bool:
+        with self.__lock:
+            if subscriber not in self.__filters:
+                return False
+            del self.__filters[subscriber]
+            self.__rebuild()
+            return True
+
+    def match(self, payload: Any) -> List[Any]:
+        """Returns the subscribers whose filter accepts payload."""
+        indexed, scanned = self.__tables
+        matched = []
+        for field, table in indexed:
+            value = _field(payload, field)
+            if value is _MISSING:
+                continue
+            try:
+                entries = table.get(value)
+            except TypeError:
+                continue
+            if entries:
+                for subscriber, rest in entries:
+                    if not rest or _matches(payload, rest):
+                        matched.append(subscriber)
+        for subscriber, conditions in scanned:
+            if _matches(payload, conditions):
+                matched.append(subscriber)
+        return matched
+
+    def __contains__(self, subscriber: Any) -> bool:
+        return subscriber in self.__filters
+
+    def __iter__(self):
+        return iter(list(self.__filters))
+
+    def __len__(self) -> int:
+        return len(self.__filters)
+
+    def __rebuild(self):
+        indexed, scanned = dict(), []
+        for subscriber, conditions in self.__filters.items():
+            for i, (field, op, value) in enumerate(conditions):
+                if op == "==":
+                    try:
+                        hash(value)
+                    except TypeError:
+                        continue
+                    values = (value,)
+                elif op == "in":
+                    values = value
+                else:
+                    continue
+                rest = tuple(conditions[:i] + conditions[i + 1:])
+                table = indexed.setdefault(field, dict())
+                for value in values:
+                    table.setdefault(value, []).append((subscriber, rest))
+                break
+            else:
+                scanned.append((subscriber, tuple(conditions)))
+        self.__tables = (
+            tuple((field, {value: tuple(entries)
+                           for value, entries in table.items()})
+                  for field, table in indexed.items()),
+            tuple(scanned))
+
+
+def put_many(q: Queue, items: Iterable[Any]) -> None:
+    """Puts items into q taking its mutex once and waking the consumers\n
+    once per batch. A bounded queue still blocks while it is full.
+    Queues which override `put` receive the items one by one."""
+    if type(q).put is not Queue.put:
+        for item in items:
+            q.put(item)
+        return
+    with q.not_full:
+        pending = 0
+        for item in items:
+            if q.maxsize > 0:
+                while q._qsize() >= q.maxsize:
+                    if pending:
+                        q.not_empty.notify(pending)
+                        pending = 0
+                    q.not_full.wait()
+            q._put(item)
+            q.unfinished_tasks += 1
+            pending += 1
+        if pending:
+            q.not_empty.notify(pending)
+
+
+def get_many(q: Queue, max_n: int, block: bool = False,
+             timeout: float = None) -> List[Any]:
+    """Takes up to max_n items from q under a single mutex acquisition.
+    When block is True waits for the first item, an empty list is
+    returned when nothing arrived. Queues which override `get` are read
+    one item at a time."""
+    if max_n <= 0:
+        raise ValueError("max_n must be greater than 0")
+    if type(q).get is not Queue.get:
+        items = []
+        try:
+            items.append(q.get(block, timeout))
+            while len(items) < max_n:
+                items.append(q.get_nowait())
+        except Empty:
+            pass
+        return items
+    with q.not_empty:
+        if block and not q._qsize():
+            q.not_empty.wait_for(q._qsize, timeout)
+        items = []
+        while len(items) < max_n and q._qsize():
+            items.append(q._get())
+        if items:
+            q.not_full.notify(len(items))
+        return items
+
+
 def custom_hook(args):
     logging.error(f'{args.thread} causing {args.exc_type} : {args.exc_value}')
+
+
+def report_exception(exc: BaseException, event: str = None,
+                     callback: Callable = None, bus: str = None):
+    """Forwards an exception raised by a callback to `threading.excepthook`
+    so worker threads report errors the same way plain threads do. The
+    error is counted under bus, by default the bus callback is
+    subscribed to event on."""
+    registry = metrics.active
+    if registry is not None:
+        if bus is None and callback is not None:
+            bus = metrics.owner(event, callback)
+        registry.callback_error(event, bus)
+    threading.excepthook(threading.ExceptHookArgs(
+        [type(exc), exc, exc.__traceback__, threading.current_thread()]))
@@ -0,0 +1,96 @@
+import time
+from threading import Lock
+from typing import Any, Hashable
+from .abstract import AbstractWindow
+from .utils import _timers
+
+# marks a throttle window which is open without a pending payload.
+_IDLE = object()
+
+
+class Conflate(AbstractWindow):
+    """Latest wins: the first payload opens a window of `interval`\n
+    seconds, when it closes only the latest payload of every key is\n
+    dispatched. Intermediate payloads are never dispatched."""
+
+    def _reset(self):
+        self.__lock = Lock()
+        self.__pending = dict()
+
+    def offer(self, event: str, payload: Any) -> None:
+        key = self._window_key(event, payload)
+        with self.__lock:
+            opened = not self.__pending
+            self.__pending[key] = (event, payload)
+        if opened:
+            _timers.call_at(time.monotonic() + self.interval, self.__close)
+
+    def __close(self):
+        with self.__lock:
+            pending, self.__pending = self.__pending, dict()
+        for event, payload in pending.values():
+            self._deliver(event, payload)
+
+
+class Throttle(AbstractWindow):
+    """At most one dispatch per `interval` seconds and key. A payload\n
+    arriving while no window is open is dispatched at once and opens one,\n
+    the latest payload offered meanwhile is dispatched when it closes."""
+
+    def _reset(self):
+        self.__lock = Lock()
+        self.__windows = dict()
+
+    def offer(self, event: str, payload: Any) -> None:
+        key = self._window_key(event, payload)
+        with self.__lock:
+            opened = key not in self.__windows
+            self.__windows[key] = _IDLE if opened else (event, payload)
+        if opened:
+            self.__open(key)
+            self._deliver(event, payload)
+
+    def __open(self, key: Hashable):
+        _timers.call_at(time.monotonic() + self.interval,
+                        lambda: self.__close(key))
+
+    def __close(self, key: Hashable):
+        with self.__lock:
+            pending = self.__windows.pop(key, _IDLE)
+            if pending is not _IDLE:
+                # the trailing dispatch opens the next window.
+                self.__windows[key] = _IDLE
+        if pending is not _IDLE:
+            self.__open(key)
+            self._deliver(*pending)
+
+
+class Debounce(AbstractWindow):
+    """Dispatches the latest payload of a key once no other payload was\n
+    offered for `interval` seconds, bursts collapse into one dispatch."""
+
+    def _reset(self):
+        self.__lock = Lock()
+        self.__pending = dict()
+
+    def offer(self, event: str, payload: Any) -> None:
+        key = self._window_key(event, payload)
+        deadline = time.monotonic() + self.interval
+        with self.__lock:
+            scheduled = key in self.__pending
+            self.__pending[key] = (deadline, event, payload)
+        # a single timer per key, it moves itself to the latest deadline.
+        if not scheduled:
+            _timers.call_at(deadline, lambda: self.__close(key))
+
+    def __close(self, key: Hashable):
+        with self.__lock:
+            deadline, event, payload = self.__pending[key]
+            if deadline > time.monotonic():
+                pending = None
+            else:
+                pending = self.__pending.pop(key)
+        if pending is None:
+            _timers.call_at(deadline, lambda: self.__close(key))
+        else:
+            self._deliver(event, payload)
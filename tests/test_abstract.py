@@ -1,4 +1,4 @@
-from src.subpubpy.abstract import AbstractSubpub
+from src.subpubpy.abstract import AbstractSubpub, AbstractChannelManager
 from unittest import TestCase, main
 
 
@@ -7,3 +7,18 @@ class TestAbstractSubpub(TestCase):
     def test_creation(self):
         with self.assertRaises(Exception):
             t1 = AbstractSubpub()
+
+
+class TestAbstractChannelManager(TestCase):
+
+    def test_patterns_are_abstract(self):
+        class Manager(AbstractChannelManager):
+
+            def add(self, channel_name, subscriber): ...
+
+            def remove(self, channel_name, subscriber): ...
+
+            def publish(self, channel_name, msg): ...
+
+        with self.assertRaises(TypeError):
+            Manager()
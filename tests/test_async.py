@@ -0,0 +1,151 @@
+from src.subpubpy import AsyncSubpub, AsyncSubscriber, Publisher
+from threading import Thread
+from unittest import TestCase, IsolatedAsyncioTestCase
+import asyncio
+
+
+class TestAsyncSubpubWithoutLoop(TestCase):
+
+    def test_pub_without_loop(self):
+        subpub = AsyncSubpub()
+
+        def func(event, payload): ...
+
+        subpub.sub("test_pub_without_loop", func, verbose=False)
+
+        with self.assertRaises(RuntimeError):
+            subpub.pub("test_pub_without_loop", None, verbose=False)
+
+
+class TestAsyncSubpub(IsolatedAsyncioTestCase):
+
+    async def test_coroutine_callback(self):
+        subpub = AsyncSubpub()
+        received = []
+
+        async def func(event, payload):
+            await asyncio.sleep(0)
+            received.append(payload)
+
+        def sync_func(event, payload):
+            received.append(-payload)
+
+        subpub.sub("test_coroutine_callback", func, verbose=False)
+        subpub.sub("test_coroutine_callback", sync_func, verbose=False)
+        for i in range(1, 4):
+            subpub.pub("test_coroutine_callback", i, verbose=False)
+        await subpub.join()
+
+        self.assertEqual(sorted(received), [-3, -2, -1, 1, 2, 3])
+
+    async def test_pub_many(self):
+        subpub = AsyncSubpub()
+        received = []
+
+        async def func(event, payload):
+            received.append(payload)
+
+        subpub.sub("test_pub_many", func, verbose=False)
+        subpub.pub_many("test_pub_many", range(5), verbose=False)
+        await subpub.join()
+
+        self.assertEqual(received, list(range(5)))
+
+    async def test_bounded_concurrency(self):
+        subpub = AsyncSubpub(max_concurrency=2)
+        running, peak = 0, 0
+
+        async def func(event, payload):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+
+        subpub.sub("test_bounded_concurrency", func, verbose=False)
+        for i in range(10):
+            subpub.pub("test_bounded_concurrency", i, verbose=False)
+        await subpub.join()
+
+        self.assertEqual(peak, 2)
+
+    async def test_cross_thread_publishers(self):
+        subpub = AsyncSubpub()
+        received = []
+
+        async def func(event, payload):
+            received.append(payload)
+
+        subpub.sub("test_cross_thread_publishers", func, verbose=False)
+        subpub.pub("test_cross_thread_publishers", -1, verbose=False)
+
+        def publish():
+            for i in range(100):
+                subpub.pub("test_cross_thread_publishers", i, verbose=False)
+
+        threads = [Thread(target=publish) for _ in range(4)]
+        for th in threads:
+            th.start()
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [th.join() for th in threads])
+        await subpub.join()
+
+        self.assertEqual(len(received), 401)
+
+
+class TestAsyncSubscriber(IsolatedAsyncioTestCase):
+
+    async def test_get_message(self):
+        subscriber = AsyncSubscriber()
+        self.assertIsNone(await subscriber.get_message())
+        self.assertIsNone(await subscriber.get_message(block=True,
+                                                       timeout=0.01))
+
+        subscriber.notify("message-1")
+        self.assertFalse(subscriber.is_empty())
+        self.assertEqual(await subscriber.get_message(), "message-1")
+
+    async def test_notify_many_wakes_consumers(self):
+        subscriber = AsyncSubscriber()
+        consumers = [asyncio.ensure_future(
+            subscriber.get_message(block=True, timeout=5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        subscriber.notify_many(["message-1", "message-2"])
+
+        self.assertEqual(sorted(await asyncio.gather(*consumers)),
+                         ["message-1", "message-2"])
+
+    async def test_maxsize(self):
+        subscriber = AsyncSubscriber(maxsize=2)
+        for i in range(3):
+            subscriber.notify(i)
+
+        self.assertEqual(await subscriber.get_message(), 1)
+        self.assertEqual(await subscriber.get_message(), 2)
+        self.assertEqual(subscriber.dropped, 1)
+
+    async def test_sync_iteration(self):
+        with self.assertRaises(TypeError):
+            next(AsyncSubscriber())
+
+    async def test_async_for_cross_thread(self):
+        publisher = Publisher()
+        subscriber = AsyncSubscriber("test_async_for_cross_thread")
+        subscriber.add_channel("test_async_for_cross_thread")
+
+        def publish():
+            for i in range(50):
+                publisher.publish("test_async_for_cross_thread", i)
+
+        th = Thread(target=publish)
+        th.start()
+
+        received = []
+        async for message in subscriber:
+            received.append(message)
+            if len(received) == 50:
+                break
+        th.join()
+        subscriber.remove_channel("test_async_for_cross_thread")
+
+        self.assertEqual(received, list(range(50)))
@@ -0,0 +1,276 @@
+from src.subpubpy import (Broker, RemotePublisher, RemoteSubscriber,
+                          ConnectionPool, Subscriber, SharedPayload)
+from src.subpubpy import protocol
+from src.subpubpy.serialization import Frame
+from src.subpubpy.client import BrokerConnection
+from queue import Queue
+from threading import Thread
+from unittest import TestCase
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+class TestProtocol(TestCase):
+
+    def test_batch_round_trip(self):
+        records = [protocol.encode_record(message)
+                   for message in (b"raw", {"bid": 1.0},
+                                   SharedPayload(b"frame"))]
+        parts = protocol.batch_frame(protocol.PUBLISH, "ticks", records)
+        data = b"".join(bytes(part) for part in parts)
+
+        reader = socket.socketpair()
+        try:
+            reader[0].sendall(data)
+            reader[0].close()
+            rfile = reader[1].makefile("rb")
+            opcode, body = protocol.read_frame(rfile)
+            self.assertIsNone(protocol.read_frame(rfile))
+            rfile.close()
+        finally:
+            reader[1].close()
+
+        self.assertEqual(opcode, protocol.PUBLISH)
+        channel, decoded = protocol.parse_batch(body)
+        self.assertEqual(channel, "ticks")
+        messages = [Frame(kind, data, channel).message
+                    for kind, data in decoded]
+        self.assertEqual(messages[:2], [b"raw", {"bid": 1.0}])
+        self.assertEqual(messages[2], b"frame")
+
+    def test_invalid_frame_length(self):
+        a, b = socket.socketpair()
+        try:
+            a.sendall(b"\x00\x00\x00\x00\x07")
+            rfile = b.makefile("rb")
+            with self.assertRaises(ValueError):
+                protocol.read_frame(rfile)
+            rfile.close()
+        finally:
+            a.close()
+            b.close()
+
+    def test_parse_address(self):
+        self.assertEqual(protocol.parse_address(("127.0.0.1", 1)),
+                         (socket.AF_INET, ("127.0.0.1", 1)))
+        self.assertEqual(protocol.parse_address(("::1", 1))[0],
+                         socket.AF_INET6)
+        self.assertEqual(protocol.parse_address("/tmp/bus.sock"),
+                         (socket.AF_UNIX, "/tmp/bus.sock"))
+
+
+class BrokerTests:
+
+    def address(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.broker = Broker(self.address()).start()
+
+    def tearDown(self):
+        self.broker.shutdown()
+
+    def subscriber(self, *channels):
+        subscriber = RemoteSubscriber(self.broker.address, list(channels),
+                                      q=Queue())
+        self.addCleanup(subscriber.close)
+        subscriber.flush()
+        return subscriber
+
+    def publisher(self, size=2):
+        pool = ConnectionPool(self.broker.address, size=size)
+        self.addCleanup(pool.close)
+        return RemotePublisher(pool=pool)
+
+    def receive(self, subscriber, count):
+        messages = []
+        while len(messages) < count:
+            received = subscriber.get_messages(count - len(messages),
+                                               block=True, timeout=5)
+            if not received:
+                break
+            messages += received
+        return messages
+
+    def test_publish_and_subscribe(self):
+        subscriber = self.subscriber("ticks")
+        publisher = self.publisher()
+        publisher.publish("ticks", {"bid": 1.0})
+        publisher.publish("other", "ignored")
+        publisher.publish("ticks", b"raw")
+
+        self.assertEqual(self.receive(subscriber, 2), [{"bid": 1.0}, b"raw"])
+
+    def test_pipelined_batches_keep_order(self):
+        subscriber = self.subscriber("ticks")
+        publisher = self.publisher()
+        publisher.publish_many("ticks", range(5000))
+        for i in range(5000, 10000):
+            publisher.publish("ticks", i)
+        publisher.flush()
+
+        self.assertEqual(self.receive(subscriber, 10000), list(range(10000)))
+
+    def test_threads_share_pool(self):
+        subscriber = self.subscriber("ticks")
+        publisher = self.publisher(size=2)
+
+        def publish(worker):
+            for i in range(500):
+                publisher.publish("ticks", (worker, i))
+
+        threads = [Thread(target=publish, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        messages = self.receive(subscriber, 2000)
+        self.assertEqual(len(messages), 2000)
+        for worker in range(4):
+            self.assertEqual([i for w, i in messages if w == worker],
+                             list(range(500)))
+
+    def test_patterns_and_unsubscribe(self):
+        subscriber = self.subscriber()
+        subscriber.add_pattern("orders.*")
+        subscriber.flush()
+        publisher = self.publisher()
+        publisher.publish("orders.fx", 1)
+        publisher.publish("orders.fx.eu", 2)
+        self.assertEqual(self.receive(subscriber, 1), [1])
+
+        subscriber.remove_pattern("orders.*")
+        subscriber.add_channel("orders.fx.eu")
+        subscriber.flush()
+        publisher.publish("orders.fx", 3)
+        publisher.publish("orders.fx.eu", 4)
+        self.assertEqual(self.receive(subscriber, 1), [4])
+        self.assertTrue(subscriber.is_empty())
+
+    def test_local_subscriber_of_broker(self):
+        local = Subscriber(q=Queue())
+        local.add_channel("broker.local")
+        self.addCleanup(local.remove_channel, "broker.local")
+        publisher = self.publisher()
+        publisher.publish("broker.local", {"id": 7})
+        publisher.flush()
+
+        frame = local.get_message(block=True)
+        self.assertIsInstance(frame, Frame)
+        self.assertEqual(frame.channel, "broker.local")
+        self.assertEqual(frame.message, {"id": 7})
+
+    def test_codecs_and_lazy_frames(self):
+        subscriber = RemoteSubscriber(self.broker.address, ["prices", "raw"],
+                                      q=Queue(), lazy=True,
+                                      codecs={"prices": "json"})
+        self.addCleanup(subscriber.close)
+        subscriber.flush()
+        pool = ConnectionPool(self.broker.address, size=1)
+        self.addCleanup(pool.close)
+        publisher = RemotePublisher(pool=pool, codecs={"prices": "json"})
+        publisher.publish("prices", {"bid": 1.0})
+        publisher.publish("raw", (1, 2))
+
+        frames = self.receive(subscriber, 2)
+        self.assertEqual([frame.channel for frame in frames],
+                         ["prices", "raw"])
+        self.assertFalse(frames[0].decoded)
+        self.assertEqual(frames[0].codec.name, "json")
+        self.assertEqual(frames[0].message, {"bid": 1.0})
+        self.assertEqual(frames[1].message, (1, 2))
+
+    def test_subscriber_rejects_unexpected_codec(self):
+        subscriber = RemoteSubscriber(self.broker.address, "prices",
+                                      q=Queue(), codec="json")
+        self.addCleanup(subscriber.close)
+        subscriber.flush()
+        publisher = self.publisher(size=1)
+        with self.assertLogs(level="WARNING"):
+            publisher.publish("prices", {"pickled": True})
+            publisher.flush()
+            time.sleep(0.1)
+        RemotePublisher(pool=publisher.pool, codec="json").publish(
+            "prices", {"bid": 1.0})
+
+        self.assertEqual(self.receive(subscriber, 1), [{"bid": 1.0}])
+        self.assertTrue(subscriber.is_empty())
+
+    def test_broker_codec_allow_list(self):
+        broker = Broker(self.address(), codecs=("json",)).start()
+        self.addCleanup(broker.shutdown)
+        connection = BrokerConnection(broker.address)
+        self.addCleanup(connection.close)
+        connection.publish("prices", {"bid": 1.0}, "json")
+        connection.flush(5)
+        connection.publish("prices", {"bid": 1.0})
+        for _ in range(100):
+            if connection.closed:
+                break
+            time.sleep(0.05)
+        self.assertTrue(connection.closed)
+
+    def test_closed_connection(self):
+        connection = BrokerConnection(self.broker.address)
+        connection.flush()
+        connection.close()
+        self.assertTrue(connection.closed)
+        with self.assertRaises(ConnectionError):
+            connection.publish("ticks", 1)
+
+    def test_broker_shutdown_closes_clients(self):
+        subscriber = self.subscriber("ticks")
+        self.broker.shutdown()
+        for _ in range(100):
+            if subscriber.connection.closed:
+                break
+            time.sleep(0.05)
+        self.assertTrue(subscriber.connection.closed)
+
+
+class TestTCPBroker(BrokerTests, TestCase):
+
+    def address(self):
+        return ("127.0.0.1", 0)
+
+
+class TestUnixBroker(BrokerTests, TestCase):
+
+    def address(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        return os.path.join(directory, "bus.sock")
+
+    def test_socket_is_removed(self):
+        path = self.broker.address
+        self.assertTrue(os.path.exists(path))
+        self.broker.shutdown()
+        self.assertFalse(os.path.exists(path))
+
+
+class TestBrokerCommand(TestCase):
+
+    def test_run_as_module(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        path = os.path.join(directory, "bus.sock")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.subpubpy.broker", "--unix", path],
+            stderr=subprocess.DEVNULL)
+        self.addCleanup(process.wait)
+        self.addCleanup(process.terminate)
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.05)
+
+        with RemoteSubscriber(path, "ticks", q=Queue()) as subscriber:
+            subscriber.flush()
+            with ConnectionPool(path, size=1) as pool:
+                RemotePublisher(pool=pool).publish("ticks", 42)
+            self.assertEqual(subscriber.get_message(block=True), 42)
@@ -0,0 +1,158 @@
+from src.subpubpy import (SimpleSubpub, ThreadSafeSubpub, ThreadPoolDispatcher,
+                          Budget)
+from src.subpubpy import metrics
+from threading import Event
+from unittest import TestCase
+from unittest.mock import patch
+import time
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class TestBudget(TestCase):
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Budget(0)
+        with self.assertRaises(ValueError):
+            Budget(0.1, max_strikes=0)
+        with self.assertRaises(ValueError):
+            Budget(0.1, lane_size=0)
+        with self.assertRaises(TypeError):
+            SimpleSubpub().sub("budgets.invalid", lambda e, p: None,
+                               budget=0.1)
+
+    def test_guards_one_subscription(self):
+        bus, budget = SimpleSubpub(), Budget(0.1)
+
+        def func(event, payload): ...
+
+        bus.sub("budgets.once", func, verbose=False, budget=budget)
+        with self.assertRaises(ValueError):
+            bus.sub("budgets.twice", func, verbose=False, budget=budget)
+        bus.unsub("budgets.once", func, verbose=False)
+
+    def test_errors_are_contained(self):
+        bus, received = SimpleSubpub(), []
+        budget = Budget(0.1, max_strikes=2)
+
+        def failing(event, payload):
+            raise KeyError(payload)
+
+        def healthy(event, payload):
+            received.append(payload)
+
+        bus.sub("budgets.errors", failing, verbose=False, budget=budget)
+        bus.sub("budgets.errors", healthy, verbose=False)
+        with patch('src.subpubpy.budgets.report_exception') as report:
+            bus.pub("budgets.errors", 1, verbose=False)
+            bus.pub("budgets.errors", 2, verbose=False)
+        self.assertEqual(received, [1, 2])
+        self.assertEqual(report.call_count, 2)
+        self.assertEqual(budget.state, Budget.ISOLATED)
+        self.assertEqual(budget.stats["errors"], 2)
+        self.assertEqual(budget.stats["isolations"], 1)
+        bus.unsub("budgets.errors", failing, verbose=False)
+        bus.unsub("budgets.errors", healthy, verbose=False)
+
+    def test_slow_callback_is_isolated_then_tripped(self):
+        bus, release = SimpleSubpub(), Event()
+        budget = Budget(0.02, max_strikes=1, cooldown=60)
+        self.addCleanup(release.set)
+
+        def slow(event, payload):
+            if payload == 1:
+                time.sleep(0.05)
+            else:
+                release.wait(5)
+
+        bus.sub("budgets.slow", slow, verbose=False, budget=budget)
+        bus.pub("budgets.slow", 1, verbose=False)
+        self.assertEqual(budget.state, Budget.ISOLATED)
+        self.assertEqual(budget.stats["exceeded"], 1)
+
+        # the lane call hangs, publishers never wait for it.
+        start = time.monotonic()
+        bus.pub("budgets.slow", 2, verbose=False)
+        time.sleep(0.05)
+        bus.pub("budgets.slow", 3, verbose=False)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(budget.state, Budget.OPEN)
+        self.assertEqual(budget.stats["timeouts"], 1)
+        self.assertEqual(budget.stats["trips"], 1)
+
+        bus.pub("budgets.slow", 4, verbose=False)
+        self.assertEqual(budget.stats["rejected"], 2)
+        bus.unsub("budgets.slow", slow, verbose=False)
+
+    def test_recovers_on_the_lane(self):
+        bus, delay = SimpleSubpub(), [0.05]
+        budget = Budget(0.02, max_strikes=2, cooldown=0)
+        received = []
+
+        def func(event, payload):
+            time.sleep(delay[0])
+            received.append(payload)
+
+        bus.sub("budgets.recover", func, verbose=False, budget=budget)
+        bus.pub("budgets.recover", 1, verbose=False)
+        bus.pub("budgets.recover", 2, verbose=False)
+        self.assertEqual(budget.state, Budget.ISOLATED)
+
+        delay[0] = 0
+        for i in range(3, 6):
+            bus.pub("budgets.recover", i, verbose=False)
+        self.assertTrue(wait_for(lambda: budget.state == Budget.CLOSED))
+        self.assertEqual(received, [1, 2, 3, 4, 5])
+        bus.unsub("budgets.recover", func, verbose=False)
+
+    def test_healthy_subscribers_keep_their_latency(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=2)
+        self.addCleanup(dispatcher.shutdown)
+        bus, release, done = ThreadSafeSubpub(dispatcher), Event(), Event()
+        self.addCleanup(release.set)
+        received = []
+
+        def stuck(event, payload):
+            release.wait(5)
+
+        def healthy(event, payload):
+            received.append(payload)
+            if len(received) == 50:
+                done.set()
+
+        bus.sub("budgets.latency", stuck, verbose=False,
+                budget=Budget(0.01, max_strikes=1))
+        bus.sub("budgets.latency", healthy, verbose=False)
+        for i in range(50):
+            bus.pub("budgets.latency", i, verbose=False)
+            time.sleep(0.001)
+        self.assertTrue(done.wait(2))
+        release.set()
+
+    def test_metrics(self):
+        registry = metrics.enable()
+        self.addCleanup(metrics.disable)
+        bus = SimpleSubpub(name="budgets")
+
+        def failing(event, payload):
+            raise KeyError(payload)
+
+        bus.sub("budgets.metrics", failing, verbose=False,
+                budget=Budget(0.1, max_strikes=5))
+        with patch('src.subpubpy.budgets.report_exception'):
+            bus.pub("budgets.metrics", 1, verbose=False)
+        stats = registry.snapshot()["events"]["budgets"]["budgets.metrics"]
+        self.assertEqual(stats["budget_calls"], 1)
+        self.assertEqual(stats["budget_errors"], 1)
+        self.assertEqual(stats["published"], 1)
+        self.assertIn("subpub_event_budget_errors_total",
+                      metrics.to_prometheus(registry.snapshot()))
+        bus.unsub("budgets.metrics", failing, verbose=False)
@@ -0,0 +1,285 @@
+from src.subpubpy import SimpleSubpub, RegexSubpub, ThreadSafeSubpub
+from src.subpubpy.dispatchers import (InlineDispatcher, ThreadPoolDispatcher,
+                                      PartitionedDispatcher,
+                                      ExecutorDispatcher)
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, current_thread
+from unittest import TestCase
+from unittest.mock import patch
+
+
+class TestInlineDispatcher(TestCase):
+
+    def test_runs_in_caller_thread(self):
+        threads = []
+
+        def func(event, payload):
+            threads.append(current_thread())
+
+        InlineDispatcher().dispatch(func, "event", "payload")
+        self.assertEqual(threads, [current_thread()])
+
+    def test_exception_propagates(self):
+        def func(event, payload):
+            raise KeyError(payload)
+
+        with self.assertRaises(KeyError):
+            InlineDispatcher().dispatch(func, "event", "payload")
+
+
+class TestThreadPoolDispatcher(TestCase):
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ThreadPoolDispatcher(max_workers=0)
+
+        with self.assertRaises(ValueError):
+            ThreadPoolDispatcher(max_queue_size=-1)
+
+    def test_each_callback_runs_once(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=4, max_queue_size=8)
+        received = []
+        lock = Lock()
+
+        def func(event, payload):
+            with lock:
+                received.append(payload)
+
+        for i in range(500):
+            dispatcher.dispatch(func, "event", i)
+        dispatcher.join()
+        dispatcher.shutdown()
+
+        self.assertEqual(sorted(received), list(range(500)))
+        self.assertLessEqual(dispatcher.workers, 4)
+
+    def test_idle_worker_is_reused(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=4)
+
+        def func(event, payload): ...
+
+        for i in range(50):
+            dispatcher.dispatch(func, "event", i)
+            dispatcher.join()
+        dispatcher.shutdown()
+
+        self.assertEqual(dispatcher.workers, 1)
+
+    def test_dispatch_many_in_order(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=4)
+        received = []
+
+        def func(event, payload):
+            received.append(payload)
+
+        dispatcher.dispatch_many(func, "event", list(range(100)))
+        dispatcher.join()
+        dispatcher.shutdown()
+
+        self.assertEqual(received, list(range(100)))
+
+    def test_exception_reported(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=1)
+
+        def func(event, payload):
+            raise KeyError(payload)
+
+        with patch('src.subpubpy.dispatchers.report_exception') as report:
+            dispatcher.dispatch(func, "event", "payload")
+            dispatcher.join()
+        dispatcher.shutdown()
+        self.assertEqual(report.call_count, 1)
+
+    def test_dispatch_after_shutdown(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=1)
+        dispatcher.shutdown()
+
+        with self.assertRaises(RuntimeError):
+            dispatcher.dispatch(lambda e, p: None, "event", "payload")
+
+
+class TestPartitionedDispatcher(TestCase):
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            PartitionedDispatcher(partitions=0)
+
+        with self.assertRaises(ValueError):
+            PartitionedDispatcher(max_queue_size=-1)
+
+    def test_key_runs_in_order_on_one_worker(self):
+        dispatcher = PartitionedDispatcher(partitions=4, max_queue_size=8)
+        received, threads = {}, {}
+        lock = Lock()
+
+        def func(event, payload):
+            key, i = payload
+            with lock:
+                received.setdefault(key, []).append(i)
+                threads.setdefault(key, set()).add(current_thread().name)
+
+        for i in range(200):
+            for key in range(8):
+                dispatcher.dispatch_keyed(func, "event", (key, i), key)
+        dispatcher.join()
+        dispatcher.shutdown()
+
+        for key in range(8):
+            self.assertEqual(received[key], list(range(200)))
+            self.assertEqual(threads[key], {
+                f"subpub-partition-{dispatcher.partition(key)}"})
+
+    def test_dispatch_after_shutdown(self):
+        dispatcher = PartitionedDispatcher(partitions=1)
+        dispatcher.shutdown()
+        with self.assertRaises(RuntimeError):
+            dispatcher.dispatch_keyed(print, "event", "payload", "key")
+
+
+class TestExecutorDispatcher(TestCase):
+
+    def test_invalid_executor(self):
+        with self.assertRaises(TypeError):
+            ExecutorDispatcher(object())
+
+    def test_uses_supplied_executor(self):
+        executor = ThreadPoolExecutor(max_workers=2,
+                                      thread_name_prefix="supplied")
+        names = []
+
+        def func(event, payload):
+            names.append(current_thread().name)
+
+        dispatcher = ExecutorDispatcher(executor)
+        dispatcher.dispatch(func, "event", "payload")
+        dispatcher.shutdown()
+        executor.shutdown(wait=True)
+
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].startswith("supplied"))
+
+
+class TestSubpubDispatcher(TestCase):
+
+    def test_pub_many(self):
+        subpub = SimpleSubpub()
+        received = []
+
+        def func_1(event, payload):
+            received.append(("func_1", payload))
+
+        def func_2(event, payload):
+            received.append(("func_2", payload))
+
+        subpub.sub("test_pub_many", func_1)
+        subpub.sub("test_pub_many", func_2)
+        subpub.pub_many("test_pub_many", iter([1, 2]), verbose=False)
+        subpub.unsub("test_pub_many", func_1)
+        subpub.unsub("test_pub_many", func_2)
+
+        self.assertEqual(sorted(received), [("func_1", 1), ("func_1", 2),
+                                            ("func_2", 1), ("func_2", 2)])
+        self.assertLess(received.index(("func_1", 1)),
+                        received.index(("func_1", 2)))
+
+    def test_pub_many_executor(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        subpub = ThreadSafeSubpub(dispatcher=ExecutorDispatcher(executor))
+        received = []
+
+        def func(event, payload):
+            received.append(payload)
+
+        try:
+            subpub.sub("test_pub_many_executor", func, verbose=False)
+            subpub.pub_many("test_pub_many_executor", range(10),
+                            verbose=False)
+            executor.shutdown(wait=True)
+        finally:
+            subpub.unsub("test_pub_many_executor", func, verbose=False)
+            ThreadSafeSubpub(dispatcher=InlineDispatcher())
+
+        self.assertEqual(received, list(range(10)))
+
+    def test_invalid_dispatcher(self):
+        with self.assertRaises(TypeError):
+            SimpleSubpub(dispatcher=object())
+
+    def test_simple_subpub_thread_pool(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=2)
+        subpub = SimpleSubpub(dispatcher=dispatcher)
+        received = []
+
+        def func(event, payload):
+            received.append(payload)
+
+        subpub.sub("test_simple_subpub_thread_pool", func)
+        subpub.pub("test_simple_subpub_thread_pool", 1, verbose=False)
+        dispatcher.join()
+        dispatcher.shutdown()
+        subpub.unsub("test_simple_subpub_thread_pool", func)
+
+        self.assertEqual(received, [1])
+
+    def test_regex_subpub_thread_pool(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=2)
+        subpub = RegexSubpub(dispatcher=dispatcher)
+        received = []
+
+        def func(event, payload):
+            received.append(payload)
+
+        subpub.sub("test_regex_subpub_thread_pool", func)
+        subpub.pub("test_regex_subpub_thread_pool", 1, verbose=False)
+        dispatcher.join()
+        dispatcher.shutdown()
+
+        self.assertEqual(received, [1])
+
+    def test_threadsafe_subpub_own_dispatcher(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=2)
+        self.addCleanup(dispatcher.shutdown)
+        subpub = ThreadSafeSubpub(dispatcher=dispatcher)
+        self.assertIs(subpub._dispatcher, dispatcher)
+        self.assertIsInstance(ThreadSafeSubpub()._dispatcher,
+                              InlineDispatcher)
+
+    def test_pub_with_key(self):
+        dispatcher = PartitionedDispatcher(partitions=3)
+        self.addCleanup(dispatcher.shutdown)
+        subpub = ThreadSafeSubpub(dispatcher)
+        received = {}
+        lock = Lock()
+
+        def func(event, payload):
+            with lock:
+                received.setdefault(payload["account"], []).append(
+                    payload["seq"])
+
+        subpub.sub("test_pub_with_key", func, verbose=False)
+        subpub.sub("test_pub_with_key_where", func, verbose=False,
+                   where={"seq": {">=": 0}})
+        for seq in range(100):
+            for account in ("a", "b", "c", "d"):
+                payload = {"account": account, "seq": seq}
+                subpub.pub("test_pub_with_key", payload, verbose=False,
+                           key=account)
+        subpub.pub_many("test_pub_with_key_where",
+                        [{"account": "e", "seq": seq} for seq in range(50)],
+                        verbose=False, key="e")
+        dispatcher.join()
+
+        for account in ("a", "b", "c", "d"):
+            self.assertEqual(received[account], list(range(100)))
+        self.assertEqual(received["e"], list(range(50)))
+
+    def test_key_ignored_by_other_dispatchers(self):
+        subpub, received = SimpleSubpub(), []
+
+        def func(event, payload):
+            received.append(payload)
+
+        subpub.sub("test_key_ignored", func, verbose=False)
+        subpub.pub("test_key_ignored", 1, verbose=False, key="account")
+        subpub.pub_many("test_key_ignored", [2, 3], verbose=False, key=1)
+        self.assertEqual(received, [1, 2, 3])
@@ -0,0 +1,119 @@
+from src.subpubpy import (SimpleSubpub, ThreadSafeSubpub, RegexSubpub,
+                          Conflate)
+from src.subpubpy.utils import FilterIndex
+from threading import Barrier, Thread
+from unittest import TestCase
+from unittest.mock import patch
+import time
+
+
+class SlowFilterIndex(FilterIndex):
+
+    def __init__(self):
+        time.sleep(0.01)
+        super().__init__()
+
+
+class Recorder:
+
+    def __init__(self):
+        self.calls = []
+
+    def callback(self, event, payload):
+        self.calls.append(payload)
+
+
+class TestWhereFilters(TestCase):
+
+    def test_only_matching_payloads_are_dispatched(self):
+        bus, eurusd, big = SimpleSubpub(), Recorder(), Recorder()
+        bus.sub("filters.ticks", eurusd.callback, verbose=False,
+                where={"symbol": "EURUSD"})
+        bus.sub("filters.ticks", big.callback, verbose=False,
+                where={"qty": {">=": 100}})
+        ticks = [{"symbol": "EURUSD", "qty": 1},
+                 {"symbol": "GBPUSD", "qty": 500},
+                 {"symbol": "EURUSD", "qty": 100}]
+        bus.pub("filters.ticks", ticks[0], verbose=False)
+        bus.pub_many("filters.ticks", ticks[1:], verbose=False)
+
+        self.assertEqual(eurusd.calls, [ticks[0], ticks[2]])
+        self.assertEqual(big.calls, [ticks[1], ticks[2]])
+
+        bus.unsub("filters.ticks", eurusd.callback)
+        bus.unsub("filters.ticks", big.callback)
+        bus.pub("filters.ticks", ticks[2], verbose=False)
+        self.assertEqual(len(eurusd.calls), 2)
+        with self.assertRaises(ValueError):
+            bus.unsub("filters.ticks", eurusd.callback)
+
+    def test_filtered_and_plain_subscribers(self):
+        bus, plain, filtered = ThreadSafeSubpub(), Recorder(), Recorder()
+        bus.sub("filters.mixed", plain.callback, verbose=False)
+        bus.sub("filters.mixed", filtered.callback, verbose=False,
+                where={"side": {"buy", "sell"}})
+        bus.pub("filters.mixed", {"side": "buy"}, verbose=False)
+        bus.pub("filters.mixed", {"side": "hold"}, verbose=False)
+
+        self.assertEqual(len(plain.calls), 2)
+        self.assertEqual(filtered.calls, [{"side": "buy"}])
+        bus.unsub("filters.mixed", plain.callback)
+        bus.unsub("filters.mixed", filtered.callback)
+
+    def test_regex_subpub(self):
+        bus, recorder = RegexSubpub(), Recorder()
+        bus.sub(r"filters\.orders\..*", recorder.callback, verbose=False,
+                where={"status": "filled"})
+        bus.pub("filters.orders.fx", {"status": "filled"}, verbose=False)
+        bus.pub("filters.orders.fx", {"status": "new"}, verbose=False)
+        self.assertEqual(recorder.calls, [{"status": "filled"}])
+        bus.unsub(r"filters\.orders\..*", recorder.callback)
+
+    def test_invalid_filter(self):
+        bus = SimpleSubpub()
+        with self.assertRaises(TypeError):
+            bus.sub("filters.invalid", Recorder().callback, where=[1])
+        with self.assertRaises(ValueError):
+            bus.sub("filters.invalid", Recorder().callback,
+                    where={"qty": {"=>": 1}})
+
+    def test_filter_with_window(self):
+        bus, recorder = SimpleSubpub(), Recorder()
+        bus.sub("filters.window", recorder.callback, verbose=False,
+                window=Conflate(0.02), where={"symbol": "EURUSD"})
+        for bid in range(3):
+            bus.pub("filters.window", {"symbol": "EURUSD", "bid": bid},
+                    verbose=False)
+            bus.pub("filters.window", {"symbol": "GBPUSD", "bid": bid},
+                    verbose=False)
+        for _ in range(100):
+            if recorder.calls:
+                break
+            time.sleep(0.01)
+        self.assertEqual(recorder.calls, [{"symbol": "EURUSD", "bid": 2}])
+        bus.unsub("filters.window", recorder.callback)
+        with self.assertRaises(ValueError):
+            bus.unsub("filters.window", recorder.callback)
+
+    def test_concurrent_subscriptions_share_one_index(self):
+        bus = ThreadSafeSubpub()
+        recorders = [Recorder() for _ in range(8)]
+        barrier = Barrier(len(recorders))
+
+        def subscribe(recorder):
+            barrier.wait()
+            bus.sub("filters.concurrent", recorder.callback, verbose=False,
+                    where={"symbol": "EURUSD"})
+
+        with patch("src.subpubpy.abstract.FilterIndex", SlowFilterIndex):
+            threads = [Thread(target=subscribe, args=(recorder,))
+                       for recorder in recorders]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        handlers = bus._handler.get("filters.concurrent")
+        self.assertEqual(len(handlers), 1)
+        for recorder in recorders:
+            bus.unsub("filters.concurrent", recorder.callback, verbose=False)
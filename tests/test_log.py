@@ -0,0 +1,150 @@
+from src.subpubpy import Publisher, Subscriber, DurableChannel
+from src.subpubpy.log import SegmentedLog, LogReaderQueue
+from src.subpubpy.manager import _ChannelManager
+from queue import Empty
+from threading import Thread
+from unittest import TestCase
+import glob
+import os
+import tempfile
+import time
+
+
+class TestSegmentedLog(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.log = SegmentedLog(self.directory, segment_size=4096,
+                                index_interval=256)
+
+    def tearDown(self):
+        self.log.close()
+        self.tmp.cleanup()
+
+    def reopen(self, **kwargs):
+        self.log.close()
+        self.log = SegmentedLog(self.directory, segment_size=4096, **kwargs)
+        return self.log
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SegmentedLog(self.directory, segment_size=8)
+        with self.assertRaises(ValueError):
+            SegmentedLog(self.directory, index_interval=0)
+
+    def test_replay_from_offset(self):
+        self.assertEqual(self.log.append_many(
+            {"seq": i, "pad": "x" * 20} for i in range(500)), 0)
+        self.assertGreater(self.log.segments, 1)
+
+        reader = LogReaderQueue(self.log, offset=0)
+        received = []
+        while not reader.empty():
+            received.extend(reader.get_many(64))
+        self.assertEqual([m["seq"] for m in received], list(range(500)))
+
+        reader.seek(offset=321)
+        self.assertEqual(reader.get()["seq"], 321)
+        reader.seek()
+        with self.assertRaises(Empty):
+            reader.get_nowait()
+
+    def test_replay_from_timestamp(self):
+        self.log.append_many(range(10))
+        timestamp = time.time()
+        time.sleep(0.01)
+        self.log.append_many(range(10, 15))
+
+        reader = LogReaderQueue(self.log, timestamp=timestamp)
+        self.assertEqual(reader.offset, 10)
+        self.assertEqual(reader.get_many(10), [10, 11, 12, 13, 14])
+        self.assertEqual(self.log.find(time.time() + 1), 15)
+
+    def test_recovery(self):
+        self.log.append_many([b"raw", {"a": 1}, "text"] * 100)
+        self.assertEqual(self.reopen().next_offset, 300)
+        self.log.append("after reopen")
+
+        reader = LogReaderQueue(self.reopen(), offset=298)
+        self.assertEqual(reader.get_many(10), [{"a": 1}, "text",
+                                               "after reopen"])
+
+    def test_torn_record_dropped(self):
+        self.log.append_many([b"first", b"second"])
+        self.log.close()
+        path = sorted(glob.glob(os.path.join(self.directory, "*.log")))[-1]
+        with open(path, "r+b") as f:
+            data = f.read()
+            f.seek(data.rindex(b"second"))
+            f.write(b"SECOND")
+
+        log = self.reopen()
+        self.assertEqual(log.next_offset, 1)
+        log.append(b"third")
+        self.assertEqual(LogReaderQueue(log, offset=0).get_many(10),
+                         [b"first", b"third"])
+
+    def test_retention_by_size(self):
+        log = self.reopen(retention_bytes=8192)
+        log.append_many([b"x" * 1000] * 40)
+
+        self.assertGreater(log.start_offset, 0)
+        self.assertLessEqual(log.size, 8192 + 4096)
+        reader = LogReaderQueue(log, offset=0)
+        reader.get_many(1)
+        self.assertEqual(reader.dropped, log.start_offset)
+
+    def test_retention_by_age(self):
+        self.log.append_many([b"x" * 1000] * 8)
+        self.log.retention_seconds = 0
+        self.assertGreater(self.log.retain(), 0)
+        self.assertEqual(self.log.segments, 1)
+
+    def test_record_larger_than_segment(self):
+        self.log.append(b"y" * 10000)
+        self.log.append(b"small")
+        reader = LogReaderQueue(self.log, offset=0)
+        self.assertEqual(reader.get_many(10), [b"y" * 10000])
+        self.assertEqual(reader.get_many(10), [b"small"])
+
+    def test_blocking_reader(self):
+        reader = LogReaderQueue(self.log)
+        received = []
+        consumer = Thread(target=lambda: received.append(
+            reader.get(block=True, timeout=5)))
+        consumer.start()
+        self.log.append("message")
+        consumer.join(5)
+        self.assertEqual(received, ["message"])
+
+
+class TestDurableChannel(TestCase):
+
+    def test_late_subscriber_replays(self):
+        with tempfile.TemporaryDirectory() as directory:
+            channel = DurableChannel("test_durable_channel", directory,
+                                     segment_size=4096)
+            _ChannelManager().register(channel)
+            publisher = Publisher()
+            publisher.publish("test_durable_channel", "first")
+            publisher.publish_many("test_durable_channel", ["second", "third"])
+
+            late = Subscriber(q=channel.reader(offset=0))
+            late.add_channel("test_durable_channel")
+            with self.assertRaises(ValueError):
+                channel.attach(Subscriber())
+            self.assertEqual(late.get_messages(10),
+                             ["first", "second", "third"])
+            late.remove_channel("test_durable_channel")
+            channel.close()
+
+            restarted = DurableChannel("test_durable_channel", directory,
+                                       segment_size=4096)
+            self.assertEqual(Subscriber(q=restarted.reader(offset=1))
+                             .get_messages(10), ["second", "third"])
+            restarted.close()
+
+    def test_requires_directory(self):
+        with self.assertRaises(ValueError):
+            DurableChannel("test_requires_directory")
@@ -0,0 +1,230 @@
+from src.subpubpy import (Channel, Publisher, Subscriber, RingBufferChannel,
+                          DropOldestPolicy, LastNStore)
+from src.subpubpy.manager import _ChannelManager
+from src.subpubpy.utils import _reaper
+from threading import Barrier, Thread
+from unittest import TestCase
+import gc
+
+
+class TestChannelManager(TestCase):
+
+    def test_singleton(self):
+        self.assertIs(_ChannelManager(), _ChannelManager())
+
+    def test_registration_survives_construction(self):
+        channel = RingBufferChannel("test_registration_survives")
+        _ChannelManager().register(channel)
+        subscriber = Subscriber(q=channel.reader())
+        subscriber.add_channel("test_registration_survives")
+        Publisher(), Subscriber(), _ChannelManager()
+
+        self.assertIs(_ChannelManager().channels["test_registration_survives"],
+                      channel)
+        Publisher().publish("test_registration_survives", "message")
+        self.assertEqual(subscriber.get_message(), "message")
+        subscriber.remove_channel("test_registration_survives")
+
+    def test_concurrent_get_or_create(self):
+        manager = _ChannelManager()
+        start = Barrier(8)
+        created = []
+
+        def create():
+            start.wait()
+            created.append(manager._get_or_create("test_concurrent_create"))
+
+        threads = [Thread(target=create) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(created), 8)
+        self.assertEqual(len(set(map(id, created))), 1)
+
+    def test_publish_while_subscribing(self):
+        publisher = Publisher()
+        names = [f"test_publish_while_subscribing_{i}" for i in range(4)]
+        subscribers = [Subscriber(overflow=DropOldestPolicy())
+                       for _ in range(40)]
+        errors = []
+
+        def publish(name):
+            try:
+                for i in range(2000):
+                    publisher.publish(name, i)
+            except Exception as exc:
+                errors.append(exc)
+
+        def subscribe():
+            for subscriber in subscribers:
+                for name in names:
+                    subscriber.add_channel(name)
+
+        threads = [Thread(target=publish, args=(name,)) for name in names]
+        threads.append(Thread(target=subscribe))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(errors, [])
+        channels = _ChannelManager().channels
+        for name in names:
+            self.assertEqual(len(channels[name].subscribers), 40)
+        for subscriber in subscribers:
+            for name in names:
+                subscriber.remove_channel(name)
+
+
+class TestPatternSubscriptions(TestCase):
+
+    def test_existing_and_new_channels(self):
+        publisher = Publisher()
+        subscriber = Subscriber()
+        publisher.publish("test_patterns.eu.fx.spot", "existing")
+        subscriber.add_pattern("test_patterns.*.fx.#")
+
+        publisher.publish("test_patterns.eu.fx.spot", "eu")
+        publisher.publish("test_patterns.us.fx", "us")
+        publisher.publish("test_patterns.us.equity", "equity")
+
+        self.assertEqual(list(subscriber.get_messages(10)), ["eu", "us"])
+        self.assertEqual(subscriber.patterns, {"test_patterns.*.fx.#"})
+        subscriber.remove_pattern("test_patterns.*.fx.#")
+        publisher.publish("test_patterns.eu.fx.spot", "removed")
+        self.assertEqual(subscriber.get_messages(10), [])
+
+    def test_invalid_pattern(self):
+        with self.assertRaises(ValueError):
+            Subscriber().add_pattern("test_invalid.fx*")
+        with self.assertRaises(ValueError):
+            Subscriber().add_pattern()
+
+    def test_delivered_once(self):
+        publisher = Publisher()
+        subscriber = Subscriber()
+        subscriber.add_channel("test_once.eu.fx")
+        subscriber.add_pattern("test_once.#", "test_once.*.fx")
+
+        publisher.publish("test_once.eu.fx", "message")
+        self.assertEqual(subscriber.get_messages(10), ["message"])
+
+        subscriber.remove_channel("test_once.eu.fx")
+        publisher.publish("test_once.eu.fx", "pattern")
+        subscriber.remove_pattern("test_once.#")
+        publisher.publish("test_once.eu.fx", "other pattern")
+        subscriber.remove_pattern("test_once.*.fx")
+        publisher.publish("test_once.eu.fx", "none")
+        self.assertEqual(subscriber.get_messages(10),
+                         ["pattern", "other pattern"])
+
+    def test_pattern_skips_buffered_channels(self):
+        ring = RingBufferChannel("test_skip.ring")
+        _ChannelManager().register(ring)
+        subscriber = Subscriber()
+        with self.assertLogs(level="WARNING") as logs:
+            subscriber.add_pattern("test_skip.*")
+        self.assertIn("test_skip.ring", logs.output[0])
+        self.assertNotIn(subscriber, ring.subscribers)
+        subscriber.remove_pattern("test_skip.*")
+
+    def test_exact_subscription_kept(self):
+        publisher = Publisher()
+        subscriber = Subscriber()
+        subscriber.add_pattern("test_exact.*")
+        subscriber.add_channel("test_exact.fx")
+        subscriber.remove_pattern("test_exact.*")
+
+        publisher.publish("test_exact.fx", "exact")
+        publisher.publish("test_exact.eq", "pattern")
+        self.assertEqual(subscriber.get_messages(10), ["exact"])
+        subscriber.remove_channel("test_exact.fx")
+
+    def test_resolved_once(self):
+        manager = _ChannelManager()
+        subscriber = Subscriber()
+        subscriber.add_pattern("test_resolved.#")
+        trie = manager._ChannelManager__patterns
+        calls = []
+        get = trie.get
+        trie.get = lambda topic: calls.append(topic) or get(topic)
+        try:
+            for _ in range(3):
+                Publisher().publish("test_resolved.fx", "message")
+        finally:
+            del trie.get
+            subscriber.remove_pattern("test_resolved.#")
+
+        self.assertEqual(calls, ["test_resolved.fx"])
+        self.assertEqual(subscriber.get_messages(10), ["message"] * 3)
+
+
+class TestWeakSubscriptions(TestCase):
+
+    def test_collected_subscriber_is_detached(self):
+        subscriber = Subscriber()
+        subscriber.add_channel("test_weak.kept", "test_weak.collected")
+        other = Subscriber()
+        other.add_channel("test_weak.kept")
+        channels = _ChannelManager().channels
+        kept = channels["test_weak.kept"]
+
+        del subscriber
+        gc.collect()
+        self.assertTrue(_reaper.flush(5))
+        self.assertEqual(kept.subscribers, {other})
+        self.assertNotIn("test_weak.collected", _ChannelManager().channels)
+        other.remove_channel("test_weak.kept")
+
+    def test_empty_channel_is_removed(self):
+        manager = _ChannelManager()
+        subscriber = Subscriber()
+        subscriber.add_channel("test_weak.empty")
+        self.assertIn("test_weak.empty", manager.channels)
+        subscriber.remove_channel("test_weak.empty")
+        self.assertNotIn("test_weak.empty", manager.channels)
+
+        subscriber.remove_channel("test_weak.empty")
+        manager.remove("test_weak.never", subscriber)
+        Publisher().publish("test_weak.never", "message")
+        self.assertNotIn("test_weak.never", manager.channels)
+
+    def test_registered_channel_is_kept(self):
+        manager = _ChannelManager()
+        channel = Channel("test_weak.registered",
+                          retained=LastNStore(1))
+        manager.register(channel)
+        subscriber = Subscriber()
+        subscriber.add_channel("test_weak.registered")
+        subscriber.remove_channel("test_weak.registered")
+        self.assertIs(manager.channels["test_weak.registered"], channel)
+
+    def test_unregister(self):
+        manager = _ChannelManager()
+        channel = RingBufferChannel("test_unregister")
+        subscriber = Subscriber(q=channel.reader())
+        manager.register(channel)
+        subscriber.add_channel("test_unregister")
+
+        self.assertFalse(manager.unregister(Channel("test_unregister")))
+        self.assertTrue(manager.unregister(channel))
+        self.assertNotIn("test_unregister", manager.channels)
+        self.assertFalse(manager.unregister(channel))
+        Publisher().publish("test_unregister", "message")
+        self.assertIsNone(subscriber.get_message())
+
+    def test_collected_pattern_subscriber(self):
+        manager = _ChannelManager()
+        subscriber = Subscriber()
+        subscriber.add_pattern("test_weak_pattern.#")
+        Publisher().publish("test_weak_pattern.fx", "message")
+        self.assertEqual(subscriber.get_messages(10), ["message"])
+        self.assertIn("test_weak_pattern.fx", manager.channels)
+
+        del subscriber
+        gc.collect()
+        self.assertTrue(_reaper.flush(5))
+        self.assertNotIn("test_weak_pattern.#", manager.patterns)
+        self.assertNotIn("test_weak_pattern.fx", manager.channels)
@@ -0,0 +1,179 @@
+from src.subpubpy import (SimpleSubpub, Publisher, Subscriber,
+                          AsyncSubscriber, ThreadPoolDispatcher, DropNewestPolicy,
+                          PrometheusFileExporter)
+from src.subpubpy import metrics
+from src.subpubpy.metrics import AbstractExporter
+from queue import Queue
+from threading import Thread
+from unittest import TestCase
+import os
+import tempfile
+
+
+class Collect(AbstractExporter):
+
+    def __init__(self):
+        self.snapshots = []
+
+    def export(self, snapshot):
+        self.snapshots.append(snapshot)
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        self.registry = metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+
+    def test_disabled(self):
+        metrics.disable()
+        self.assertIsNone(metrics.active)
+        SimpleSubpub().pub("test_metrics_disabled", None, verbose=False)
+
+        self.assertNotIn("test_metrics_disabled",
+                         self.registry.snapshot()["events"].get(
+                             "SimpleSubpub", {}))
+
+    def test_event_metrics(self):
+        subpub = SimpleSubpub()
+
+        def func(event, payload): ...
+
+        subpub.sub("test_event_metrics", func, verbose=False)
+        subpub.pub("test_event_metrics", 1, verbose=False)
+        subpub.pub_many("test_event_metrics", [2, 3], verbose=False)
+        snapshot = self.registry.snapshot()
+        subpub.unsub("test_event_metrics", func, verbose=False)
+
+        self.assertEqual(snapshot["events"]["SimpleSubpub"]
+                         ["test_event_metrics"],
+                         {"published": 3, "subscribers": 1})
+
+    def test_buses_by_name(self):
+        pricing, other = SimpleSubpub(name="pricing"), SimpleSubpub()
+
+        def func(event, payload): ...
+
+        pricing.sub("test_named_metrics", func, verbose=False)
+        other.sub("test_named_metrics", func, verbose=False)
+        pricing.pub("test_named_metrics", 1, verbose=False)
+        snapshot = self.registry.snapshot()
+
+        self.assertEqual(snapshot["events"]["pricing"]["test_named_metrics"],
+                         {"published": 1, "subscribers": 1})
+        self.assertEqual(
+            snapshot["events"]["SimpleSubpub"]["test_named_metrics"],
+            {"published": 0, "subscribers": 1})
+
+    def test_concurrent_publishers(self):
+        subpub = SimpleSubpub(name="test_concurrent_publishers")
+
+        def publish(event):
+            for _ in range(500):
+                subpub.pub(event, None, verbose=False)
+
+        threads = [Thread(target=publish, args=(f"event{i % 4}",))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        events = self.registry.snapshot()["events"][
+            "test_concurrent_publishers"]
+
+        self.assertEqual({event: stats["published"]
+                          for event, stats in events.items()},
+                         {f"event{i}": 1000 for i in range(4)})
+
+    def test_callback_errors(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=1)
+        subpub = SimpleSubpub(dispatcher=dispatcher)
+
+        def func(event, payload):
+            raise KeyError(payload)
+
+        subpub.sub("test_callback_errors", func, verbose=False)
+        subpub.pub("test_callback_errors", 1, verbose=False)
+        dispatcher.join()
+        dispatcher.shutdown()
+        subpub.unsub("test_callback_errors", func, verbose=False)
+
+        self.assertEqual(self.registry.snapshot()["callback_errors"],
+                         {"SimpleSubpub": {"test_callback_errors": 1}})
+
+    def test_callback_errors_by_bus(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=1)
+        pricing = SimpleSubpub(dispatcher=dispatcher, name="pricing")
+        orders = SimpleSubpub(dispatcher=dispatcher, name="orders")
+
+        def fail(event, payload):
+            raise KeyError(payload)
+
+        def succeed(event, payload): ...
+
+        pricing.sub("test_errors_by_bus", fail, verbose=False)
+        orders.sub("test_errors_by_bus", succeed, verbose=False)
+        pricing.pub("test_errors_by_bus", 1, verbose=False)
+        orders.pub("test_errors_by_bus", 2, verbose=False)
+        dispatcher.join()
+        dispatcher.shutdown()
+
+        self.assertEqual(self.registry.snapshot()["callback_errors"],
+                         {"pricing": {"test_errors_by_bus": 1}})
+
+    def test_channels_name_is_reserved(self):
+        with self.assertRaises(ValueError):
+            SimpleSubpub(name="channels")
+
+    def test_channel_metrics(self):
+        publisher = Publisher()
+        subscriber = Subscriber(q=Queue(maxsize=2),
+                                overflow=DropNewestPolicy())
+        subscriber.add_channel("test_channel_metrics")
+        publisher.publish_many("test_channel_metrics", range(3))
+        subscriber.get_message()
+        snapshot = self.registry.snapshot()
+        subscriber.remove_channel("test_channel_metrics")
+
+        self.assertEqual(snapshot["channels"]["test_channel_metrics"],
+                         {"published": 3, "subscribers": 1,
+                          "queue_depth": 1, "queue_high_watermark": 2,
+                          "dropped": 1})
+
+    def test_async_channel_metrics(self):
+        subscriber = AsyncSubscriber(maxsize=2)
+        subscriber.add_channel("test_async_channel_metrics")
+        Publisher().publish_many("test_async_channel_metrics", range(3))
+        snapshot = self.registry.snapshot()
+        subscriber.remove_channel("test_async_channel_metrics")
+
+        self.assertEqual(subscriber.qsize(), 2)
+        self.assertEqual(snapshot["channels"]["test_async_channel_metrics"],
+                         {"published": 3, "subscribers": 1,
+                          "queue_depth": 2, "queue_high_watermark": 2,
+                          "dropped": 1})
+
+    def test_exporters(self):
+        with self.assertRaises(TypeError):
+            self.registry.add_exporter(object())
+
+        collect = Collect()
+        self.registry.add_exporter(collect)
+        self.registry.export()
+        self.assertEqual(len(collect.snapshots), 1)
+
+    def test_prometheus_file(self):
+        subpub = SimpleSubpub()
+        subpub.pub('test "prometheus"', None, verbose=False)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "subpub.prom")
+            PrometheusFileExporter(path).export(self.registry.snapshot())
+            with open(path) as f:
+                text = f.read()
+
+        self.assertIn("# TYPE subpub_event_published_total counter", text)
+        self.assertIn('subpub_event_published_total{bus="SimpleSubpub",'
+                      'event="test \\"prometheus\\""} 1', text)
@@ -0,0 +1,201 @@
+from src.subpubpy import (Publisher, Subscriber, SimpleSubpub,
+                          SharedMemoryChannel, SharedPayload,
+                          SharedMemoryPayload)
+from src.subpubpy.manager import _ChannelManager
+from src.subpubpy.shm import SharedRingBuffer, SharedMemoryQueue
+from array import array
+from unittest import TestCase
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import time
+import tracemalloc
+
+FRAME_SIZE = 50 * 1024 * 1024
+
+# owner process leaking its payload after a round-trip through pickle.
+LEAKING_OWNER = """
+import os, pickle
+from src.subpubpy import SharedMemoryPayload
+payload = SharedMemoryPayload(b"leak")
+pickle.loads(pickle.dumps(payload)).release()
+print(payload.name, flush=True)
+os._exit(0)
+"""
+
+
+def checksum(channel, ready, results):
+    subscriber = Subscriber(q=channel.reader())
+    ready.set()
+    payload = subscriber.get_message(block=True)
+    results.put((type(payload).__name__, payload.nbytes,
+                 bytes(payload.view[:4])))
+    payload.release()
+    channel.close()
+
+
+class TestSharedPayload(TestCase):
+
+    def test_read_only_view_without_copy(self):
+        frame = bytearray(b"abcdef")
+        payload = SharedPayload(frame)
+
+        self.assertIs(payload.view.obj, frame)
+        self.assertTrue(payload.view.readonly)
+        with self.assertRaises(TypeError):
+            payload.view[0] = 0
+        self.assertEqual(len(payload), 6)
+        self.assertEqual(payload, b"abcdef")
+        self.assertEqual(bytes(payload), b"abcdef")
+        self.assertIn("nbytes=6", repr(payload))
+
+    def test_invalid_buffer(self):
+        with self.assertRaises(TypeError):
+            SharedPayload("text")
+        with self.assertRaises(ValueError):
+            SharedPayload(memoryview(b"abcdef")[::2])
+
+    def test_pickle_out_of_band(self):
+        payload = SharedPayload(array("d", [1.5, 2.5, 3.5]))
+        buffers = []
+        stream = pickle.dumps(payload, protocol=5,
+                              buffer_callback=buffers.append)
+
+        self.assertEqual(len(buffers), 1)
+        self.assertLess(len(stream), 200)
+        restored = pickle.loads(stream, buffers=buffers)
+        self.assertEqual(restored, payload)
+        self.assertEqual(restored.format, "d")
+        self.assertEqual(restored.view.tolist(), [1.5, 2.5, 3.5])
+
+    def test_pickle_in_band(self):
+        payload = SharedPayload(b"frame")
+        for protocol in (4, 5):
+            restored = pickle.loads(pickle.dumps(payload, protocol=protocol))
+            self.assertEqual(restored, b"frame")
+            self.assertTrue(restored.view.readonly)
+
+    def test_fan_out_does_not_copy(self):
+        frame = SharedPayload(bytearray(FRAME_SIZE))
+        bus = SimpleSubpub()
+        received = []
+        callbacks = [lambda event, payload: received.append(payload)
+                     for _ in range(10)]
+        for callback in callbacks:
+            bus.sub("test_fan_out_does_not_copy", callback, verbose=False)
+        publisher = Publisher()
+        subscribers = [Subscriber() for _ in range(10)]
+        for subscriber in subscribers:
+            subscriber.add_channel("test_fan_out_does_not_copy")
+
+        tracemalloc.start()
+        try:
+            bus.pub("test_fan_out_does_not_copy", frame)
+            publisher.publish("test_fan_out_does_not_copy", frame)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            for callback in callbacks:
+                bus.unsub("test_fan_out_does_not_copy", callback,
+                          verbose=False)
+
+        self.assertLess(peak, FRAME_SIZE // 10)
+        self.assertEqual(len(received), 10)
+        for subscriber in subscribers:
+            self.assertIs(subscriber.get_message(), frame)
+            subscriber.remove_channel("test_fan_out_does_not_copy")
+
+
+class TestSharedMemoryPayload(TestCase):
+
+    def test_pass_by_handle(self):
+        payload = SharedMemoryPayload(array("i", range(1000)))
+        stream = pickle.dumps(payload, protocol=5)
+        self.assertLess(len(stream), 300)
+
+        received = pickle.loads(stream)
+        self.assertFalse(received.owner)
+        self.assertEqual(received.name, payload.name)
+        self.assertEqual(received.format, "i")
+        self.assertEqual(received.view[999], 999)
+        self.assertTrue(received.view.readonly)
+
+        received.release()
+        payload.release()
+        with self.assertRaises(FileNotFoundError):
+            pickle.loads(stream)
+        with self.assertRaises(ValueError):
+            pickle.dumps(payload)
+
+    def test_release_with_referenced_slice(self):
+        payload = SharedMemoryPayload(b"abcdef")
+        stream = pickle.dumps(payload)
+        head = payload.view[:2]
+        with self.assertRaises(BufferError):
+            payload.release()
+        with self.assertRaises(FileNotFoundError):
+            pickle.loads(stream)
+
+        head.release()
+        payload.release()
+        self.assertIsNone(payload.name)
+
+    def test_tracker_unlinks_after_owner_exits(self):
+        if not os.path.isdir("/dev/shm"):
+            self.skipTest("requires /dev/shm")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        done = subprocess.run([sys.executable, "-c", LEAKING_OWNER],
+                              cwd=root, capture_output=True, text=True,
+                              timeout=30)
+        self.assertEqual(done.returncode, 0, done.stderr)
+        path = "/dev/shm/" + done.stdout.strip().lstrip("/")
+        deadline = time.monotonic() + 10
+        while os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(os.path.exists(path))
+
+    def test_shared_memory_channel(self):
+        ring = SharedRingBuffer(capacity=16384, max_readers=2)
+        try:
+            q = SharedMemoryQueue(ring)
+            channel = SharedMemoryChannel("test_shared_memory_channel",
+                                          ring=ring)
+            frame = SharedPayload(bytes(range(256)) * 8)
+            channel.on_message(frame)
+            channel.on_message({"frame": frame, "seq": 1})
+
+            self.assertEqual(q.get_nowait(), frame)
+            message = q.get_nowait()
+            self.assertEqual(message["seq"], 1)
+            self.assertEqual(message["frame"], frame)
+        finally:
+            ring.close()
+            ring.unlink()
+
+    def test_cross_process(self):
+        ctx = multiprocessing.get_context()
+        channel = SharedMemoryChannel("test_payload_cross_process",
+                                      capacity=4096)
+        publisher = Publisher()
+        _ChannelManager().register(channel)
+        ready, results = ctx.Event(), ctx.Queue()
+        payload = SharedMemoryPayload(b"\x01\x02\x03\x04" * (FRAME_SIZE // 4))
+
+        worker = ctx.Process(target=checksum,
+                             args=(channel, ready, results))
+        worker.start()
+        try:
+            self.assertTrue(ready.wait(10))
+            publisher.publish("test_payload_cross_process", payload)
+            received = results.get(timeout=10)
+        finally:
+            worker.join(10)
+            payload.release()
+            channel.close()
+            channel.unlink()
+
+        self.assertEqual(received, ("SharedMemoryPayload", FRAME_SIZE,
+                                    b"\x01\x02\x03\x04"))
+        self.assertEqual(worker.exitcode, 0)
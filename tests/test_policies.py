@@ -0,0 +1,106 @@
+from src.subpubpy import (Publisher, Subscriber, BlockTimeoutPolicy,
+                          DropNewestPolicy, DropOldestPolicy, ConflatePolicy)
+from src.subpubpy.policies import ConflatingQueue
+from queue import Queue
+from unittest import TestCase
+
+
+class TestOverflowPolicies(TestCase):
+
+    def drain(self, subscriber):
+        messages = []
+        while not subscriber.is_empty():
+            messages.append(subscriber.get_message())
+        return messages
+
+    def test_invalid_policy(self):
+        with self.assertRaises(TypeError):
+            Subscriber(overflow="drop")
+
+    def test_block_timeout(self):
+        with self.assertRaises(ValueError):
+            BlockTimeoutPolicy(-1)
+
+        subscriber = Subscriber(q=Queue(maxsize=1),
+                                overflow=BlockTimeoutPolicy(0.01))
+        subscriber.notify(1)
+        subscriber.notify(2)
+
+        self.assertEqual(subscriber.dropped, 1)
+        self.assertEqual(self.drain(subscriber), [1])
+
+    def test_drop_newest(self):
+        subscriber = Subscriber(q=Queue(maxsize=2),
+                                overflow=DropNewestPolicy())
+        subscriber.notify_many(range(5))
+
+        self.assertEqual(subscriber.dropped, 3)
+        self.assertEqual(self.drain(subscriber), [0, 1])
+
+    def test_drop_oldest(self):
+        subscriber = Subscriber(q=Queue(maxsize=2),
+                                overflow=DropOldestPolicy())
+        subscriber.notify_many(range(5))
+
+        self.assertEqual(subscriber.dropped, 3)
+        self.assertEqual(self.drain(subscriber), [3, 4])
+
+    def test_conflate(self):
+        with self.assertRaises(TypeError):
+            ConflatePolicy(key="symbol")
+
+        with self.assertRaises(ValueError):
+            Subscriber(q=Queue(), overflow=ConflatePolicy(lambda m: m[0]))
+
+        subscriber = Subscriber(overflow=ConflatePolicy(lambda m: m[0]))
+        self.assertIsInstance(subscriber.queue, ConflatingQueue)
+        for message in [("EUR", 1), ("USD", 1), ("EUR", 2), ("EUR", 3)]:
+            subscriber.notify(message)
+
+        self.assertEqual(subscriber.dropped, 2)
+        self.assertEqual(self.drain(subscriber), [("EUR", 3), ("USD", 1)])
+
+    def test_conflate_full(self):
+        subscriber = Subscriber(
+            q=ConflatingQueue(lambda m: m[0], maxsize=2),
+            overflow=ConflatePolicy(lambda m: m[0]))
+        for message in [("EUR", 1), ("USD", 1), ("GBP", 1)]:
+            subscriber.notify(message)
+
+        self.assertEqual(subscriber.dropped, 1)
+        self.assertEqual(self.drain(subscriber), [("USD", 1), ("GBP", 1)])
+
+    def test_conflate_by_queue_key(self):
+        subscriber = Subscriber(
+            q=ConflatingQueue(lambda m: m[0]),
+            overflow=ConflatePolicy(lambda m: m[1]))
+        for message in [("EUR", 1), ("USD", 1), ("EUR", 2)]:
+            subscriber.notify(message)
+
+        self.assertEqual(subscriber.dropped, 1)
+        self.assertEqual(self.drain(subscriber), [("EUR", 2), ("USD", 1)])
+
+    def test_constructor_channels(self):
+        subscriber = Subscriber("test_constructor_channels",
+                                overflow=ConflatePolicy(lambda m: m[0]))
+        publisher = Publisher()
+        publisher.publish("test_constructor_channels", ("EUR", 1))
+        publisher.publish("test_constructor_channels", ("EUR", 2))
+        subscriber.remove_channel("test_constructor_channels")
+
+        self.assertEqual(self.drain(subscriber), [("EUR", 2)])
+
+    def test_slow_subscriber_does_not_stall_channel(self):
+        publisher = Publisher()
+        laggard = Subscriber(q=Queue(maxsize=1), overflow=DropNewestPolicy())
+        healthy = Subscriber(q=Queue())
+        laggard.add_channel("test_slow_subscriber")
+        healthy.add_channel("test_slow_subscriber")
+
+        for i in range(10):
+            publisher.publish("test_slow_subscriber", i)
+        laggard.remove_channel("test_slow_subscriber")
+        healthy.remove_channel("test_slow_subscriber")
+
+        self.assertEqual(laggard.dropped, 9)
+        self.assertEqual(self.drain(healthy), list(range(10)))
@@ -0,0 +1,91 @@
+from src.subpubpy import (Publisher, Subscriber, AsyncSubscriber, Poller,
+                          wait_any)
+from threading import Thread
+from unittest import TestCase
+import selectors
+import time
+
+
+def subscribe(channel):
+    subscriber = Subscriber()
+    subscriber.add_channel(channel)
+    return subscriber
+
+
+class TestPoller(TestCase):
+
+    def test_returns_ready_subscribers(self):
+        first, second = subscribe("poller.first"), subscribe("poller.second")
+        with Poller([first, second]) as poller:
+            self.assertEqual(len(poller), 2)
+            self.assertEqual(poller.poll(0.01), [])
+
+            Publisher().publish("poller.second", "hello")
+            self.assertEqual(poller.poll(1), [second])
+            # level triggered, ready until drained.
+            self.assertEqual(poller.poll(0), [second])
+            self.assertEqual(second.get_message(), "hello")
+            self.assertEqual(poller.poll(0.01), [])
+        self.assertEqual(len(poller), 0)
+
+    def test_wakes_blocked_poll(self):
+        subscriber = subscribe("poller.wake")
+        poller = Poller([subscriber])
+        self.addCleanup(poller.close)
+
+        def publish():
+            time.sleep(0.05)
+            Publisher().publish_many("poller.wake", [1, 2])
+
+        Thread(target=publish).start()
+        start = time.monotonic()
+        self.assertEqual(poller.poll(2), [subscriber])
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(subscriber.get_messages(10), [1, 2])
+
+    def test_wait_any(self):
+        idle, busy = subscribe("poller.idle"), subscribe("poller.busy")
+        Publisher().publish("poller.busy", "now")
+        self.assertEqual(wait_any([idle, busy], timeout=1), [busy])
+        self.assertEqual(wait_any([idle], timeout=0.01), [])
+
+    def test_unregister(self):
+        subscriber = subscribe("poller.unregister")
+        poller = Poller([subscriber])
+        poller.unregister(subscriber)
+        Publisher().publish("poller.unregister", 1)
+        self.assertEqual(poller.poll(0.01), [])
+
+    def test_async_subscriber_cannot_be_polled(self):
+        with self.assertRaises(TypeError):
+            Poller([AsyncSubscriber()])
+        with self.assertRaises(TypeError):
+            AsyncSubscriber().fileno()
+
+
+class TestFileno(TestCase):
+
+    def test_selector(self):
+        first, second = subscribe("fileno.first"), subscribe("fileno.second")
+        selector = selectors.DefaultSelector()
+        self.addCleanup(selector.close)
+        selector.register(first, selectors.EVENT_READ)
+        selector.register(second, selectors.EVENT_READ)
+        self.assertEqual(selector.select(0), [])
+
+        Publisher().publish("fileno.first", "a")
+        Publisher().publish("fileno.first", "b")
+        ready = [key.fileobj for key, _ in selector.select(1)]
+        self.assertEqual(ready, [first])
+
+        self.assertEqual(first.get_message(), "a")
+        self.assertEqual(len(selector.select(0)), 1)
+        self.assertEqual(next(first), "b")
+        self.assertEqual(selector.select(0), [])
+
+    def test_pending_messages_are_ready(self):
+        subscriber = subscribe("fileno.pending")
+        Publisher().publish("fileno.pending", 1)
+        with selectors.DefaultSelector() as selector:
+            selector.register(subscriber, selectors.EVENT_READ)
+            self.assertEqual(len(selector.select(0)), 1)
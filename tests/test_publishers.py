@@ -1,4 +1,4 @@
-from src.subpubpy import Publisher
+from src.subpubpy import Publisher, Subscriber
 from unittest import TestCase
 
 
@@ -16,3 +16,17 @@ class Test_Publisher(TestCase):
         # This produce nothing because manager is define in abstract class
         publisher.__manager = None
         publisher.publish(self.channel_name, self.messages)
+
+    def test_publish_many(self):
+        publisher = Publisher()
+        subscriber_1, subscriber_2 = Subscriber(), Subscriber()
+        subscriber_1.add_channel("test_publish_many")
+        subscriber_2.add_channel("test_publish_many")
+
+        publisher.publish_many("test_publish_many", (f"msg-{i}" for i in range(5)))
+
+        for subscriber in (subscriber_1, subscriber_2):
+            self.assertEqual([subscriber.get_message() for _ in range(5)],
+                             [f"msg-{i}" for i in range(5)])
+            self.assertTrue(subscriber.is_empty())
+            subscriber.remove_channel("test_publish_many")
@@ -0,0 +1,155 @@
+from src.subpubpy import (SimpleSubpub, ThreadSafeSubpub, AsyncSubpub,
+                          ThreadPoolDispatcher, Inbox, Request)
+from concurrent.futures import CancelledError
+from unittest import TestCase
+import asyncio
+import time
+
+
+class TestInbox(TestCase):
+
+    def test_invalid_arguments(self):
+        inbox = Inbox()
+        with self.assertRaises(ValueError):
+            inbox.open(None, timeout=0)
+        with self.assertRaises(ValueError):
+            inbox.open(None, gather=True)
+        with self.assertRaises(ValueError):
+            inbox.open(None, gather=True, replies=0)
+
+    def test_reply_completes_future(self):
+        inbox = Inbox()
+        request, future = inbox.open("ping")
+        self.assertIsInstance(request, Request)
+        self.assertEqual(inbox.pending, 1)
+        self.assertTrue(request.reply("pong"))
+        self.assertFalse(request.reply("late"))
+        self.assertEqual(future.result(0), "pong")
+        self.assertEqual(inbox.pending, 0)
+
+    def test_fail(self):
+        request, future = Inbox().open("ping")
+        request.fail(KeyError("ping"))
+        with self.assertRaises(KeyError):
+            future.result(0)
+
+    def test_close_cancels(self):
+        inbox = Inbox()
+        request, future = inbox.open("ping")
+        inbox.close()
+        self.assertTrue(future.cancelled())
+        self.assertFalse(request.reply("pong"))
+        with self.assertRaises(RuntimeError):
+            inbox.open("ping")
+
+    def test_cancelled_request_is_forgotten(self):
+        inbox = Inbox()
+        request, future = inbox.open("ping")
+        self.assertTrue(future.cancel())
+        self.assertEqual(inbox.pending, 0)
+        self.assertFalse(request.reply("pong"))
+
+
+class TestRequestReply(TestCase):
+
+    def test_request(self):
+        bus = SimpleSubpub()
+        bus.sub("replies.add", lambda e, r: r.reply(r.payload + 1),
+                verbose=False)
+        self.assertEqual(bus.request("replies.add", 1, timeout=1).result(1),
+                         2)
+        self.assertEqual(bus.inbox.pending, 0)
+
+    def test_no_responders(self):
+        bus = SimpleSubpub()
+        with self.assertRaises(LookupError):
+            bus.request("replies.nobody", 1, timeout=1).result(1)
+        self.assertEqual(bus.scatter("replies.nobody", 1, timeout=1)
+                         .result(1), [])
+
+    def test_filtered_responders(self):
+        bus = SimpleSubpub()
+
+        def respond(event, request):
+            request.reply(request.payload["qty"] * 2)
+
+        bus.sub("replies.filtered", respond, verbose=False,
+                where={"side": "buy"})
+        self.assertEqual(bus.request("replies.filtered",
+                                     {"side": "buy", "qty": 2},
+                                     timeout=1).result(1), 4)
+        with self.assertRaises(LookupError):
+            bus.request("replies.filtered", {"side": "sell", "qty": 2}
+                        ).result(1)
+
+        # the emptied filter index stays registered.
+        bus.unsub("replies.filtered", respond, verbose=False)
+        with self.assertRaises(LookupError):
+            bus.request("replies.filtered", {"side": "buy"}).result(1)
+
+    def test_timeout(self):
+        bus = SimpleSubpub()
+        bus.sub("replies.silent", lambda e, r: None, verbose=False)
+        start = time.monotonic()
+        future = bus.request("replies.silent", 1, timeout=0.05)
+        with self.assertRaises(TimeoutError):
+            future.result(2)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_threaded_responders(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=4)
+        self.addCleanup(dispatcher.shutdown)
+        bus = ThreadSafeSubpub(dispatcher)
+        bus.sub("replies.square", lambda e, r: r.reply(r.payload ** 2),
+                verbose=False)
+        inbox = Inbox()
+        futures = [bus.request("replies.square", i, timeout=2, inbox=inbox)
+                   for i in range(100)]
+        self.assertEqual([future.result(2) for future in futures],
+                         [i ** 2 for i in range(100)])
+        self.assertEqual(inbox.pending, 0)
+
+    def test_scatter_gather(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=3)
+        self.addCleanup(dispatcher.shutdown)
+        bus = ThreadSafeSubpub(dispatcher)
+
+        def responder(venue):
+            return lambda event, request: request.reply(
+                (venue, request.payload))
+
+        for venue in ("a", "b", "c"):
+            bus.sub("replies.quote", responder(venue), verbose=False)
+
+        replies = bus.scatter("replies.quote", "EURUSD", timeout=2,
+                              replies=3).result(2)
+        self.assertEqual(sorted(replies), [("a", "EURUSD"), ("b", "EURUSD"),
+                                           ("c", "EURUSD")])
+
+        start = time.monotonic()
+        replies = bus.scatter("replies.quote", "GBPUSD",
+                              timeout=0.1).result(2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(len(replies), 3)
+
+    def test_arequest(self):
+        async def main():
+            bus = AsyncSubpub()
+
+            async def responder(event, request):
+                await asyncio.sleep(0)
+                request.reply(request.payload.upper())
+
+            bus.sub("replies.async", responder, verbose=False)
+            return await bus.arequest("replies.async", "ping", timeout=1)
+
+        self.assertEqual(asyncio.run(main()), "PING")
+
+    def test_cancel(self):
+        bus = SimpleSubpub()
+        bus.sub("replies.cancel", lambda e, r: None, verbose=False)
+        future = bus.request("replies.cancel", 1)
+        future.cancel()
+        with self.assertRaises(CancelledError):
+            future.result(0)
+        self.assertEqual(bus.inbox.pending, 0)
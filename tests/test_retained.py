@@ -0,0 +1,104 @@
+from src.subpubpy import (Channel, Publisher, Subscriber, LastNStore,
+                          LastValueStore, BlockPolicy)
+from src.subpubpy.manager import _ChannelManager
+from queue import Queue
+from threading import Thread
+from unittest import TestCase
+
+
+class TestStores(TestCase):
+
+    def test_last_n(self):
+        store = LastNStore(3)
+        store.update_many(range(5))
+        store.update(5)
+
+        self.assertEqual(store.messages(), [3, 4, 5])
+        self.assertEqual(len(store), 3)
+        store.clear()
+        self.assertEqual(store.messages(), [])
+        with self.assertRaises(ValueError):
+            LastNStore(0)
+
+    def test_last_value_per_key(self):
+        store = LastValueStore(key=lambda tick: tick["symbol"], max_keys=2)
+        store.update({"symbol": "EURUSD", "bid": 1.0})
+        store.update({"symbol": "GBPUSD", "bid": 1.2})
+        store.update({"symbol": "EURUSD", "bid": 1.1})
+
+        self.assertEqual(store.get("EURUSD"), {"symbol": "EURUSD", "bid": 1.1})
+        self.assertEqual([tick["symbol"] for tick in store.messages()],
+                         ["GBPUSD", "EURUSD"])
+
+        store.update({"symbol": "USDJPY", "bid": 150.0})
+        self.assertNotIn("GBPUSD", store)
+        self.assertEqual(len(store), 2)
+        with self.assertRaises(TypeError):
+            LastValueStore(key=None)
+
+
+class TestRetainedChannel(TestCase):
+
+    def test_delivered_on_add_channel(self):
+        channel = Channel("test_retained_ticks",
+                          retained=LastValueStore(key=lambda tick: tick[0]))
+        _ChannelManager().register(channel)
+        publisher = Publisher()
+        publisher.publish("test_retained_ticks", ("EURUSD", 1.0))
+        publisher.publish_many("test_retained_ticks",
+                               [("GBPUSD", 1.2), ("EURUSD", 1.1)])
+
+        self.assertEqual(_ChannelManager().retained("test_retained_ticks"),
+                         [("GBPUSD", 1.2), ("EURUSD", 1.1)])
+        subscriber = Subscriber()
+        subscriber.add_channel("test_retained_ticks")
+        subscriber.add_channel("test_retained_ticks")
+        publisher.publish("test_retained_ticks", ("EURUSD", 1.2))
+
+        self.assertEqual(subscriber.get_messages(10),
+                         [("GBPUSD", 1.2), ("EURUSD", 1.1), ("EURUSD", 1.2)])
+        subscriber.remove_channel("test_retained_ticks")
+
+    def test_not_retained(self):
+        self.assertEqual(_ChannelManager().retained("test_not_retained"), [])
+        with self.assertRaises(TypeError):
+            Channel("test_not_retained", retained=[])
+
+    def test_exactly_once_while_publishing(self):
+        channel = Channel("test_retained_concurrent", retained=LastNStore(5000))
+        _ChannelManager().register(channel)
+        publisher = Publisher()
+        subscribers = [Subscriber(q=Queue()) for _ in range(4)]
+
+        def publish():
+            for i in range(2000):
+                publisher.publish("test_retained_concurrent", i)
+
+        thread = Thread(target=publish)
+        thread.start()
+        for subscriber in subscribers:
+            subscriber.add_channel("test_retained_concurrent")
+        thread.join(10)
+
+        for subscriber in subscribers:
+            self.assertEqual(subscriber.get_messages(5000), list(range(2000)))
+            subscriber.remove_channel("test_retained_concurrent")
+
+    def test_replay_never_blocks_the_attaching_thread(self):
+        channel = Channel("test_retained_bounded", retained=LastNStore(5))
+        _ChannelManager().register(channel)
+        publisher = Publisher()
+        publisher.publish_many("test_retained_bounded", range(5))
+        subscriber = Subscriber(q=Queue(maxsize=2), overflow=BlockPolicy())
+
+        thread = Thread(target=subscriber.add_channel,
+                        args=("test_retained_bounded",), daemon=True)
+        thread.start()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(subscriber.dropped, 3)
+        self.assertEqual(subscriber.get_messages(5), [0, 1])
+
+        publisher.publish("test_retained_bounded", 5)
+        self.assertEqual(subscriber.get_messages(5), [5])
+        subscriber.remove_channel("test_retained_bounded")
@@ -0,0 +1,139 @@
+from src.subpubpy import Publisher, Subscriber, RingBufferChannel
+from src.subpubpy.manager import _ChannelManager
+from src.subpubpy.ring import BroadcastRing, RingBufferQueue
+from queue import Empty, Full, Queue
+from threading import Thread
+from unittest import TestCase
+
+
+class TestBroadcastRing(TestCase):
+
+    def test_capacity_power_of_two(self):
+        self.assertEqual(BroadcastRing(1000).capacity, 1024)
+        with self.assertRaises(ValueError):
+            BroadcastRing(0)
+
+    def test_every_reader_sees_every_message(self):
+        ring = BroadcastRing(8)
+        readers = [RingBufferQueue(ring) for _ in range(3)]
+        ring.publish_many(range(5))
+
+        for reader in readers:
+            self.assertEqual(reader.qsize(), 5)
+            self.assertEqual(reader.get_many(10), [0, 1, 2, 3, 4])
+            self.assertTrue(reader.empty())
+            with self.assertRaises(Empty):
+                reader.get_nowait()
+
+    def test_blocking_writer_waits_for_slowest_reader(self):
+        ring = BroadcastRing(4)
+        reader = RingBufferQueue(ring)
+        ring.publish_many(range(4))
+
+        with self.assertRaises(Full):
+            ring.publish(4, timeout=0.01)
+
+        self.assertEqual(reader.get(), 0)
+        ring.publish(4, timeout=0.01)
+        self.assertEqual(reader.get_many(10), [1, 2, 3, 4])
+
+    def test_closed_reader_does_not_block(self):
+        ring = BroadcastRing(2)
+        reader = RingBufferQueue(ring)
+        reader.close()
+        ring.publish_many(range(10), timeout=0.01)
+
+    def test_lossy_reader_skips(self):
+        ring = BroadcastRing(4, blocking=False)
+        reader = RingBufferQueue(ring)
+        ring.publish_many(range(10))
+
+        self.assertEqual(reader.get_many(10), [6, 7, 8, 9])
+        self.assertEqual(reader.dropped, 6)
+
+    def test_concurrent_reader(self):
+        ring = BroadcastRing(16)
+        reader = RingBufferQueue(ring)
+        received = []
+
+        def consume():
+            while len(received) < 1000:
+                received.extend(reader.get_many(64, block=True, timeout=5))
+
+        consumer = Thread(target=consume)
+        consumer.start()
+        for i in range(1000):
+            ring.publish(i, timeout=5)
+        consumer.join(5)
+
+        self.assertEqual(received, list(range(1000)))
+
+    def test_concurrent_writers(self):
+        ring = BroadcastRing(16)
+        readers = [RingBufferQueue(ring) for _ in range(4)]
+        received = [[] for _ in readers]
+
+        def consume(reader, messages):
+            while len(messages) < 2000:
+                messages.extend(reader.get_many(64, block=True, timeout=5))
+
+        def produce(offset):
+            for i in range(1000):
+                ring.publish(offset + i, timeout=5)
+
+        threads = [Thread(target=consume, args=args)
+                   for args in zip(readers, received)]
+        threads += [Thread(target=produce, args=(offset,))
+                    for offset in (0, 1000)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        for messages in received:
+            self.assertEqual(sorted(messages), list(range(2000)))
+
+
+class TestRingBufferChannel(TestCase):
+
+    def test_attach_requires_reader(self):
+        channel = RingBufferChannel("test_ring_attach")
+        with self.assertRaises(ValueError):
+            channel.attach(Subscriber())
+        channel.attach(Subscriber(q=channel.reader()))
+
+    def test_publish_get_messages(self):
+        publisher = Publisher()
+        channel = RingBufferChannel("test_ring_publish", capacity=64)
+        subscribers = [Subscriber(q=channel.reader()) for _ in range(4)]
+        _ChannelManager().register(channel)
+        for subscriber in subscribers:
+            subscriber.add_channel("test_ring_publish")
+
+        publisher.publish("test_ring_publish", "message-0")
+        publisher.publish_many("test_ring_publish",
+                               [f"message-{i}" for i in range(1, 5)])
+
+        for subscriber in subscribers:
+            self.assertEqual(subscriber.get_message(), "message-0")
+            self.assertEqual(subscriber.get_messages(2),
+                             ["message-1", "message-2"])
+            self.assertEqual(subscriber.get_messages(10),
+                             ["message-3", "message-4"])
+            self.assertEqual(subscriber.get_messages(10), [])
+            subscriber.remove_channel("test_ring_publish")
+
+
+class TestGetMessages(TestCase):
+
+    def test_plain_queue(self):
+        subscriber = Subscriber(q=Queue(maxsize=10))
+        subscriber.notify_many(range(5))
+
+        self.assertEqual(subscriber.get_messages(3), [0, 1, 2])
+        self.assertEqual(subscriber.get_messages(3), [3, 4])
+        self.assertEqual(subscriber.get_messages(3, block=True,
+                                                 timeout=0.01), [])
+
+        with self.assertRaises(ValueError):
+            subscriber.get_messages(0)
@@ -0,0 +1,132 @@
+from src.subpubpy import (Channel, Publisher, Subscriber, SharedMemoryChannel,
+                          DurableChannel, SharedPayload)
+from src.subpubpy.abstract import AbstractCodec
+from src.subpubpy.manager import _ChannelManager
+from src.subpubpy.serialization import (Frame, JSONCodec, PickleCodec,
+                                        codecs, decode, encode, get_codec,
+                                        register_codec)
+from queue import Queue
+from unittest import TestCase
+import tempfile
+
+
+def round_trip(message, codec=None):
+    kind, data = encode(message, codec)
+    parts = data if isinstance(data, list) else [data]
+    return decode(kind, memoryview(b"".join(bytes(part) for part in parts)))
+
+
+class CountingCodec(AbstractCodec):
+    name = "counting"
+    kinds = (200,)
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, message):
+        self.encoded += 1
+        return 200, repr(message).encode()
+
+    def decode(self, kind, view):
+        return bytes(view).decode()
+
+
+class EncodedSubscriber(Subscriber):
+    encoded = True
+
+
+class TestCodecs(TestCase):
+
+    def test_round_trips(self):
+        message = {"symbol": "EURUSD", "bids": [1.1, 1.2], "size": 3}
+        for name in ("pickle", "marshal", "json"):
+            self.assertEqual(round_trip(message, name), message)
+        self.assertEqual(round_trip(b"raw", "raw"), b"raw")
+        self.assertEqual(round_trip(("tuple", 1)), ("tuple", 1))
+        self.assertEqual(round_trip(SharedPayload(b"frame")), b"frame")
+        with self.assertRaises(TypeError):
+            encode("text", "raw")
+
+    def test_registry(self):
+        self.assertIsInstance(get_codec(), PickleCodec)
+        self.assertIsInstance(get_codec("json"), JSONCodec)
+        codec = JSONCodec()
+        self.assertIs(get_codec(codec), codec)
+        self.assertTrue({"pickle", "raw", "marshal", "json"} <= set(codecs()))
+        with self.assertRaises(ValueError):
+            get_codec("yaml")
+        with self.assertRaises(ValueError):
+            register_codec(JSONCodec())
+        with self.assertRaises(TypeError):
+            register_codec(object())
+        with self.assertRaises(ValueError):
+            decode(250, memoryview(b""))
+
+    def test_frame_decodes_lazily(self):
+        kind, data = encode({"id": 1}, "json")
+        frame = Frame(kind, data, "orders")
+        self.assertFalse(frame.decoded)
+        self.assertEqual(frame.codec.name, "json")
+        self.assertEqual(frame.message, {"id": 1})
+        self.assertTrue(frame.decoded)
+        self.assertIs(frame.message, frame.message)
+
+        message = {"id": 2}
+        frame = Frame.of(message, "marshal", "orders")
+        self.assertIs(frame.message, message)
+        self.assertIs(Frame.of(frame), frame)
+
+    def test_expected_codec(self):
+        kind, data = encode({"id": 1})
+        with self.assertRaises(ValueError):
+            decode(kind, memoryview(data), "json")
+        with self.assertRaises(ValueError):
+            Frame(kind, data, "orders", expect="json").message
+        self.assertEqual(decode(*encode(b"raw"), "pickle"), b"raw")
+        kind, data = encode([1], "json")
+        self.assertEqual(Frame(kind, data, expect="json").message, [1])
+
+
+class TestChannelCodecs(TestCase):
+
+    def test_encoded_once_for_every_encoded_subscriber(self):
+        codec = CountingCodec()
+        _ChannelManager().register(Channel("serialization.once", codec=codec))
+        local = Subscriber(q=Queue())
+        remotes = [EncodedSubscriber(q=Queue()) for _ in range(3)]
+        for subscriber in [local, *remotes]:
+            subscriber.add_channel("serialization.once")
+            self.addCleanup(subscriber.remove_channel, "serialization.once")
+
+        publisher = Publisher()
+        publisher.publish("serialization.once", 1)
+        publisher.publish_many("serialization.once", [2, 3])
+
+        self.assertEqual(codec.encoded, 3)
+        self.assertEqual(local.get_messages(3), [1, 2, 3])
+        frames = [remote.get_messages(3) for remote in remotes]
+        for frame, other in zip(frames[0], frames[1]):
+            self.assertIs(frame, other)
+        self.assertEqual(frames[0][0].channel, "serialization.once")
+        self.assertEqual(frames[0][0].message, 1)
+
+    def test_shared_memory_channel_codec(self):
+        channel = SharedMemoryChannel("serialization.shm", capacity=4096,
+                                      max_readers=1, codec="json")
+        self.addCleanup(channel.unlink)
+        self.addCleanup(channel.close)
+        reader = channel.reader()
+        self.addCleanup(reader.close)
+        channel.on_message({"bid": 1.5})
+        self.assertEqual(reader.get(), {"bid": 1.5})
+        self.assertEqual(channel.codec.name, "json")
+
+    def test_durable_channel_codec(self):
+        with tempfile.TemporaryDirectory() as directory:
+            channel = DurableChannel("serialization.log", directory,
+                                     codec="marshal")
+            reader = channel.reader(offset=0)
+            channel.on_messages([{"id": 1}, [2, 3]])
+            self.assertEqual(reader.get_many(10), [{"id": 1}, [2, 3]])
+            self.assertEqual(channel.log.codec.name, "marshal")
+            channel.close()
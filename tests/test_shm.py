@@ -0,0 +1,143 @@
+from src.subpubpy import Publisher, Subscriber, SharedMemoryChannel
+from src.subpubpy.manager import _ChannelManager
+from src.subpubpy.shm import SharedRingBuffer, SharedMemoryQueue
+from queue import Empty, Full
+from unittest import TestCase
+import gc
+import multiprocessing
+import pickle
+
+
+def consume(channel, ready, results, count):
+    subscriber = Subscriber(q=channel.reader())
+    ready.set()
+    for _ in range(count):
+        results.put(subscriber.get_message(block=True))
+    channel.close()
+
+
+class TestSharedRingBuffer(TestCase):
+
+    def setUp(self):
+        self.ring = SharedRingBuffer(capacity=256, max_readers=2)
+
+    def tearDown(self):
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SharedRingBuffer(capacity=8)
+        with self.assertRaises(ValueError):
+            SharedRingBuffer(max_readers=0)
+
+    def test_broadcast_to_every_reader(self):
+        q1, q2 = SharedMemoryQueue(self.ring), SharedMemoryQueue(self.ring)
+        q1.put({"price": 1.0})
+        q1.put(b"raw")
+
+        for q in (q1, q2):
+            self.assertEqual(q.get(), {"price": 1.0})
+            self.assertEqual(q.get(), b"raw")
+            self.assertTrue(q.empty())
+            with self.assertRaises(Empty):
+                q.get_nowait()
+
+    def test_write_many(self):
+        q = SharedMemoryQueue(self.ring)
+        channel = SharedMemoryChannel("test_write_many", ring=self.ring)
+        channel.on_messages([1, b"two", "three"])
+
+        self.assertEqual([q.get_nowait() for _ in range(3)],
+                         [1, b"two", "three"])
+
+    def test_wrap_around(self):
+        q = SharedMemoryQueue(self.ring)
+        for i in range(100):
+            q.put(bytes([i]) * 40)
+            self.assertEqual(q.get(), bytes([i]) * 40)
+
+    def test_full(self):
+        q = SharedMemoryQueue(self.ring)
+        with self.assertRaises(Full):
+            for i in range(10):
+                q.put_nowait(b"x" * 40)
+        q.close()
+        # without readers nothing holds the writer back.
+        for i in range(10):
+            q.put_nowait(b"x" * 40)
+
+    def test_record_too_large(self):
+        with self.assertRaises(ValueError):
+            self.ring.write(b"x" * 512)
+
+    def test_reader_slots(self):
+        readers = [SharedMemoryQueue(self.ring), SharedMemoryQueue(self.ring)]
+        with self.assertRaises(ValueError):
+            SharedMemoryQueue(self.ring)
+        readers[0].close()
+        SharedMemoryQueue(self.ring)
+
+    def test_queue_not_picklable(self):
+        with self.assertRaises(TypeError):
+            pickle.dumps(SharedMemoryQueue(self.ring))
+
+
+class TestSharedMemoryChannel(TestCase):
+
+    def test_attach_requires_reader(self):
+        channel = SharedMemoryChannel("test_attach_requires_reader")
+        try:
+            with self.assertRaises(ValueError):
+                channel.attach(Subscriber())
+            channel.attach(Subscriber(q=channel.reader()))
+        finally:
+            channel.close()
+            channel.unlink()
+
+    def test_dropped_reader_releases_its_slot(self):
+        publisher = Publisher()
+        channel = SharedMemoryChannel("test_dropped_reader", capacity=256,
+                                      max_readers=2)
+        _ChannelManager().register(channel)
+        try:
+            for _ in range(3):
+                subscriber = Subscriber(q=channel.reader())
+                subscriber.add_channel("test_dropped_reader")
+                publisher.publish("test_dropped_reader", b"x" * 40)
+                del subscriber
+                gc.collect()
+
+            # a leaked cursor would block the writer once the ring is full.
+            for _ in range(20):
+                publisher.publish("test_dropped_reader", b"x" * 40)
+            readers = [channel.reader(), channel.reader()]
+            self.assertEqual(len(readers), 2)
+        finally:
+            channel.close()
+            channel.unlink()
+
+    def test_cross_process(self):
+        ctx = multiprocessing.get_context()
+        publisher = Publisher()
+        channel = SharedMemoryChannel("test_cross_process", capacity=4096)
+        _ChannelManager().register(channel)
+        ready, results = ctx.Event(), ctx.Queue()
+        messages = [{"seq": i, "bid": 1.0 + i} for i in range(200)]
+        messages.append(b"frame" * 10)
+
+        worker = ctx.Process(target=consume,
+                             args=(channel, ready, results, len(messages)))
+        worker.start()
+        try:
+            self.assertTrue(ready.wait(10))
+            for message in messages:
+                publisher.publish("test_cross_process", message)
+            received = [results.get(timeout=10) for _ in messages]
+        finally:
+            worker.join(10)
+            channel.close()
+            channel.unlink()
+
+        self.assertEqual(received, messages)
+        self.assertEqual(worker.exitcode, 0)
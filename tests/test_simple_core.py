@@ -1,8 +1,11 @@
 from src.subpubpy import SimpleSubpub, RegexSubpub
+from src.subpubpy.utils import _reaper
 from unittest import TestCase, main
 from unittest.mock import patch
+import gc
 import inspect
 import io
+import weakref
 
 
 class TestSimpleSubpub(TestCase):
@@ -92,7 +95,7 @@ class TestSimpleSubpub(TestCase):
         simple_subpub.sub(event, func)
         simple_subpub.pub(event, payload)
 
-        self.assertEqual(mock_out.getvalue(), f"{event} {payload}\n" * 2)
+        self.assertEqual(mock_out.getvalue(), f"{event} {payload}\n")
 
 
 class TestRegexSubpub(TestCase):
@@ -184,7 +187,7 @@ class TestRegexSubpub(TestCase):
 
         self.assertEqual(
             mock_stdout.getvalue(),
-            f"{event} {payload}\n" * 2)
+            f"{event} {payload}\n")
 
     @patch('sys.stdout', new_callable=io.StringIO)
     def test_publisher_with_regex(self, mock_stdout):
@@ -199,3 +202,66 @@ class TestRegexSubpub(TestCase):
 
         regex_subpub.pub(event, payload)
         self.assertEqual(mock_stdout.getvalue(), "")
+
+
+class Listener:
+
+    def __init__(self):
+        self.payloads = []
+
+    def callback(self, event, payload):
+        self.payloads.append(payload)
+
+
+class TestWeakMethods(TestCase):
+
+    def test_bound_method_does_not_keep_object(self):
+        bus, listener = SimpleSubpub(), Listener()
+        bus.sub("test_weak_method", listener.callback, verbose=False)
+        bus.sub("test_weak_method_where", listener.callback, verbose=False,
+                where={"side": "buy"})
+        bus.pub("test_weak_method", 1, verbose=False)
+        bus.pub("test_weak_method_where", {"side": "buy"}, verbose=False)
+        self.assertEqual(listener.payloads, [1, {"side": "buy"}])
+
+        collected = weakref.ref(listener)
+        del listener
+        gc.collect()
+        self.assertIsNone(collected())
+        self.assertTrue(_reaper.flush(5))
+        self.assertEqual(len(bus._handler["test_weak_method"]), 0)
+        index, = bus._handler["test_weak_method_where"]
+        self.assertEqual(len(index), 0)
+
+    def test_unsub_bound_method(self):
+        bus, listener = SimpleSubpub(), Listener()
+        bus.sub("test_unsub_weak_method", listener.callback, verbose=False)
+        bus.unsub("test_unsub_weak_method", listener.callback, verbose=False)
+        bus.pub("test_unsub_weak_method", 1, verbose=False)
+        self.assertEqual(listener.payloads, [])
+
+
+class TestIsolatedBuses(TestCase):
+
+    def test_own_registry(self):
+        bus, other, received = SimpleSubpub(), SimpleSubpub(), []
+
+        def callback(event, payload):
+            received.append(payload)
+
+        bus.sub("test_isolated", callback, verbose=False)
+        other.pub("test_isolated", "other", verbose=False)
+        bus.pub("test_isolated", "own", verbose=False)
+        self.assertEqual(received, ["own"])
+        self.assertNotIn("test_isolated", other._handler)
+
+    def test_name(self):
+        self.assertEqual(SimpleSubpub().name, "SimpleSubpub")
+        self.assertEqual(RegexSubpub(name="pricing").name, "pricing")
+        with self.assertRaises(TypeError):
+            SimpleSubpub(name=1)
+
+    def test_shared(self):
+        self.assertIs(SimpleSubpub.shared(), SimpleSubpub.shared())
+        self.assertIsNot(SimpleSubpub.shared(), SimpleSubpub())
+        self.assertIsInstance(RegexSubpub.shared(), RegexSubpub)
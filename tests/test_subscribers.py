@@ -1,5 +1,6 @@
 from src.subpubpy import Subscriber
 from queue import Queue, LifoQueue, PriorityQueue, SimpleQueue
+from threading import Thread
 from unittest import TestCase
 
 
@@ -89,3 +90,35 @@ class Test_Subscriber(TestCase):
 
         with self.assertRaises(ValueError):
             self.subscriber.remove_channel()
+
+
+class Test_SubscriberNotifyMany(TestCase):
+
+    def test_notify_many(self):
+        subscriber = Subscriber()
+        subscriber.notify_many(["message-1", "message-2"])
+
+        self.assertEqual(subscriber.get_message(), "message-1")
+        self.assertEqual(subscriber.get_message(), "message-2")
+        self.assertTrue(subscriber.is_empty())
+
+    def test_notify_many_bounded_queue(self):
+        subscriber = Subscriber(q=Queue(maxsize=4))
+        received = []
+
+        def consume():
+            for _ in range(100):
+                received.append(subscriber.get_message(block=True))
+
+        consumer = Thread(target=consume)
+        consumer.start()
+        subscriber.notify_many(range(100))
+        consumer.join(5)
+
+        self.assertEqual(received, list(range(100)))
+
+    def test_notify_many_lifo_queue(self):
+        subscriber = Subscriber(q=LifoQueue())
+        subscriber.notify_many([1, 2])
+
+        self.assertEqual(subscriber.get_message(), 2)
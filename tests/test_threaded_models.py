@@ -1,7 +1,7 @@
 from src.subpubpy import ThreadSafeSubpub, ThreadSafeRegexSubpub, PubSubChannels
 from unittest import TestCase
 from unittest.mock import patch
-from threading import Thread
+from threading import Thread, Event
 import time
 import io
 
@@ -19,11 +19,14 @@ class TestThreadSafeSubpub(TestCase):
         threadsafe_subpub = ThreadSafeSubpub()
         threadsafe_subpub_2 = ThreadSafeSubpub()
 
-        # test objects
-        self.assertEqual(threadsafe_subpub, threadsafe_subpub_2)
+        # every instance is an isolated bus
+        self.assertIsNot(threadsafe_subpub, threadsafe_subpub_2)
+        self.assertIsNot(threadsafe_subpub._handler,
+                         threadsafe_subpub_2._handler)
 
-        # test objects addresses
-        self.assertEqual(id(threadsafe_subpub), id(threadsafe_subpub_2))
+        # the shared default instance
+        self.assertIs(ThreadSafeSubpub.shared(), ThreadSafeSubpub.shared())
+        self.assertIsNot(ThreadSafeSubpub.shared(), threadsafe_subpub)
 
     def test_sub_callback_int(self):
         threadsafe_subpub = ThreadSafeSubpub()
@@ -84,7 +87,7 @@ class TestThreadSafeSubpub(TestCase):
     @patch('sys.stdout', new_callable=io.StringIO)
     def test_publish_passed(self, mock_out):
         threadsafe_subpub = ThreadSafeSubpub()
-        event = "test_publish_passed"
+        event = "test_threadsafe_publish_passed"
         payload = "payload_test"
 
         def func(event, payload):
@@ -93,7 +96,59 @@ class TestThreadSafeSubpub(TestCase):
         threadsafe_subpub.sub(event, func)
         threadsafe_subpub.pub(event, payload)
 
-        self.assertEqual(mock_out.getvalue(), f"{event} {payload}\n"*4)
+        self.assertEqual(mock_out.getvalue(), f"{event} {payload}\n")
+
+    def test_slow_callback_does_not_block_sub(self):
+        threadsafe_subpub = ThreadSafeSubpub()
+        started, release = Event(), Event()
+
+        def slow(event, payload):
+            started.set()
+            release.wait(5)
+
+        def func(event, payload): ...
+
+        threadsafe_subpub.sub("test_slow_callback", slow, verbose=False)
+        publisher = Thread(target=threadsafe_subpub.pub,
+                           args=("test_slow_callback", None, False))
+        publisher.start()
+        self.assertTrue(started.wait(5))
+
+        # both calls would dead lock if pub held the lock while dispatching.
+        threadsafe_subpub.sub("test_slow_callback_other", func, verbose=False)
+        threadsafe_subpub.pub("test_slow_callback_other", None, verbose=False)
+
+        release.set()
+        publisher.join()
+        threadsafe_subpub.unsub("test_slow_callback", slow, verbose=False)
+        threadsafe_subpub.unsub("test_slow_callback_other", func,
+                                verbose=False)
+
+    def test_parallel_publishers(self):
+        threadsafe_subpub = ThreadSafeSubpub()
+        first, second = Event(), Event()
+
+        def func_1(event, payload):
+            first.set()
+            self.assertTrue(second.wait(5))
+
+        def func_2(event, payload):
+            second.set()
+            self.assertTrue(first.wait(5))
+
+        threadsafe_subpub.sub("test_parallel_1", func_1, verbose=False)
+        threadsafe_subpub.sub("test_parallel_2", func_2, verbose=False)
+
+        runner = Runner()
+        runner.add(lambda: threadsafe_subpub.pub("test_parallel_1", None,
+                                                 False), "first")
+        runner.add(lambda: threadsafe_subpub.pub("test_parallel_2", None,
+                                                 False), "second")
+        runner.check_result("first")
+        runner.check_result("second")
+
+        threadsafe_subpub.unsub("test_parallel_1", func_1, verbose=False)
+        threadsafe_subpub.unsub("test_parallel_2", func_2, verbose=False)
 
 
 class Runner():
@@ -122,6 +177,34 @@ class TestThreadSafeRegexSubpub(TestCase):
         threadsaferegex_subpub = ThreadSafeRegexSubpub()
         self.assertIsNotNone(threadsaferegex_subpub)
 
+    def test_own_instance(self):
+        threadsaferegex_subpub = ThreadSafeRegexSubpub()
+
+        self.assertIsInstance(threadsaferegex_subpub, ThreadSafeRegexSubpub)
+        self.assertIsInstance(ThreadSafeRegexSubpub.shared(),
+                              ThreadSafeRegexSubpub)
+        self.assertIsNot(ThreadSafeRegexSubpub.shared(),
+                         ThreadSafeSubpub.shared())
+
+    def test_publish_all_patterns(self):
+        threadsaferegex_subpub = ThreadSafeRegexSubpub()
+        received = []
+
+        def func_1(event, payload):
+            received.append(("func_1", event))
+
+        def func_2(event, payload):
+            received.append(("func_2", event))
+
+        threadsaferegex_subpub.sub(r"regex\..*", func_1)
+        threadsaferegex_subpub.sub(r".*\.fx", func_2)
+        threadsaferegex_subpub.pub("regex.fx", None, verbose=False)
+        threadsaferegex_subpub.unsub(r"regex\..*", func_1)
+        threadsaferegex_subpub.unsub(r".*\.fx", func_2)
+
+        self.assertEqual(sorted(received),
+                         [("func_1", "regex.fx"), ("func_2", "regex.fx")])
+
 
 class Test_PubSubChannels(TestCase):
 
@@ -1,4 +1,6 @@
-from src.subpubpy.utils import RegexDict
+from src.subpubpy.utils import (RegexDict, PatternIndex, SnapshotHandlerDict,
+                                TopicTrie, topic_matches, FilterIndex,
+                                compile_where)
 from unittest import TestCase, main
 
 
@@ -27,3 +29,171 @@ class TestRegexDict(TestCase):
         # Regex Test
         self.assertEqual(regex_dict.get(r'test.*'), param)
         self.assertEqual(regex_dict[r'test.*'], param)
+
+
+class TestPatternIndex(TestCase):
+
+    def func_1(self, event, payload): ...
+
+    def func_2(self, event, payload): ...
+
+    def test_invalid_pattern(self):
+        with self.assertRaises(ValueError):
+            PatternIndex().add("orders.(", self.func_1)
+
+    def test_all_matching_patterns(self):
+        index = PatternIndex()
+        index.add(r"orders\..*", self.func_1)
+        index.add(r"orders\.eu\..*", self.func_2)
+        index.add(r"trades\..*", self.func_2)
+
+        self.assertEqual(set(index.get("orders.eu.fx")),
+                         {self.func_1, self.func_2})
+        self.assertEqual(index.get("orders.us.fx"), (self.func_1,))
+        self.assertEqual(index.get("quotes.us.fx"), ())
+
+    def test_full_match(self):
+        index = PatternIndex()
+        index.add("orders", self.func_1)
+
+        self.assertEqual(index.get("orders"), (self.func_1,))
+        self.assertEqual(index.get("orders.eu"), ())
+
+    def test_memoized_resolution(self):
+        index = PatternIndex()
+        index.add(r"orders\..*", self.func_1)
+
+        for _ in range(10):
+            index.get("orders.eu")
+        info = index.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 9)
+
+    def test_cache_invalidated(self):
+        index = PatternIndex()
+        index.add(r"orders\..*", self.func_1)
+        self.assertEqual(index.get("orders.eu"), (self.func_1,))
+
+        index.add(r".*\.eu", self.func_2)
+        self.assertEqual(set(index.get("orders.eu")),
+                         {self.func_1, self.func_2})
+
+        self.assertTrue(index.remove(r"orders\..*", self.func_1))
+        self.assertEqual(index.get("orders.eu"), (self.func_2,))
+        self.assertNotIn(r"orders\..*", index)
+
+        self.assertFalse(index.remove(r"orders\..*", self.func_1))
+
+
+class TestSnapshotHandlerDict(TestCase):
+
+    def func_1(self, event, payload): ...
+
+    def func_2(self, event, payload): ...
+
+    def test_add_remove(self):
+        handlers = SnapshotHandlerDict()
+        handlers.add("event", self.func_1)
+        handlers.add("event", self.func_1)
+        handlers.add("event", self.func_2)
+
+        self.assertEqual(handlers.get("event"), (self.func_1, self.func_2))
+        self.assertTrue(handlers.remove("event", self.func_1))
+        self.assertFalse(handlers.remove("event", self.func_1))
+        self.assertTrue(handlers.remove("event", self.func_2))
+        self.assertNotIn("event", handlers)
+
+    def test_snapshot_is_immutable(self):
+        handlers = SnapshotHandlerDict()
+        handlers.add("event", self.func_1)
+        snapshot = handlers.snapshot
+
+        handlers.add("event", self.func_2)
+        handlers.add("other", self.func_2)
+
+        self.assertEqual(snapshot, {"event": (self.func_1,)})
+        self.assertIsInstance(handlers["event"], tuple)
+
+
+class TestTopicTrie(TestCase):
+
+    def setUp(self):
+        self.trie = TopicTrie()
+        for pattern in ("orders.*.fx.#", "orders.#", "*.eu.*",
+                        "orders.eu.fx.spot", "#.spot"):
+            self.trie.add(pattern, pattern)
+
+    def test_invalid_pattern(self):
+        for pattern in ("orders.e*", "orders..fx", "orders.#fx", ""):
+            with self.assertRaises(ValueError):
+                self.trie.add(pattern, pattern)
+
+    def test_wildcards(self):
+        self.assertEqual(self.trie.get("orders.eu.fx"),
+                         {"orders.*.fx.#", "orders.#", "*.eu.*"})
+        self.assertEqual(self.trie.get("orders.eu.fx.spot"),
+                         {"orders.*.fx.#", "orders.#", "orders.eu.fx.spot",
+                          "#.spot"})
+        self.assertEqual(self.trie.get("orders"), {"orders.#"})
+        self.assertEqual(self.trie.get("spot"), {"#.spot"})
+        self.assertEqual(self.trie.get("trades.us.fx"), frozenset())
+
+    def test_agrees_with_topic_matches(self):
+        for topic in ("orders.eu.fx", "orders.us.fx.spot.1", "x.eu.y",
+                      "orders", "orders.eu", "eu.spot"):
+            expected = {pattern for pattern in self.trie
+                        if topic_matches(pattern, topic)}
+            self.assertEqual(self.trie.get(topic), expected)
+
+    def test_remove(self):
+        self.assertTrue(self.trie.remove("orders.#", "orders.#"))
+        self.assertFalse(self.trie.remove("orders.#", "orders.#"))
+        self.assertNotIn("orders.#", self.trie)
+        self.assertEqual(self.trie.get("orders"), frozenset())
+        self.assertEqual(len(self.trie), 4)
+
+
+class TestFilterIndex(TestCase):
+
+    def setUp(self):
+        self.index = FilterIndex()
+        self.index.add("eurusd", {"symbol": "EURUSD"})
+        self.index.add("majors", {"symbol": ["EURUSD", "GBPUSD"],
+                                  "qty": {">": 0}})
+        self.index.add("cheap", {"price": {">=": 1.0, "<": 2.0}})
+
+    def test_compile_where(self):
+        self.assertEqual(compile_where({"a": 1, "b": {"<": 2}}),
+                         [("a", "==", 1), ("b", "<", 2)])
+        self.assertEqual(compile_where({"a": {1, 2}}),
+                         [("a", "in", frozenset({1, 2}))])
+        with self.assertRaises(ValueError):
+            compile_where({"a": {"~": 1}})
+        with self.assertRaises(TypeError):
+            compile_where({})
+
+    def test_match(self):
+        tick = {"symbol": "EURUSD", "qty": 5, "price": 1.5}
+        self.assertEqual(sorted(self.index.match(tick)),
+                         ["cheap", "eurusd", "majors"])
+        self.assertEqual(self.index.match({"symbol": "GBPUSD", "qty": 0}), [])
+        self.assertEqual(self.index.match({"symbol": "USDJPY",
+                                           "price": 150.0}), [])
+        # missing fields, other types and unhashable values never match.
+        self.assertEqual(self.index.match("EURUSD"), [])
+        self.assertEqual(self.index.match({"symbol": ["EURUSD"],
+                                           "price": "1.5"}), [])
+
+    def test_attributes(self):
+        class Tick:
+            symbol = "GBPUSD"
+            qty = 1
+        self.assertEqual(self.index.match(Tick()), ["majors"])
+
+    def test_replace_and_remove(self):
+        self.index.add("eurusd", {"symbol": "GBPUSD"})
+        self.assertEqual(self.index.match({"symbol": "EURUSD"}), [])
+        self.assertTrue(self.index.remove("cheap"))
+        self.assertFalse(self.index.remove("cheap"))
+        self.assertEqual(len(self.index), 2)
+        self.assertNotIn("cheap", self.index)
@@ -0,0 +1,115 @@
+from src.subpubpy import (SimpleSubpub, ThreadPoolDispatcher, Conflate,
+                          Throttle, Debounce)
+from threading import Event, Lock
+from unittest import TestCase
+import time
+
+
+class Recorder:
+
+    def __init__(self, expected: int = 1):
+        self.calls = []
+        self.expected = expected
+        self.done = Event()
+        self.lock = Lock()
+
+    def callback(self, event, payload):
+        with self.lock:
+            self.calls.append((event, payload))
+            if len(self.calls) >= self.expected:
+                self.done.set()
+
+
+class TestWindows(TestCase):
+
+    def test_invalid_window(self):
+        bus = SimpleSubpub()
+        with self.assertRaises(ValueError):
+            Conflate(0)
+        with self.assertRaises(TypeError):
+            Throttle(0.1, key=1)
+        with self.assertRaises(TypeError):
+            bus.sub("windows.invalid", Recorder().callback, window=0.1)
+
+    def test_conflate_latest_wins(self):
+        bus, recorder = SimpleSubpub(), Recorder()
+        bus.sub("windows.conflate", recorder.callback, verbose=False,
+                window=Conflate(0.05))
+        for i in range(1000):
+            bus.pub("windows.conflate", i, verbose=False)
+        self.assertEqual(recorder.calls, [])
+
+        self.assertTrue(recorder.done.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(recorder.calls, [("windows.conflate", 999)])
+        bus.unsub("windows.conflate", recorder.callback)
+
+    def test_conflate_per_key(self):
+        bus, recorder = SimpleSubpub(), Recorder(expected=2)
+        bus.sub("windows.keys", recorder.callback, verbose=False,
+                window=Conflate(0.05, key=lambda tick: tick[0]))
+        bus.pub_many("windows.keys", [("EURUSD", 1), ("GBPUSD", 1),
+                                      ("EURUSD", 2)], verbose=False)
+
+        self.assertTrue(recorder.done.wait(2))
+        self.assertEqual(sorted(payload for _, payload in recorder.calls),
+                         [("EURUSD", 2), ("GBPUSD", 1)])
+        bus.unsub("windows.keys", recorder.callback)
+
+    def test_throttle_leading_and_trailing(self):
+        bus, recorder = SimpleSubpub(), Recorder(expected=2)
+        bus.sub("windows.throttle", recorder.callback, verbose=False,
+                window=Throttle(0.05))
+        for i in range(100):
+            bus.pub("windows.throttle", i, verbose=False)
+        self.assertEqual(recorder.calls, [("windows.throttle", 0)])
+
+        self.assertTrue(recorder.done.wait(2))
+        time.sleep(0.1)
+        self.assertEqual([payload for _, payload in recorder.calls], [0, 99])
+        bus.unsub("windows.throttle", recorder.callback)
+
+    def test_debounce_waits_for_quiet(self):
+        bus, recorder = SimpleSubpub(), Recorder()
+        bus.sub("windows.debounce", recorder.callback, verbose=False,
+                window=Debounce(0.05))
+        for i in range(5):
+            bus.pub("windows.debounce", i, verbose=False)
+            time.sleep(0.02)
+        self.assertEqual(recorder.calls, [])
+
+        self.assertTrue(recorder.done.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(recorder.calls, [("windows.debounce", 4)])
+        bus.unsub("windows.debounce", recorder.callback)
+
+    def test_window_uses_bus_dispatcher(self):
+        dispatcher = ThreadPoolDispatcher(max_workers=1)
+        self.addCleanup(dispatcher.shutdown)
+        bus, recorder = SimpleSubpub(dispatcher), Recorder()
+        window = Conflate(0.02)
+        bus.sub("windows.dispatcher", recorder.callback, verbose=False,
+                window=window)
+        bus.sub("windows.shared", recorder.callback, verbose=False,
+                window=window)
+        bus.pub("windows.dispatcher", 1, verbose=False)
+
+        self.assertTrue(recorder.done.wait(2))
+        dispatcher.join()
+        self.assertEqual(recorder.calls, [("windows.dispatcher", 1)])
+        self.assertIsNone(window.callback)
+        bus.unsub("windows.dispatcher", recorder.callback)
+        bus.unsub("windows.shared", recorder.callback)
+
+    def test_unsub_cancels_pending_window(self):
+        for window in (Conflate(0.05), Throttle(0.05), Debounce(0.05)):
+            bus, recorder = SimpleSubpub(), Recorder()
+            bus.sub("windows.cancel", recorder.callback, verbose=False,
+                    window=window)
+            bus.pub("windows.cancel", 1, verbose=False)
+            bus.pub("windows.cancel", 2, verbose=False)
+            delivered = list(recorder.calls)
+            bus.unsub("windows.cancel", recorder.callback)
+
+            time.sleep(0.15)
+            self.assertEqual(recorder.calls, delivered)